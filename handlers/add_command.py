@@ -11,13 +11,14 @@ from telegram.error import BadRequest
 from telegram.ext import (
     ContextTypes,
     CommandHandler,
-    CallbackQueryHandler,
     MessageHandler,
     filters,
 )
-from utils.database import SessionLocal
 from models.tables import Submission
-from models.global_ban import GlobalBan  # ✅ Import global ban model
+from utils.eligibility import NOT_BANNED, MEMBER
+from utils.callback_router import callback_router, callback_data, CATEGORY_CODES, CATEGORIES
+from utils import add_flow as flow
+from utils.add_flow import add_flow
 
 # ====== CONFIG ======
 GROUP_ID=-1002677839849
@@ -37,13 +38,6 @@ RARITY_MAP = {
 }
 
 # ====== HELPERS ======
-def safe_split(data: str | None, sep: str = "_", index: int | None = None) -> str | list[str]:
-    if not data or sep not in data:
-        return "" if index is not None else []
-    parts = data.split(sep)
-    return parts[index] if index is not None and len(parts) > index else parts
-
-
 def is_private_chat(update: Update) -> bool:
     chat = update.effective_chat
     return chat and chat.type == "private"  # type: ignore
@@ -60,25 +54,6 @@ async def safe_reply(update: Update, text: str, **kwargs):
         print("⚠️ No valid message or callback found for reply.")
 
 
-# ====== GLOBAL BAN CHECK ======
-async def is_globally_banned(user_id: int) -> bool:
-    """Check if a user is globally banned."""
-    session = SessionLocal()
-    banned = session.query(GlobalBan).filter_by(user_id=str(user_id)).first()
-    session.close()
-    return bool(banned)
-
-
-# ====== MEMBERSHIP CHECK ======
-async def is_member(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
-    try:
-        member_group = await context.bot.get_chat_member(GROUP_ID, user_id)
-        member_channel = await context.bot.get_chat_member(CHANNEL_ID, user_id)
-        return member_group.status not in ("left", "kicked") and member_channel.status not in ("left", "kicked")
-    except Exception:
-        return False
-
-
 # ====== ADD COMMAND ======
 async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_private_chat(update):
@@ -95,19 +70,20 @@ async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not user:
         return
 
-    # ✅ Global Ban Check
-    if await is_globally_banned(user.id):
+    # ✅ Global ban, then membership (see utils/eligibility.py)
+    failed = await context.eligibility.first_failure(NOT_BANNED, MEMBER)
+    if failed == NOT_BANNED:
         await safe_reply(update, "🚫 You are globally banned from using this bot.")
         return
 
     # ✅ Membership Check
-    if not await is_member(user.id, context):
+    if failed == MEMBER:
         keyboard = [
             [
                 InlineKeyboardButton("📣 Join Group", url=GROUP_URL),
                 InlineKeyboardButton("📢 Join Channel", url=CHANNEL_URL),
             ],
-            [InlineKeyboardButton("🔁 Try Again", callback_data="recheck_add")],
+            [InlineKeyboardButton("🔁 Try Again", callback_data=callback_data("add", "rc"))],
         ]
         await safe_reply(
             update,
@@ -118,10 +94,11 @@ async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    # ✅ Proceed if allowed
+    # ✅ Proceed if allowed (a new /add replaces any unfinished draft)
+    add_flow.start(context, user.id)
     keyboard = [
-        [InlineKeyboardButton("👩‍🦰 Waifu", callback_data="type_waifu")],
-        [InlineKeyboardButton("🧑‍🦱 Husbando", callback_data="type_husbando")],
+        [InlineKeyboardButton("👩‍🦰 Waifu", callback_data=callback_data("add", "ty", "w"))],
+        [InlineKeyboardButton("🧑‍🦱 Husbando", callback_data=callback_data("add", "ty", "h"))],
     ]
     await safe_reply(
         update,
@@ -138,26 +115,32 @@ async def type_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
 
     user = update.effective_user
-    if await is_globally_banned(user.id):
+    if await context.eligibility.first_failure(NOT_BANNED):
         await query.edit_message_text("🚫 You are globally banned from using this bot.")
         return
 
-    context.user_data["type"] = safe_split(query.data, "_", 1)
+    draft = await add_flow.draft(user.id, flow.TYPE)
+    if draft is None:
+        await query.edit_message_text(flow.EXPIRED_TEXT)
+        return
+
+    draft.type = CATEGORIES[context.args[0]]
+    add_flow.enter(context, user.id, flow.RARITY)
     keyboard = [
         [
-            InlineKeyboardButton("🔵", callback_data="rarity_🔵"),
-            InlineKeyboardButton("🔴", callback_data="rarity_🔴"),
-            InlineKeyboardButton("🟠", callback_data="rarity_🟠"),
+            InlineKeyboardButton("🔵", callback_data=callback_data("add", "ra", "🔵")),
+            InlineKeyboardButton("🔴", callback_data=callback_data("add", "ra", "🔴")),
+            InlineKeyboardButton("🟠", callback_data=callback_data("add", "ra", "🟠")),
         ],
         [
-            InlineKeyboardButton("🟡", callback_data="rarity_🟡"),
-            InlineKeyboardButton("💮", callback_data="rarity_💮"),
-            InlineKeyboardButton("🔮", callback_data="rarity_🔮"),
+            InlineKeyboardButton("🟡", callback_data=callback_data("add", "ra", "🟡")),
+            InlineKeyboardButton("💮", callback_data=callback_data("add", "ra", "💮")),
+            InlineKeyboardButton("🔮", callback_data=callback_data("add", "ra", "🔮")),
         ],
-        [InlineKeyboardButton("🎐", callback_data="rarity_🎐")],
+        [InlineKeyboardButton("🎐", callback_data=callback_data("add", "ra", "🎐"))],
     ]
     await query.edit_message_text(
-        f"Now select the rarity for your {context.user_data['type']}:",
+        f"Now select the rarity for your {draft.type}:",
         reply_markup=InlineKeyboardMarkup(keyboard),
     )
 
@@ -170,16 +153,21 @@ async def rarity_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
 
     user = update.effective_user
-    if await is_globally_banned(user.id):
+    if await context.eligibility.first_failure(NOT_BANNED):
         await query.edit_message_text("🚫 You are globally banned from using this bot.")
         return
 
-    rarity_symbol = safe_split(query.data, "_", 1)
-    context.user_data["rarity"] = rarity_symbol
-    context.user_data["rarity_name"] = RARITY_MAP.get(rarity_symbol, "Unknown")
+    draft = await add_flow.draft(user.id, flow.RARITY)
+    if draft is None:
+        await query.edit_message_text(flow.EXPIRED_TEXT)
+        return
+
+    rarity_symbol = context.args[0]
+    draft.rarity = rarity_symbol
+    add_flow.enter(context, user.id, flow.PHOTO)
 
-    msg_type = context.user_data.get("type", "waifu").capitalize()
-    rarity_name = context.user_data["rarity_name"]
+    msg_type = draft.type.capitalize()
+    rarity_name = RARITY_MAP.get(rarity_symbol, "Unknown")
 
     bot_name = "@Waifu_Grabber_Bot" if msg_type.lower() == "waifu" else "@Husbando_Grabber_Bot"
     response_text = (
@@ -198,6 +186,7 @@ async def rarity_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def recheck_membership(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
+    context.eligibility.forget(MEMBER)  # they may have just joined
     await add_command(update, context)
 
 
@@ -207,12 +196,11 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     user = update.effective_user
-    if await is_globally_banned(user.id):
+    if await context.eligibility.first_failure(NOT_BANNED):
         await safe_reply(update, "🚫 You are globally banned from using this bot.")
         return
 
-    if context.user_data:
-        context.user_data.clear()
+    if add_flow.cancel(context, user.id):
         await safe_reply(update, "❌ Your submission process has been cancelled.")
     else:
         await safe_reply(update, "⚠️ You don’t have any ongoing submission to cancel.")
@@ -221,8 +209,15 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ====== HANDLERS ======
 add_handlers = [
     CommandHandler("add", add_command),
-    CallbackQueryHandler(type_selection, pattern="^type_"),
-    CallbackQueryHandler(rarity_selection, pattern="^rarity_"),
-    CallbackQueryHandler(recheck_membership, pattern="^recheck_add"),
     CommandHandler("cancel", cancel_command),
-]
\ No newline at end of file
+]
+
+callback_router.add_routes("add", {
+    "rc": recheck_membership,
+    "ty": type_selection,
+    "ra": rarity_selection,
+})
+callback_router.alias(r"^recheck_add$", "add:rc")
+callback_router.alias(r"^rarity_([^_]+)$", "add:ra:{}")
+for _category, _code in CATEGORY_CODES.items():
+    callback_router.alias(rf"^type_{_category}$", f"add:ty:{_code}")
@@ -1,30 +1,56 @@
-from datetime import datetime, timedelta
-from telegram.ext import JobQueue
+from datetime import datetime, timedelta, timezone
+from functools import partial
 from telegram import (
     Update,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
 )
-from telegram.ext import (
-    ContextTypes,
-    CallbackQueryHandler,
-)
-from utils.database import SessionLocal
+from telegram.ext import ContextTypes
+from utils.database import run_db
 from models.tables import Submission
-from .add_command import safe_split, RARITY_MAP, GROUP_ID, CHANNEL_ID, GROUP_URL # Assuming relative import for shared components
+from utils import lifecycle
+from utils.catalog import catalog
+from utils.message_index import message_index, index_message
+from utils.callback_router import callback_router
+from .auction_bid import quick_bid_keyboard
+from .add_command import RARITY_MAP, GROUP_ID, CHANNEL_ID, GROUP_URL # Assuming relative import for shared components
 from config import OWNER_ID,ADMINS
+from utils.outbound import outbound, Priority
+from tasks.expiry_scheduler import expiry_scheduler
+from tasks.scheduled_jobs import scheduled_jobs
 
 
 
-# ====== AUTO UNPIN AFTER DELAY ======
-async def unpin_after_delay(context: ContextTypes.DEFAULT_TYPE):
-    """Automatically unpins the auction post after 3 days."""
-    data = context.job.data
-    chat_id = int(data.get("chat_id"))
-    message_id = int(data.get("message_id"))
+# ====== DB HELPERS ======
+def _get_submission(session, item_id: int):
+    return session.query(Submission).filter(Submission.id == item_id).first()
+
+
+def _decide(session, item_id: int, status: str) -> bool:
+    """Move a pending submission to approved/rejected. False if someone else already did."""
+    return lifecycle.transition(session, item_id, lifecycle.PENDING, status)
+
+
+def _save_group_message(session, item_id: int, message_id: int):
+    _get_submission(session, item_id).group_message_id = message_id
+    index_message(session, GROUP_ID, message_id, item_id)
+
 
+def _save_channel_post(session, item_id: int, message_id: int):
+    submission = _get_submission(session, item_id)
+    submission.channel_id = CHANNEL_ID
+    submission.channel_message_id = message_id
+    index_message(session, CHANNEL_ID, message_id, item_id)
+    submission.expires_at = datetime.utcnow() + timedelta(days=3)
+    submission.is_expired = False
+    return submission
+
+
+# ====== AUTO UNPIN AFTER DELAY ======
+async def unpin_message(chat_id: int, message_id: int):
+    """Unpins the auction post 3 days after approval (a job in tasks/scheduled_jobs.py)."""
     try:
-        await context.bot.unpin_chat_message(chat_id=chat_id, message_id=message_id)
+        await outbound.call("unpin_chat_message", chat_id, Priority.HOUSEKEEPING, message_id=message_id)
         print(f"✅ Unpinned message {message_id} in chat {chat_id}")
     except Exception as e:
         err = str(e).lower()
@@ -37,18 +63,15 @@ async def unpin_after_delay(context: ContextTypes.DEFAULT_TYPE):
 
 
 # ====== APPROVAL HANDLER ======
-async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str):
     query = update.callback_query
     if not query or not query.data:
         return
     await query.answer()
 
-    split_data = safe_split(query.data)
-    if not isinstance(split_data, list) or len(split_data) < 2:
+    if not context.args:
         return
-
-    action = split_data[0]
-    raw_item_id = split_data[1]
+    raw_item_id = context.args[0]
 
     # Validate item ID
     try:
@@ -60,9 +83,8 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             pass
         return
 
-    db = SessionLocal()
     try:
-        submission = db.query(Submission).filter(Submission.id == item_id).first()
+        submission = await run_db(_get_submission, item_id)
     except Exception:
         submission = None
 
@@ -71,19 +93,16 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.edit_message_caption(caption="⚠️ Submission not found.")
         except Exception:
             pass
-        db.close()
         return
 
     # Admin permission check
     if query.from_user.id != OWNER_ID and query.from_user.id not in ADMINS:
         await query.answer("🚫 Only the owner or an admin can approve/reject.", show_alert=True)
-        db.close()
         return
 
     # Prevent double approval/rejection
-    if submission.status in ("approved", "rejected"):
+    if submission.status != lifecycle.PENDING:
         await query.answer(f"⚠️ This item is already {submission.status}!", show_alert=True)
-        db.close()
         return
 
     type_name = getattr(submission, "type", "item").capitalize()
@@ -106,8 +125,10 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # ===== APPROVE FLOW =====
     if action == "approve":
-        submission.status = "approved"
-        db.commit() # Save the status update
+        # Claim the item so a concurrent second click can't post it twice
+        if not await run_db(_decide, item_id, lifecycle.APPROVED):
+            await query.answer("⚠️ This item was already handled!", show_alert=True)
+            return
 
         rarity_text = f"{getattr(submission, 'rarity', '')}𝗥𝗔𝗥𝗜𝗧𝗬: {getattr(submission, 'rarity_name', '')}"
         new_caption = (
@@ -124,22 +145,22 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         group_msg = None
         group_post_link = None
 
-        # === Step 1: Send to group (no button) and pin ===
-        # === Step 1: Send to group (no button) and pin ===
+        # === Step 1: Send to group (with quick-bid buttons) and pin ===
         try:
-            group_msg = await context.bot.send_photo(
+            group_msg = await outbound.send_photo(
                 chat_id=int(GROUP_ID),
                 photo=str(getattr(submission, "file_id")),
                 caption=str(new_caption),
                 parse_mode="HTML",
+                reply_markup=quick_bid_keyboard(item_id),
             )
         
             # ✅ Save group message details in DB
-            submission.group_message_id= group_msg.message_id
-            db.commit()  # save immediately so it's not lost on errors later
+            await run_db(_save_group_message, item_id, group_msg.message_id)  # save immediately so it's not lost on errors later
+            message_index.remember(GROUP_ID, group_msg.message_id, item_id)
         
             # Pin message
-            await context.bot.pin_chat_message(chat_id=int(GROUP_ID), message_id=group_msg.message_id)
+            await outbound.call("pin_chat_message", int(GROUP_ID), Priority.ANNOUNCE, message_id=group_msg.message_id)
             # Try to build public group message link
             try:
                 group_chat = await context.bot.get_chat(GROUP_ID)
@@ -152,13 +173,12 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 group_post_link = None
 
             # Schedule unpin after 3 days
-            if isinstance(context.job_queue, JobQueue):
-                context.job_queue.run_once(
-                    unpin_after_delay,
-                    when=timedelta(days=3),
-                    data={"chat_id": GROUP_ID, "message_id": group_msg.message_id},
-                    name=f"unpin_{group_msg.message_id}",
-                )
+            await scheduled_jobs.schedule(
+                unpin_message,
+                datetime.now(timezone.utc) + timedelta(days=3),
+                int(GROUP_ID), group_msg.message_id,
+                job_id=f"unpin_{GROUP_ID}_{group_msg.message_id}",
+            )
 
         except Exception as e:
             print(f"[Error sending/pinning in group] {e}")
@@ -172,7 +192,7 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 [[InlineKeyboardButton("💸 Bid Now", url=bid_url)]]
             )
 
-            sent_msg = await context.bot.send_photo(
+            sent_msg = await outbound.send_photo(
                 chat_id=int(CHANNEL_ID),
                 photo=str(getattr(submission, "file_id")),
                 caption=str(new_caption),
@@ -184,12 +204,10 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # === Step 3: Save info in DB ===
         if sent_msg:
-            submission.channel_id = CHANNEL_ID
-            submission.channel_message_id = sent_msg.message_id
-            submission.expires_at = datetime.utcnow() + timedelta(days=3)
-            submission.is_expired = False
-            submission.status = "approved"
-            db.commit()
+            submission = await run_db(_save_channel_post, item_id, sent_msg.message_id)
+            expiry_scheduler.schedule(item_id, submission.expires_at)
+            catalog.add(submission)
+            message_index.remember(CHANNEL_ID, sent_msg.message_id, item_id)
 
         # === Step 4: Build channel post link ===
         try:
@@ -212,8 +230,9 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 f"🎬 <b>Anime:</b> {getattr(submission, 'anime_name')}"
             )
 
-            await context.bot.send_photo(
+            await outbound.send_photo(
                 chat_id=user_chat_id,
+                priority=Priority.NOTIFY,
                 photo=str(getattr(submission, "file_id")),
                 caption=user_caption,
                 parse_mode="HTML",
@@ -226,8 +245,9 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             print(f"[Error notifying user] {e}")
     # ===== REJECT FLOW =====
     else:
-        submission.status = "rejected"
-        db.commit()
+        if not await run_db(_decide, item_id, lifecycle.REJECTED):
+            await query.answer("⚠️ This item was already handled!", show_alert=True)
+            return
         try:
             caption = (
                 f"❌ <b>Your {type_name} submission was rejected.</b>\n\n"
@@ -239,8 +259,9 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 caption += f"🏷️ <b>Tag:</b> {getattr(submission, 'optional_tag')}\n"
             caption += "\nPlease review and try again!"
 
-            await context.bot.send_photo(
+            await outbound.send_photo(
                 chat_id=int(getattr(submission, "user_id")),
+                priority=Priority.NOTIFY,
                 photo=str(getattr(submission, "file_id")),
                 caption=caption,
                 parse_mode="HTML",
@@ -248,8 +269,6 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception as e:
             print(f"[Error sending rejection notice] {e}")
 
-    db.close()
-
     # Update admin caption
     final_caption += f"\n\n{status_text}"
     try:
@@ -258,7 +277,12 @@ async def approval_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pass
 
 
-# ====== HANDLERS LIST FOR approval_handler.py ======
-approval_handlers = [
-    CallbackQueryHandler(approval_handler, pattern="^(approve|reject)_"),
-]
\ No newline at end of file
+# ====== REGISTER CALLBACK ROUTES ======
+def register_approval_routes():
+    """Approve/reject buttons on submissions in the log group (this module has no other handlers)."""
+    callback_router.add_routes("ap", {
+        "ok": partial(approval_handler, action="approve"),
+        "no": partial(approval_handler, action="reject"),
+    })
+    callback_router.alias(r"^approve_(\d+)$", "ap:ok:{}")
+    callback_router.alias(r"^reject_(\d+)$", "ap:no:{}")
\ No newline at end of file
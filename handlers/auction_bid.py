@@ -1,45 +1,51 @@
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler
-from utils.database import SessionLocal
-from models.tables import Submission, User
-from models.global_ban import GlobalBan
-from config import GROUP_ID, CHANNEL_ID, GROUP_URL, CHANNEL_URL
+from telegram.ext import ContextTypes, CommandHandler
+from utils.eligibility import NOT_BANNED, STARTED, MEMBER
+from config import GROUP_ID, CHANNEL_ID, GROUP_URL, CHANNEL_URL, MIN_BID_INCREMENT, QUICK_BID_STEPS
 from utils.tg_links import build_user_link
-
-
-# ====== COMMON HELPER FUNCTIONS ======
-async def has_started_bot(user_id: int) -> bool:
-    session = SessionLocal()
-    try:
-        return session.query(User).filter_by(id=user_id).first() is not None
-    finally:
-        session.close()
-
-
-async def is_member(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
-    try:
-        member_group = await context.bot.get_chat_member(GROUP_ID, user_id)
-        member_channel = await context.bot.get_chat_member(CHANNEL_ID, user_id)
-        return (
-            member_group.status not in ("left", "kicked") and
-            member_channel.status not in ("left", "kicked")
-        )
-    except Exception:
-        return False
-
-
-async def check_user_status(user_id: int) -> str:
-    """Returns 'banned', 'not_started', or 'ok'"""
-    session = SessionLocal()
-    try:
-        if session.query(GlobalBan).filter_by(user_id=str(user_id)).first():
-            return "banned"
-    finally:
-        session.close()
-    if not await has_started_bot(user_id):
-        return "not_started"
-    return "ok"
+from utils.bid_engine import place_bid, set_max_bid, clear_max_bid, current_price, BidStatus
+from utils.catalog import catalog
+from utils.caption_coalescer import caption_coalescer, CaptionEdit
+from utils.outbound import outbound, Priority
+from utils.message_index import message_index, post_key
+from utils.callback_router import callback_router, callback_data
+
+
+# ====== CAPTIONS ======
+def build_bid_caption(submission) -> str:
+    """Caption of a live auction post, showing the current highest bid."""
+    bidder_link = build_user_link(submission.last_bidder_id, name=submission.last_bidder_username)
+    return (
+        f"🆔 Item ID: {submission.id}\n"
+        f"🎬 Anime: {submission.anime_name}\n"
+        f"💞 {submission.type.capitalize()}: {submission.waifu_name}\n"
+        f"💎 Rarity: {submission.rarity_name} {submission.rarity}\n\n"
+        f"💰 Base Bid: {submission.base_bid}\n"
+        f"🏆 Highest Bid: {submission.current_bid} by {bidder_link}"
+    )
+
+
+def quick_bid_keyboard(item_id: int) -> InlineKeyboardMarkup:
+    """One button per QUICK_BID_STEPS on the group post; callback data is `bd:qb:<item_id>:<steps>`."""
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton(f"+{MIN_BID_INCREMENT * steps}", callback_data=callback_data("bd", "qb", item_id, steps))
+        for steps in QUICK_BID_STEPS
+    ]])
+
+
+def bid_caption_edits(submission) -> list[CaptionEdit]:
+    """Caption edits for the channel post (with bid button) and the pinned group post (with quick bids)."""
+    caption = build_bid_caption(submission)
+    bid_url = f"{GROUP_URL}?start=bid_{submission.id}"
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("💸 Bid Now", url=bid_url)]])
+
+    edits = []
+    if submission.channel_message_id:
+        edits.append(CaptionEdit(int(CHANNEL_ID), submission.channel_message_id, caption, keyboard))
+    if submission.group_message_id:
+        edits.append(CaptionEdit(int(GROUP_ID), submission.group_message_id, caption, quick_bid_keyboard(submission.id)))
+    return edits
 
 
 # =================== /bid Command ===================
@@ -47,26 +53,31 @@ async def bid_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     chat_id = update.effective_chat.id
 
-    # 1️⃣ Check user eligibility
-    status = await check_user_status(user.id)
-    if status == "banned":
-        await update.message.reply_text("🚫 You are globally banned from using this bot.")
+    def reply(text: str, **kwargs):
+        # Queued in the ack's lane, ahead of caption edits and announcements. Not
+        # awaited: in a bidding rush the group's bucket would hold the update slot.
+        outbound.send_message_nowait(chat_id, text, Priority.BID_ACK, reply_to_message_id=update.message.message_id, **kwargs)
+
+    # 1️⃣ Check user eligibility (cheapest first, see utils/eligibility.py)
+    failed = await context.eligibility.first_failure(NOT_BANNED, STARTED, MEMBER)
+    if failed == NOT_BANNED:
+        reply("🚫 You are globally banned from using this bot.")
         return
-    if status == "not_started":
+    if failed == STARTED:
         keyboard = [[InlineKeyboardButton("▶️ Start Bot", url=f"https://t.me/{context.bot.username}?start=1")]]
-        await update.message.reply_text(
+        reply(
             "<b>⚠️ You need to start the bot first!</b>",
             parse_mode="HTML",
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
         return
-    if not await is_member(user.id, context):
+    if failed == MEMBER:
         keyboard = [
             [InlineKeyboardButton("📣 Join Group", url=GROUP_URL),
              InlineKeyboardButton("📢 Join Channel", url=CHANNEL_URL)],
-            [InlineKeyboardButton("🔁 Try Again", callback_data="recheck_bid")]
+            [InlineKeyboardButton("🔁 Try Again", callback_data=callback_data("bd", "rc"))]
         ]
-        await update.message.reply_text(
+        reply(
             "<b>⚠️ You must join the main group and channel to place a bid.</b>",
             parse_mode="HTML",
             reply_markup=InlineKeyboardMarkup(keyboard)
@@ -75,144 +86,223 @@ async def bid_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # 2️⃣ Must be in main group
     if chat_id != int(GROUP_ID):
-        await update.message.reply_text("⚠️ You can only bid in the main auction group.")
+        reply("⚠️ You can only bid in the main auction group.")
         return
 
-    session = SessionLocal()
     try:
         item_id = None
         bid_amount = None
 
-        # 3️⃣ If message is a reply — try to detect item_id from the replied post
+        # 3️⃣ If message is a reply — look the replied post up in the message index
         if update.message.reply_to_message:
-            replied_msg = update.message.reply_to_message
-
-            # Try to extract item_id from the caption or text
-            if replied_msg.caption and "🆔 Item ID:" in replied_msg.caption:
-                try:
-                    item_id = int(replied_msg.caption.split("🆔 Item ID:")[1].split("\n")[0].strip())
-                except Exception:
-                    pass
-            elif replied_msg.text and "🆔 Item ID:" in replied_msg.text:
-                try:
-                    item_id = int(replied_msg.text.split("🆔 Item ID:")[1].split("\n")[0].strip())
-                except Exception:
-                    pass
+            item_id = await message_index.resolve(*post_key(update.message.reply_to_message))
 
             # Parse bid amount (since user wrote /bid <amount>)
             if len(context.args) >= 1:
                 try:
                     bid_amount = int(context.args[0])
                 except ValueError:
-                    await update.message.reply_text("⚠️ Invalid amount. Use: /bid <amount>")
+                    reply("⚠️ Invalid amount. Use: /bid <amount>")
                     return
 
         # 4️⃣ Fallback: normal command /bid <item_id> <amount>
         else:
             if len(context.args) < 2:
-                await update.message.reply_text("Usage:\n• Reply: /bid <amount>\n• Or: /bid <item_id> <amount>")
+                reply("Usage:\n• Reply: /bid <amount>\n• Or: /bid <item_id> <amount>")
                 return
 
             try:
                 item_id = int(context.args[0])
                 bid_amount = int(context.args[1])
             except ValueError:
-                await update.message.reply_text("⚠️ Invalid format. Use: /bid <item_id> <amount>")
+                reply("⚠️ Invalid format. Use: /bid <item_id> <amount>")
                 return
 
         # ✅ Now we must have both values
         if not item_id or not bid_amount:
-            await update.message.reply_text("⚠️ Could not determine the item ID. Please reply to the auction post or use /bid <item_id> <amount>.")
+            reply("⚠️ Could not determine the item ID. Please reply to the auction post or use /bid <item_id> <amount>.")
             return
 
-        # 5️⃣ Fetch item
-        submission = session.query(Submission).filter(Submission.id == item_id).first()
-        if not submission:
-            await update.message.reply_text("❌ Item not found.")
-            return
+        # 5️⃣ Validate and apply the bid atomically
+        bidder_username = f"@{user.username}" if user.username else user.first_name
+        result = await place_bid(item_id, user.id, bidder_username, bid_amount)
 
+        if result.status is BidStatus.NOT_FOUND:
+            reply("❌ Item not found.")
+            return
         # 🚫 Block bidding on ended or expired items
-        if submission.is_expired or submission.status in ["ended", "sold", "cancelled"]:
-            await update.message.reply_text("🚫 This auction has already ended. You can’t bid anymore.")
+        if result.status is BidStatus.ENDED:
+            reply("🚫 This auction has already ended. You can’t bid anymore.")
             return
-
         # 🚫 Prevent self-bidding
-        if submission.user_id == user.id:
-            await update.message.reply_text("🚫 You can’t bid on your own waifu/husbando.")
+        if result.status is BidStatus.SELF_BID:
+            reply("🚫 You can’t bid on your own waifu/husbando.")
             return
-
         # 💰 Check bid validity
-        current_bid = submission.current_bid or submission.base_bid or 0
-        min_next = current_bid + 5
-        if bid_amount < min_next:
-            await update.message.reply_text(f"⚠️ Minimum next bid is {min_next}.")
+        if result.status is BidStatus.TOO_LOW:
+            reply(f"⚠️ Minimum next bid is {result.min_next}.")
             return
 
-        # ✅ Update bidders history
-        previous_bidders = submission.previous_bidders or []
-        new_bidder = {
-            "id": user.id,
-            "username": f"@{user.username}" if user.username else user.first_name,
-            "bid": bid_amount,
-            "time": datetime.utcnow().isoformat()
-        }
-
-        previous_bidders.append(new_bidder)
-        if len(previous_bidders) > 2:
-            previous_bidders = previous_bidders[-2:]
-
-        submission.previous_bidders = previous_bidders
-        submission.current_bid = bid_amount
-        submission.last_bidder_id = user.id
-        submission.last_bidder_username = new_bidder["username"]
-        submission.last_bid_time = datetime.utcnow()
-        session.commit()
-
-        # 6️⃣ Update post captions
-        user_link = build_user_link(user)
-        caption = (
-            f"🆔 Item ID: {submission.id}\n"
-            f"🎬 Anime: {submission.anime_name}\n"
-            f"💞 {submission.type.capitalize()}: {submission.waifu_name}\n"
-            f"💎 Rarity: {submission.rarity_name} {submission.rarity}\n\n"
-            f"💰 Base Bid: {submission.base_bid}\n"
-            f"🏆 Highest Bid: {submission.current_bid} by {user_link}"
+        submission = result.submission
+
+        # 6️⃣ Update post captions (coalesced per item during bidding wars)
+        caption_coalescer.submit(item_id, bid_caption_edits(submission), version=submission.current_bid)
+
+        if result.outbid_by_proxy:
+            ack = (f"⚠️ Your bid of {bid_amount} on item #{item_id} was placed, but another bidder's "
+                   f"maximum is higher. Current price: {submission.current_bid}.")
+        else:
+            ack = f"✅ You placed a bid of {bid_amount} on item #{item_id}!"
+        reply(ack)
+
+    except Exception as e:
+        print(f"[BID COMMAND ERROR] {e}")
+        reply("❌ Something went wrong. Please try again later.")
+
+
+# Why a quick bid or /maxbid was turned away (eligibility check or BidStatus)
+BID_REFUSALS = {
+    NOT_BANNED: "🚫 You are globally banned from using this bot.",
+    STARTED: "⚠️ You need to start the bot first!",
+    MEMBER: "⚠️ You must join the main group and channel to place a bid.",
+    BidStatus.NOT_FOUND: "❌ Item not found.",
+    BidStatus.ENDED: "🚫 This auction has already ended. You can’t bid anymore.",
+    BidStatus.SELF_BID: "🚫 You can’t bid on your own waifu/husbando.",
+}
+
+
+# ====== QUICK BID CALLBACK ======
+async def quick_bid(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    `bd:qb:<item_id>:<steps>` from the group post: bid the current price plus
+    steps × MIN_BID_INCREMENT. Hopeless taps are turned away from the catalog
+    without touching the DB, and the answer is a toast instead of a group message.
+    """
+    query = update.callback_query
+    if query is None or query.data is None:
+        return
+    user = query.from_user
+
+    def answer(text: str | None = None, **kwargs):
+        outbound.answer_callback_nowait(query.id, text=text, **kwargs)
+
+    try:
+        item_id, steps = map(int, context.args)
+    except ValueError:
+        item_id, steps = None, None
+    if steps not in QUICK_BID_STEPS:
+        answer()
+        return
+
+    failed = await context.eligibility.first_failure(NOT_BANNED, STARTED, MEMBER)
+    if failed:
+        answer(BID_REFUSALS[failed], show_alert=True)
+        return
+
+    # Fast path: the catalog knows whether the auction runs, whose it is and its price
+    listing = catalog.get(item_id)
+    if listing is None or not listing.is_live(datetime.utcnow()):
+        answer(BID_REFUSALS[BidStatus.ENDED], show_alert=True)
+        return
+    if listing.user_id == user.id:
+        answer(BID_REFUSALS[BidStatus.SELF_BID], show_alert=True)
+        return
+
+    amount = current_price(listing) + MIN_BID_INCREMENT * steps
+    bidder_username = f"@{user.username}" if user.username else user.first_name
+    try:
+        result = await place_bid(item_id, user.id, bidder_username, amount)
+    except Exception as e:
+        print(f"[QUICK BID ERROR] {e}")
+        answer("❌ Something went wrong. Please try again later.", show_alert=True)
+        return
+
+    if result.status is BidStatus.TOO_LOW:
+        # Someone else's bid landed between our price read and the update
+        answer(f"⚠️ You were outbid just now. Minimum next bid is {result.min_next}.", show_alert=True)
+        return
+    if not result.accepted:
+        answer(BID_REFUSALS[result.status], show_alert=True)
+        return
+
+    caption_coalescer.submit(item_id, bid_caption_edits(result.submission), version=result.submission.current_bid)
+    if result.outbid_by_proxy:
+        answer(
+            f"⚠️ Your bid of {amount} was placed, but another bidder's maximum is higher. "
+            f"Current price: {result.submission.current_bid}.",
+            show_alert=True,
         )
+        return
+    answer(f"✅ You placed a bid of {amount} on item #{item_id}!")
 
-        bid_url = f"{GROUP_URL}?start=bid_{item_id}"
-        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("💸 Bid Now", url=bid_url)]])
-
-        # Channel
-        try:
-            await context.bot.edit_message_caption(
-                chat_id=int(CHANNEL_ID),
-                message_id=submission.channel_message_id,
-                caption=caption,
-                parse_mode="HTML",
-                reply_markup=keyboard,
-            )
-        except Exception as e:
-            print(f"[Error updating channel post] {e}")
 
-        # Group
-        if submission.group_message_id:
-            try:
-                await context.bot.edit_message_caption(
-                    chat_id=int(GROUP_ID),
-                    message_id=submission.group_message_id,
-                    caption=caption,
-                    parse_mode="HTML"
-                )
-            except Exception as e:
-                print(f"[Error updating group post] {e}")
+# ====== /maxbid Command ======
+async def maxbid_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /maxbid <item_id> <amount> — private maximum bid. The bot outbids others on
+    the user's behalf, one increment at a time, up to <amount>; 0 withdraws it.
+    Only in private chat, so nobody else sees the maximum.
+    """
+    if update.message is None:
+        return
+    user = update.effective_user
+    chat_id = update.effective_chat.id
+
+    def reply(text: str, **kwargs):
+        outbound.send_message_nowait(chat_id, text, Priority.BID_ACK, reply_to_message_id=update.message.message_id, **kwargs)
+
+    if update.effective_chat.type != "private":
+        keyboard = [[InlineKeyboardButton("🔒 Open Private Chat", url=f"https://t.me/{context.bot.username}")]]
+        reply(
+            "⚠️ Send /maxbid to me in private so nobody sees your maximum.",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+        return
 
-        await update.message.reply_text(f"✅ You placed a bid of {bid_amount} on item #{item_id}!")
+    failed = await context.eligibility.first_failure(NOT_BANNED, STARTED, MEMBER)
+    if failed:
+        reply(BID_REFUSALS[failed])
+        return
+
+    if len(context.args) != 2 or not all(arg.isdigit() for arg in context.args):
+        reply("Usage: /maxbid <item_id> <amount>\nUse 0 as the amount to withdraw your maximum.")
+        return
+    item_id, max_amount = int(context.args[0]), int(context.args[1])
 
+    try:
+        if max_amount == 0:
+            if await clear_max_bid(item_id, user.id):
+                reply(f"🗑️ Your maximum bid on item #{item_id} was withdrawn. Bids already placed stand.")
+            else:
+                reply(f"ℹ️ You have no maximum bid on item #{item_id}.")
+            return
+
+        bidder_username = f"@{user.username}" if user.username else user.first_name
+        result = await set_max_bid(item_id, user.id, bidder_username, max_amount)
     except Exception as e:
-        print(f"[BID COMMAND ERROR] {e}")
-        await update.message.reply_text("❌ Something went wrong. Please try again later.")
-    finally:
-        session.close()
+        print(f"[MAXBID COMMAND ERROR] {e}")
+        reply("❌ Something went wrong. Please try again later.")
+        return
+
+    if result.status is BidStatus.TOO_LOW:
+        reply(f"⚠️ Your maximum must be at least {result.min_next}.")
+        return
+    if not result.accepted:
+        reply(BID_REFUSALS[result.status])
+        return
+
+    submission = result.submission
+    caption_coalescer.submit(item_id, bid_caption_edits(submission), version=submission.current_bid)
+    if result.outbid_by_proxy:
+        reply(
+            f"⚠️ Your maximum of {max_amount} on item #{item_id} is saved, but another bidder's maximum "
+            f"is higher. Current price: {submission.current_bid}."
+        )
+    else:
+        reply(
+            f"✅ Your maximum of {max_amount} on item #{item_id} is saved. "
+            f"You lead at {submission.current_bid}; the bot will answer higher bids up to your maximum."
+        )
 
 
 # ====== RECHECK CALLBACK ======
@@ -220,23 +310,30 @@ async def recheck_bid(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     if not query:
         return
-    user = query.from_user
-    await query.answer()
+    outbound.answer_callback_nowait(query.id)
+
+    def edit(text: str, **kwargs):
+        if query.message is not None:
+            outbound.call_nowait(
+                "edit_message_text", query.message.chat_id, Priority.BID_ACK,
+                message_id=query.message.message_id, text=text, **kwargs,
+            )
 
     # ✅ Only recheck membership — don't rerun /bid
-    if not await is_member(user.id, context):
+    context.eligibility.forget(MEMBER)  # they may have just joined
+    if await context.eligibility.first_failure(MEMBER):
         keyboard = [
             [InlineKeyboardButton("📣 Join Group", url=GROUP_URL),
              InlineKeyboardButton("📢 Join Channel", url=CHANNEL_URL)],
-            [InlineKeyboardButton("🔁 Try Again", callback_data="recheck_bid")]
+            [InlineKeyboardButton("🔁 Try Again", callback_data=callback_data("bd", "rc"))]
         ]
-        await query.edit_message_text(
+        edit(
             "<b>⚠️ You must join the main group and channel to place a bid.</b>",
             parse_mode="HTML",
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
     else:
-        await query.edit_message_text(
+        edit(
             "✅ You’ve successfully joined the group and channel!\nYou can now place bids using /bid.",
             parse_mode="HTML"
         )
@@ -245,5 +342,12 @@ async def recheck_bid(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ====== HANDLER LIST ======
 auction_bid_handlers = [
     CommandHandler("bid", bid_command),
-    CallbackQueryHandler(recheck_bid, pattern="^recheck_bid$"),
-]
\ No newline at end of file
+    CommandHandler("maxbid", maxbid_command),
+]
+
+callback_router.add_routes("bd", {
+    "rc": recheck_bid,
+    "qb": quick_bid,
+})
+callback_router.alias(r"^recheck_bid$", "bd:rc")
+callback_router.alias(r"^qb:(\d+):(\d+)$", "bd:qb:{}:{}")
\ No newline at end of file
@@ -9,21 +9,30 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-from utils.database import SessionLocal
+from utils.database import run_db, release_session
 from models.tables import Submission
-from .add_command import is_private_chat, RARITY_MAP # Assuming relative import for shared components
+from utils import lifecycle
+from .add_command import RARITY_MAP # Assuming relative import for shared components
 from config import LOG_GROUP_ID
+from utils.outbound import outbound, Priority
+from utils.callback_router import callback_data
+from utils import add_flow as flow
+from utils.add_flow import add_flow
 # ====== CONFIG (Placeholder for logs group) ======
  # Placeholder for your actual LOG_GROUP_ID
 
 
+# ====== DB HELPERS ======
+def _create_submission(session, **fields) -> int:
+    new_submission = Submission(**fields)
+    session.add(new_submission)
+    session.flush()
+    return new_submission.id
+
+
 # ====== BASE BID HANDLER ======
 async def handle_base_bid(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_private_chat(update):
-        return
-    if not context.user_data.get("awaiting_bid"):
-        return  # Ignore if we’re not expecting a bid
-
+    """Only reached by users at the base-bid step of /add in private chat (see utils/add_flow.py)."""
     user = update.message.from_user
     text = update.message.text.strip()
 
@@ -33,61 +42,63 @@ async def handle_base_bid(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     base_bid = int(text)
-    context.user_data["base_bid"] = base_bid
-    context.user_data.pop("awaiting_bid", None)  # Clear state
+    draft = await add_flow.finish(context, user.id)  # claims the draft first, so a double send submits once
+    if draft is None:
+        await update.message.reply_text("⚠️ Please start again using /add.")
+        return
 
     # Save submission to DB
-    db = SessionLocal()
-    item_id = None
     try:
-        new_submission = Submission(
+        item_id = await run_db(
+            _create_submission,
             user_id=int(user.id),
             user_name=user.first_name or "N/A",
             username=f"@{user.username}" if user.username else "N/A",
-            type=context.user_data["type"],
-            rarity=context.user_data["rarity"],
-            rarity_name=RARITY_MAP.get(context.user_data["rarity"], "Unknown"),
-            anime_name=context.user_data["anime_name"],
-            waifu_name=context.user_data["waifu_name"],
-            optional_tag=context.user_data["optional_tag"],
-            caption=context.user_data["caption"],
-            file_id=context.user_data["file_id"],
+            type=draft.type,
+            rarity=draft.rarity,
+            rarity_name=RARITY_MAP.get(draft.rarity, "Unknown"),
+            anime_name=draft.anime_name,
+            waifu_name=draft.waifu_name,
+            optional_tag=draft.optional_tag,
+            caption=draft.caption,
+            file_id=draft.file_id,
             submitted_time=datetime.now(),
             base_bid=base_bid,
-            status="pending",
+            status=lifecycle.PENDING,
         )
-        db.add(new_submission)
-        db.commit()
-        db.refresh(new_submission)
-        item_id = new_submission.id
-    finally:
-        db.close()
+        await release_session()  # commit here, so a failed commit is caught below too
+    except Exception as e:
+        print(f"[Error saving submission of {user.id}] {e}")
+        add_flow.restore(context, user.id, draft)  # nothing is lost; the user can just resend
+        await update.message.reply_text("❌ Couldn't save your submission. Please send the base bid again.")
+        return
 
     # Send to logs group
     log_caption = (
-        f"📩 <b>New {context.user_data['type'].capitalize()} Submission</b>\n\n"
+        f"📩 <b>New {draft.type.capitalize()} Submission</b>\n\n"
         f"🆔 <b>Item ID:</b> <code>{item_id}</code>\n"
         f"👤 <b>Name:</b> {user.first_name}\n"
         f"🔗 <b>Username:</b> @{user.username if user.username else 'N/A'}\n"
-        f"🎬 <b>Anime:</b> {context.user_data['anime_name']}\n"
-        f"💞 <b>{context.user_data['type'].capitalize()}:</b> {context.user_data['waifu_name']}\n"
-        f"💎 <b>Rarity:</b> {RARITY_MAP.get(context.user_data['rarity'])} {context.user_data['rarity']}\n"
+        f"🎬 <b>Anime:</b> {draft.anime_name}\n"
+        f"💞 <b>{draft.type.capitalize()}:</b> {draft.waifu_name}\n"
+        f"💎 <b>Rarity:</b> {RARITY_MAP.get(draft.rarity)} {draft.rarity}\n"
         f"💰 <b>Base Bid:</b> {base_bid}\n"
-        f"🏷️ <b>Tag:</b> {context.user_data['optional_tag']}\n"
+        f"🏷️ <b>Tag:</b> {draft.optional_tag}\n"
         f"⏰ <b>Submitted:</b> {datetime.now().strftime('%d %B %Y • %I:%M %p')}"
     )
 
     keyboard = [
         [
-            InlineKeyboardButton("✅ Approve", callback_data=f"approve_{item_id}"),
-            InlineKeyboardButton("❌ Reject", callback_data=f"reject_{item_id}"),
+            InlineKeyboardButton("✅ Approve", callback_data=callback_data("ap", "ok", item_id)),
+            InlineKeyboardButton("❌ Reject", callback_data=callback_data("ap", "no", item_id)),
         ]
     ]
 
     try:
-        await context.bot.send_photo(
+        await outbound.send_photo(
             chat_id=int(LOG_GROUP_ID),
-            photo=context.user_data["file_id"],
+            priority=Priority.LOG,
+            photo=draft.file_id,
             caption=log_caption,
             parse_mode="HTML",
             reply_markup=InlineKeyboardMarkup(keyboard),
@@ -97,11 +108,8 @@ async def handle_base_bid(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text("✅ Sent to the owner for approval!")
 
-    # Clear temp data
-    context.user_data.clear()
-    
 
 # ====== HANDLERS LIST FOR bid_handler.py ======
 bid_handlers = [
-    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_base_bid),
+    MessageHandler(add_flow.awaiting(flow.BASE_BID) & filters.TEXT & ~filters.COMMAND, handle_base_bid),
 ]
\ No newline at end of file
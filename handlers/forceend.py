@@ -1,18 +1,35 @@
-import asyncio
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CommandHandler
-from utils.database import SessionLocal
+from utils.database import run_db
 from models.tables import Submission
-from config import LOG_GROUP_ID, GROUP_ID, ADMINS , OWNER_ID
+from utils import lifecycle
+from config import LOG_GROUP_ID, GROUP_ID, CHANNEL_ID, ADMINS , OWNER_ID
 from utils.tg_links import build_user_link
+from utils.caption_coalescer import caption_coalescer
+from utils.outbound import outbound, Priority
+from tasks.expiry_scheduler import expiry_scheduler
+from utils.catalog import catalog
+
+
+# ====== DB HELPERS ======
+def _get_submission(session, item_id):
+    return session.query(Submission).filter(Submission.id == item_id).first()
+
+
+def _end_auction(session, item_id):
+    """approved -> ended; returns the submission, or None if it was not running any more."""
+    ended = lifecycle.transition(
+        session, item_id, lifecycle.APPROVED, lifecycle.ENDED,
+        is_expired=True, expires_at=datetime.utcnow(),
+    )
+    return _get_submission(session, item_id) if ended else None
 
 
 async def forceend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Allows bot owner/admins to force-end an auction manually."""
     user = update.effective_user
-    chat_id = update.effective_chat.id
-                                              
+
     # ✅ Check if the user is bot owner or admin
     if user.id not in ADMINS and user.id != OWNER_ID:
         return
@@ -22,26 +39,25 @@ async def forceend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Usage: /forceend <item_id>")
         return
 
-    item_id = context.args[0]
-    session = SessionLocal()
+    if not context.args[0].isdigit():
+        await update.message.reply_text("⚠️ Usage: /forceend <item_id>")
+        return
+    item_id = int(context.args[0])
 
-    submission = session.query(Submission).filter(Submission.id == item_id).first()
+    submission = await run_db(_get_submission, item_id)
     if not submission:
         await update.message.reply_text("❌ No item found with that ID.")
-        session.close()
-        return
-
-    if submission.status not in ["approved"]:
-        await update.message.reply_text("⚠️ This auction is not active or already ended.")
-        session.close()
         return
 
     try:
-        # --- Stop auction immediately ---
-        submission.is_expired = True
-        submission.status = "ended"
-        submission.expires_at = datetime.utcnow()
-        session.commit()
+        # --- Stop auction immediately (fails if it already ended or is being ended) ---
+        submission = await run_db(_end_auction, item_id)
+        if not submission:
+            await update.message.reply_text("⚠️ This auction is not active or already ended.")
+            return
+        caption_coalescer.discard(submission.id)  # no bid edit may land after the final caption
+        expiry_scheduler.cancel(submission.id)
+        catalog.remove(submission.id)
 
         type_name = getattr(submission, "type", "Waifu").capitalize()
         rarity_text = f"💎 Rarity: {getattr(submission, 'rarity_name', '')} ({getattr(submission, 'rarity', '')})"
@@ -76,7 +92,7 @@ async def forceend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
 
         # === 1️⃣ Send announcement to group ===
-        await context.bot.send_photo(
+        await outbound.send_photo(
             chat_id=GROUP_ID,
             photo=submission.file_id,
             caption=announcement,
@@ -87,15 +103,30 @@ async def forceend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # === 2️⃣ Edit channel post ===
         if getattr(submission, "channel_message_id", None):
             try:
-                await context.bot.edit_message_caption(
-                    chat_id=submission.channel_id,
+                await outbound.edit_message_caption(
+                    priority=Priority.ANNOUNCE,
+                    chat_id=submission.channel_id or CHANNEL_ID,
                     message_id=submission.channel_message_id,
                     caption=f"{announcement}\n\n⏰ <b>Auction Force-Ended by Admin</b>",
-                    parse_mode="HTML"
+                    parse_mode="HTML",
+                    reply_markup=InlineKeyboardMarkup([])
                 )
             except Exception as e:
                 print(f"⚠️ Failed to edit channel caption: {e}")
 
+        # --- Drop the quick-bid buttons from the group post ---
+        if getattr(submission, "group_message_id", None):
+            try:
+                await outbound.call(
+                    "edit_message_reply_markup",
+                    GROUP_ID,
+                    Priority.ANNOUNCE,
+                    message_id=submission.group_message_id,
+                    reply_markup=InlineKeyboardMarkup([]),
+                )
+            except Exception as e:
+                print(f"⚠️ Failed to remove quick-bid buttons: {e}")
+
         # === 3️⃣ Notify winner ===
         if submission.last_bidder_id:
             try:
@@ -106,7 +137,7 @@ async def forceend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     f"💰 Final Bid: <code>{submission.current_bid or 'N/A'}</code>\n"
                     f"🆔 Item ID: <code>{item_id}</code>"
                 )
-                await context.bot.send_message(
+                await outbound.send_message(
                     chat_id=submission.last_bidder_id,
                     text=msg,
                     parse_mode="HTML"
@@ -123,7 +154,7 @@ async def forceend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     f"🏆 Winner: {winner_link}\n"
                     f"💰 Final Bid: <code>{submission.current_bid or 'N/A'}</code>"
                 )
-                await context.bot.send_message(
+                await outbound.send_message(
                     chat_id=submission.user_id,
                     text=msg,
                     parse_mode="HTML"
@@ -134,8 +165,9 @@ async def forceend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # === 5️⃣ Log in admin group ===
         if LOG_GROUP_ID:
             try:
-                await context.bot.send_photo(
+                await outbound.send_photo(
                     chat_id=LOG_GROUP_ID,
+                    priority=Priority.LOG,
                     photo=submission.file_id,
                     caption=f"🛑 <b>Force-End Log</b>\n\n{announcement}",
                     parse_mode="HTML"
@@ -147,10 +179,7 @@ async def forceend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     except Exception as e:
         print(f"❌ Force end failed: {e}")
-        session.rollback()
         await update.message.reply_text("❌ Something went wrong while ending this auction.")
-    finally:
-        session.close()
 
 
 def forceend_handler():
@@ -2,14 +2,33 @@ import asyncio
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
-from utils.database import SessionLocal
+from utils.database import run_db
 from models.global_ban import GlobalBan
 from config import LOG_GROUP_ID, OWNER_ID, ADMINS
+from utils.outbound import outbound, Priority
+from utils.ban_cache import ban_cache
 
 # ===== CHECK IF USER IS ADMIN OR OWNER =====
 def is_admin_or_owner(user_id: int) -> bool:
     return user_id == OWNER_ID or user_id in ADMINS
 
+# ===== DB HELPERS =====
+def _add_ban(session, user_id: int, reason: str, banned_by: int) -> bool:
+    """Insert a ban. Returns False if the user is already banned."""
+    if session.query(GlobalBan).filter_by(user_id=user_id).first():
+        return False
+    session.add(GlobalBan(user_id=user_id, reason=reason, banned_by=banned_by))
+    return True
+
+
+def _remove_ban(session, user_id: int) -> bool:
+    """Delete a ban. Returns False if the user wasn't banned."""
+    existing = session.query(GlobalBan).filter_by(user_id=user_id).first()
+    if not existing:
+        return False
+    session.delete(existing)
+    return True
+
 # ===== ADD GLOBAL BAN =====
 async def aban(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
@@ -37,31 +56,23 @@ async def aban(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     reason = " ".join(context.args[1:]) if len(context.args) > 1 else "No reason provided."
 
-    session = SessionLocal()
-    try:
-        # Check if already banned
-        existing = session.query(GlobalBan).filter_by(user_id=target.id).first()
-        if existing:
-            return await update.message.reply_text(f"⚠️ {target.mention_html()} is already globally banned.", parse_mode="HTML")
-
-        # Add new ban
-        new_ban = GlobalBan(user_id=target.id, reason=reason, banned_by=user.id)
-        session.add(new_ban)
-        session.commit()
-
-        # Log message
-        log_text = (
-            f"🚨 <b>Global Ban Executed</b>\n\n"
-            f"<b>Banned User:</b> {target.mention_html()} (`{target.id}`)\n"
-            f"<b>By:</b> {user.mention_html()} (`{user.id}`)\n"
-            f"<b>Reason:</b> {reason}\n"
-            f"<b>Time:</b> {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}"
-        )
-        await context.bot.send_message(LOG_GROUP_ID, log_text, parse_mode="HTML")
-
-        await update.message.reply_text(f"✅ {target.mention_html()} has been globally banned.\nReason: {reason}", parse_mode="HTML")
-    finally:
-        session.close()
+    # Add new ban (skips if already banned)
+    if not await run_db(_add_ban, target.id, reason, user.id):
+        ban_cache.add(target.id)  # already in the table; make sure the cache agrees
+        return await update.message.reply_text(f"⚠️ {target.mention_html()} is already globally banned.", parse_mode="HTML")
+    ban_cache.add(target.id)
+
+    # Log message
+    log_text = (
+        f"🚨 <b>Global Ban Executed</b>\n\n"
+        f"<b>Banned User:</b> {target.mention_html()} (`{target.id}`)\n"
+        f"<b>By:</b> {user.mention_html()} (`{user.id}`)\n"
+        f"<b>Reason:</b> {reason}\n"
+        f"<b>Time:</b> {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}"
+    )
+    await outbound.send_message(LOG_GROUP_ID, log_text, Priority.LOG, parse_mode="HTML")
+
+    await update.message.reply_text(f"✅ {target.mention_html()} has been globally banned.\nReason: {reason}", parse_mode="HTML")
 
 # ===== REMOVE GLOBAL BAN =====
 async def unaban(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -82,22 +93,16 @@ async def unaban(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception:
             return await update.message.reply_text("❌ Invalid user ID.")
 
-    session = SessionLocal()
-    try:
-        existing = session.query(GlobalBan).filter_by(user_id=target.id).first()
-        if not existing:
-            return await update.message.reply_text(f"⚠️ {target.mention_html()} is not globally banned.", parse_mode="HTML")
-
-        session.delete(existing)
-        session.commit()
-
-        log_text = (
-            f"✅ <b>Global Unban Executed</b>\n\n"
-            f"<b>User:</b> {target.mention_html()} (`{target.id}`)\n"
-            f"<b>By:</b> {user.mention_html()} (`{user.id}`)"
-        )
-        await context.bot.send_message(LOG_GROUP_ID, log_text, parse_mode="HTML")
-
-        await update.message.reply_text(f"✅ {target.mention_html()} has been unbanned globally.", parse_mode="HTML")
-    finally:
-        session.close()
\ No newline at end of file
+    if not await run_db(_remove_ban, target.id):
+        ban_cache.discard(target.id)
+        return await update.message.reply_text(f"⚠️ {target.mention_html()} is not globally banned.", parse_mode="HTML")
+    ban_cache.discard(target.id)
+
+    log_text = (
+        f"✅ <b>Global Unban Executed</b>\n\n"
+        f"<b>User:</b> {target.mention_html()} (`{target.id}`)\n"
+        f"<b>By:</b> {user.mention_html()} (`{user.id}`)"
+    )
+    await outbound.send_message(LOG_GROUP_ID, log_text, Priority.LOG, parse_mode="HTML")
+
+    await update.message.reply_text(f"✅ {target.mention_html()} has been unbanned globally.", parse_mode="HTML")
\ No newline at end of file
@@ -10,6 +10,7 @@ USER_COMMANDS = [
     ("/items", "View all active auction items"),
     ("/myitems", "View your submitted items"),
     ("/bid &lt;item_id&gt; &lt;amount&gt;", "Place a bid on an item"),
+    ("/maxbid &lt;item_id&gt; &lt;amount&gt;", "Set a private maximum; the bot bids for you up to it (0 to withdraw, in DM)"),
     ("/help", "Show all available commands"),
 ]
 
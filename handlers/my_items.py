@@ -1,51 +1,80 @@
-from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler
-from handlers.add_command import is_globally_banned
-from utils.database import SessionLocal
-from models.tables import Submission, User
-from models.global_ban import GlobalBan
-from config import GROUP_ID, CHANNEL_ID, GROUP_URL, CHANNEL_URL, RARITY_MAP
-
-
-# ================= HELPER FUNCTIONS =================
-
-async def has_started_bot(user_id: int) -> bool:
-    """Check if user has started the bot."""
-    session = SessionLocal()
-    try:
-        user = session.query(User).filter_by(id=user_id).first()
-        return user is not None
-    finally:
-        session.close()
-
-
-async def is_member(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
-    """Check if user is in both group and channel."""
-    try:
-        member_group = await context.bot.get_chat_member(GROUP_ID, user_id)
-        member_channel = await context.bot.get_chat_member(CHANNEL_ID, user_id)
-        return (
-            member_group.status not in ("left", "kicked")
-            and member_channel.status not in ("left", "kicked")
-        )
-    except Exception:
-        return False
+from telegram.ext import ContextTypes, CommandHandler
+from utils.pagination import Cursor, page_number
+from utils.catalog import catalog
+from utils.page_cache import page_cache
+from utils.callback_router import callback_router, callback_data, CATEGORY_CODES, CATEGORIES
+from utils.eligibility import NOT_BANNED, STARTED, MEMBER
+from config import GROUP_URL, CHANNEL_URL, RARITY_MAP
+
+
+# ================= PAGE RENDERING =================
+
+RARITY_EMOJI = {name: emoji for emoji, name in RARITY_MAP.items()}
+
+
+def _item_link(item) -> str:
+    if item.channel_id and str(item.channel_id).startswith("-100"):
+        return f"https://t.me/c/{str(item.channel_id)[4:]}/{item.channel_message_id}"
+    return f"{CHANNEL_URL}/{item.channel_message_id}"
+
+
+# Callback data namespace of this menu, see utils/callback_router.py
+NS = "my"
+
+
+def _data(action: str, *args) -> str:
+    return callback_data(NS, action, *args)
+
 
+def _nav_buttons(action: str, args: tuple, page: int, results) -> list:
+    nav_buttons = []
+    if results.prev:
+        nav_buttons.append(InlineKeyboardButton("⏮️ Prev", callback_data=_data(action, *args, page - 1, results.prev.token())))
+    if results.next:
+        nav_buttons.append(InlineKeyboardButton("Next ⏭️", callback_data=_data(action, *args, page + 1, results.next.token())))
+    return [nav_buttons] if nav_buttons else []
 
-async def check_user_status(user_id: int) -> str:
-    """Check global ban and bot start status. Returns 'banned', 'not_started', or 'ok'."""
-    session = SessionLocal()
-    try:
-        if session.query(GlobalBan).filter_by(user_id=str(user_id)).first():
-            return "banned"
-    finally:
-        session.close()
 
-    if not await has_started_bot(user_id):
-        return "not_started"
+def _render_view_all(category: str, page: int, cursor: Cursor, seller: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Text and keyboard of one 'View All' page; cached by page_cache."""
+    results = catalog.page(category, cursor, seller=seller)
+    if not results.items:
+        return f"No ongoing {category} auctions found.", None
 
-    return "ok"
+    items_list = "".join(
+        f"{RARITY_EMOJI.get(item.rarity_name, '⭐')} <a href='{_item_link(item)}'>{item.id}. {item.waifu_name or 'Unnamed'}</a> ({item.anime_name or 'Unknown anime'})\n"
+        for item in results.items
+    )
+    page, total_pages = page_number(page if results.prev else 1, catalog.count(category, seller=seller))
+    buttons = _nav_buttons("va", (CATEGORY_CODES[category],), page, results)
+    buttons.append([
+        InlineKeyboardButton("⬅️ Back", callback_data=_data("ty", CATEGORY_CODES[category])),
+        InlineKeyboardButton("🗑️ Delete", callback_data=_data("del"))
+    ])
+    text = f"<b>💫 All {category.capitalize()} Auctions</b>\nPage {page}/{total_pages}\n\n{items_list}"
+    return text, InlineKeyboardMarkup(buttons)
+
+
+def _render_rarity(category: str, emoji: str, page: int, cursor: Cursor, seller: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Text and keyboard of one page filtered by rarity; cached by page_cache."""
+    rarity_name = RARITY_MAP.get(emoji, "Unknown")
+    results = catalog.page(category, cursor, rarity_name, seller=seller)
+    if not results.items:
+        return f"No ongoing {category} found with rarity {rarity_name} ({emoji}).", None
+
+    items_list = "".join(
+        f"• <a href='{_item_link(item)}'>{item.id}. {item.waifu_name or 'Unnamed'}</a> ({item.anime_name or 'Unknown anime'})\n"
+        for item in results.items
+    )
+    page, total_pages = page_number(page if results.prev else 1, catalog.count(category, rarity_name, seller=seller))
+    buttons = _nav_buttons("sr", (CATEGORY_CODES[category], emoji), page, results)
+    buttons.append([
+        InlineKeyboardButton("⬅️ Back", callback_data=_data("fr", CATEGORY_CODES[category])),
+        InlineKeyboardButton("🗑️ Delete", callback_data=_data("del"))
+    ])
+    text = f"{emoji} <b>{rarity_name}</b> {category.capitalize()}s\nPage {page}/{total_pages}\n\n{items_list}"
+    return text, InlineKeyboardMarkup(buttons)
 
 
 # ================= MAIN COMMAND HANDLER =================
@@ -54,14 +83,13 @@ async def items_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Main /items command."""
     if update.message is None:
         return
-    user = update.effective_user
 
-    # 1️⃣ Check global ban and bot start
-    status = await check_user_status(user.id)
-    if status == "banned":
+    # 1️⃣ Check global ban, bot start and membership (cheapest first, see utils/eligibility.py)
+    failed = await context.eligibility.first_failure(NOT_BANNED, STARTED, MEMBER)
+    if failed == NOT_BANNED:
         await update.message.reply_text("🚫 You are globally banned from using this bot.")
         return
-    if status == "not_started":
+    if failed == STARTED:
         keyboard = [[InlineKeyboardButton("▶️ Start Bot", url=f"https://t.me/{context.bot.username}?start=1")]]
         await update.message.reply_text(
             "<b>⚠️ You need to start the bot first!</b>\nClick below to start.",
@@ -71,13 +99,13 @@ async def items_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # 2️⃣ Membership check
-    if not await is_member(user.id, context):
+    if failed == MEMBER:
         keyboard = [
             [
                 InlineKeyboardButton("📣 Join Group", url=GROUP_URL),
                 InlineKeyboardButton("📢 Join Channel", url=CHANNEL_URL),
             ],
-            [InlineKeyboardButton("🔁 Try Again", callback_data="recheck_items")],
+            [InlineKeyboardButton("🔁 Try Again", callback_data=_data("rc"))],
         ]
         await update.message.reply_text(
             "<b>⚠️ You must join our main group and channel to use this feature.</b>\n\n"
@@ -99,15 +127,15 @@ async def recheck_items(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if query is None or query.message is None:
         return
     await query.answer()
-    user = update.effective_user
 
-    if not await is_member(user.id, context):
+    context.eligibility.forget(MEMBER)  # they may have just joined
+    if await context.eligibility.first_failure(MEMBER):
         keyboard = [
             [
                 InlineKeyboardButton("📣 Join Group", url=GROUP_URL),
                 InlineKeyboardButton("📢 Join Channel", url=CHANNEL_URL),
             ],
-            [InlineKeyboardButton("🔁 Try Again", callback_data="recheck_items")],
+            [InlineKeyboardButton("🔁 Try Again", callback_data=_data("rc"))],
         ]
         await query.edit_message_text(
             "<b>⚠️ You still need to join our group and channel.</b>\n\n"
@@ -124,30 +152,15 @@ async def recheck_items(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ================= CATEGORY MENU FUNCTION =================
 async def show_category_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, from_callback=False):
     """Displays user's Waifu / Husbando items."""
-    session = SessionLocal()
-    user_id = str(update.effective_user.id)
-    try:
-        now = datetime.utcnow()
-        waifu_count = session.query(Submission).filter(
-            Submission.type == "waifu",
-            Submission.user_id == user_id,
-            Submission.status == "approved",
-            Submission.expires_at > now,
-        ).count()
-        husbando_count = session.query(Submission).filter(
-            Submission.type == "husbando",
-            Submission.user_id == user_id,
-            Submission.status == "approved",
-            Submission.expires_at > now,
-        ).count()
-    finally:
-        session.close()
+    user_id = update.effective_user.id
+    waifu_count = catalog.count("waifu", seller=user_id)
+    husbando_count = catalog.count("husbando", seller=user_id)
 
     keyboard = []
     if waifu_count > 0:
-        keyboard.append([InlineKeyboardButton("💖 Waifu", callback_data="select_type_waifu")])
+        keyboard.append([InlineKeyboardButton("💖 Waifu", callback_data=_data("ty", "w"))])
     if husbando_count > 0:
-        keyboard.append([InlineKeyboardButton("💪 Husbando", callback_data="select_type_husbando")])
+        keyboard.append([InlineKeyboardButton("💪 Husbando", callback_data=_data("ty", "h"))])
 
     text = "Choose a category:" if (waifu_count or husbando_count) else "<b>You have no ongoing items.</b>"
 
@@ -171,20 +184,19 @@ async def type_selection_handler(update: Update, context: ContextTypes.DEFAULT_T
     if query is None or query.data is None:
         return
     await query.answer()
-    user = update.effective_user
 
-    if await is_globally_banned(user.id):
+    if await context.eligibility.first_failure(NOT_BANNED):
         if query.message:
             await query.edit_message_text("🚫 You are globally banned from using this bot.")
         return
 
-    _, _, category = query.data.split("_")
+    category = CATEGORIES[context.args[0]]
     keyboard = [
         [
-            InlineKeyboardButton("🌟 View All (Default)", callback_data=f"view_all_{category}_1"),
-            InlineKeyboardButton("🎯 Filter by Rarity", callback_data=f"filter_rarity_{category}")
+            InlineKeyboardButton("🌟 View All (Default)", callback_data=_data("va", CATEGORY_CODES[category], 1)),
+            InlineKeyboardButton("🎯 Filter by Rarity", callback_data=_data("fr", CATEGORY_CODES[category]))
         ],
-        [InlineKeyboardButton("⬅️ Back", callback_data="back")]
+        [InlineKeyboardButton("⬅️ Back", callback_data=_data("bk"))]
     ]
     if query.message:
         await query.edit_message_text(
@@ -202,73 +214,27 @@ async def view_all_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     user = update.effective_user
 
-    if await is_globally_banned(user.id):
+    if await context.eligibility.first_failure(NOT_BANNED):
         if query.message:
             await query.edit_message_text("🚫 You are globally banned from using this bot.")
         return
 
-    data = query.data.split("_")
-    category = data[2]
-    page = int(data[3]) if len(data) > 3 else 1
-
-    session = SessionLocal()
-    try:
-        now = datetime.utcnow()
-        results = session.query(Submission).filter(
-            Submission.type == category,
-            Submission.user_id == str(user.id),  # Only user's items
-            Submission.status == "approved",
-            Submission.expires_at > now
-        ).order_by(Submission.id.asc()).all()
-
-        total_items = len(results)
-        items_per_page = 10
-        start = (page - 1) * items_per_page
-        end = start + items_per_page
-        current_page_items = results[start:end]
-
-        if not current_page_items:
-            if query.message:
-                await query.edit_message_text(f"No ongoing {category} auctions found.", parse_mode="HTML")
-            return
-
-        items_list = ""
-        for item in current_page_items:
-            name = item.waifu_name or "Unnamed"
-            anime = item.anime_name or "Unknown anime"
-            message_id = item.channel_message_id
-            if item.channel_id and str(item.channel_id).startswith("-100"):
-                link = f"https://t.me/c/{str(item.channel_id)[4:]}/{message_id}"
-            else:
-                link = f"{CHANNEL_URL}/{message_id}"
-
-            emoji = next((k for k, v in RARITY_MAP.items() if v == item.rarity_name), "⭐")
-            items_list += f"{emoji} <a href='{link}'>{item.id}. {name}</a> ({anime})\n"
-
-        total_pages = (total_items + items_per_page - 1) // items_per_page
-        buttons = []
-        nav_buttons = []
-        if page > 1:
-            nav_buttons.append(InlineKeyboardButton("⏮️ Prev", callback_data=f"view_all_{category}_{page-1}"))
-        if end < total_items:
-            nav_buttons.append(InlineKeyboardButton("Next ⏭️", callback_data=f"view_all_{category}_{page+1}"))
-        if nav_buttons:
-            buttons.append(nav_buttons)
-
-        buttons.append([
-            InlineKeyboardButton("⬅️ Back", callback_data=f"select_type_{category}"),
-            InlineKeyboardButton("🗑️ Delete", callback_data="delete")
-        ])
+    args = context.args
+    category = CATEGORIES[args[0]]
+    page = int(args[1]) if len(args) > 1 and args[1].isdigit() else 1
+    cursor = Cursor.parse(args[2] if len(args) > 2 else None)
 
-        if query.message:
-            await query.edit_message_text(
-                text=f"<b>💫 All {category.capitalize()} Auctions</b>\nPage {page}/{total_pages}\n\n{items_list}",
-                parse_mode="HTML",
-                disable_web_page_preview=True,
-                reply_markup=InlineKeyboardMarkup(buttons)
-            )
-    finally:
-        session.close()
+    text, reply_markup = page_cache.get_or_render(
+        ("myitems", category, None, user.id, page, cursor), catalog.version(category, seller=user.id),
+        _render_view_all, category, page, cursor, user.id,
+    )
+    if query.message:
+        await query.edit_message_text(
+            text=text,
+            parse_mode="HTML",
+            disable_web_page_preview=True,
+            reply_markup=reply_markup
+        )
 
 
 # ================= DYNAMIC RARITY FILTER =================
@@ -280,46 +246,34 @@ async def filter_rarity_handler(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
     user = update.effective_user
 
-    if await is_globally_banned(user.id):
+    if await context.eligibility.first_failure(NOT_BANNED):
         if query.message:
             await query.edit_message_text("🚫 You are globally banned from using this bot.")
         return
 
-    _, _, category = query.data.split("_")
-
-    session = SessionLocal()
-    try:
-        now = datetime.utcnow()
-        # Get distinct rarities that this user has in this category
-        user_items = session.query(Submission.rarity_name).filter(
-            Submission.type == category,
-            Submission.user_id == str(user.id),
-            Submission.status == "approved",
-            Submission.expires_at > now
-        ).distinct().all()
-
-        user_rarities = {rarity for (rarity,) in user_items}  # Convert to set
-
-        if not user_rarities:
-            if query.message:
-                await query.edit_message_text(f"<b>You have no ongoing {category} items.</b>", parse_mode="HTML")
-            return
-
-        # Build keyboard dynamically
-        keyboard = []
-        row = []
-        for emoji, rarity_name in RARITY_MAP.items():
-            if rarity_name in user_rarities:
-                row.append(InlineKeyboardButton(emoji, callback_data=f"select_rarity_{category}_{emoji}_1"))
-                if len(row) >= 3:
-                    keyboard.append(row)
-                    row = []
-        if row:
-            keyboard.append(row)
-
-        keyboard.append([InlineKeyboardButton("⬅️ Back", callback_data=f"select_type_{category}")])
-    finally:
-        session.close()
+    category = CATEGORIES[context.args[0]]
+
+    # Get distinct rarities that this user has in this category
+    user_rarities = catalog.rarities(category, seller=user.id)
+
+    if not user_rarities:
+        if query.message:
+            await query.edit_message_text(f"<b>You have no ongoing {category} items.</b>", parse_mode="HTML")
+        return
+
+    # Build keyboard dynamically
+    keyboard = []
+    row = []
+    for emoji, rarity_name in RARITY_MAP.items():
+        if rarity_name in user_rarities:
+            row.append(InlineKeyboardButton(emoji, callback_data=_data("sr", CATEGORY_CODES[category], emoji, 1)))
+            if len(row) >= 3:
+                keyboard.append(row)
+                row = []
+    if row:
+        keyboard.append(row)
+
+    keyboard.append([InlineKeyboardButton("⬅️ Back", callback_data=_data("ty", CATEGORY_CODES[category]))])
 
     if query.message:
         await query.edit_message_text(
@@ -337,77 +291,29 @@ async def rarity_selection_handler(update: Update, context: ContextTypes.DEFAULT
     await query.answer()
     user = update.effective_user
 
-    if await is_globally_banned(user.id):
+    if await context.eligibility.first_failure(NOT_BANNED):
         if query.message:
             await query.edit_message_text("🚫 You are globally banned from using this bot.")
         return
 
-    data = query.data.split("_")
-    category = data[2]
-    emoji = data[3]
-    page = int(data[4]) if len(data) > 4 else 1
+    args = context.args
+    category = CATEGORIES[args[0]]
+    emoji = args[1]
+    page = int(args[2]) if len(args) > 2 and args[2].isdigit() else 1
+    cursor = Cursor.parse(args[3] if len(args) > 3 else None)
     rarity_name = RARITY_MAP.get(emoji, "Unknown")
 
-    session = SessionLocal()
-    try:
-        now = datetime.utcnow()
-        results = session.query(Submission).filter(
-            Submission.type == category,
-            Submission.user_id == str(user.id),
-            Submission.rarity_name == rarity_name,
-            Submission.status == "approved",
-            Submission.expires_at > now
-        ).order_by(Submission.id.asc()).all()
-
-        total_items = len(results)
-        items_per_page = 10
-        start = (page - 1) * items_per_page
-        end = start + items_per_page
-        current_page_items = results[start:end]
-
-        if not current_page_items:
-            if query.message:
-                await query.edit_message_text(
-                    f"No ongoing {category} found with rarity {rarity_name} ({emoji})."
-                )
-            return
-
-        items_list = ""
-        for item in current_page_items:
-            name = item.waifu_name or "Unnamed"
-            anime = item.anime_name or "Unknown anime"
-            message_id = item.channel_message_id
-            if item.channel_id and str(item.channel_id).startswith("-100"):
-                link = f"https://t.me/c/{str(item.channel_id)[4:]}/{message_id}"
-            else:
-                link = f"{CHANNEL_URL}/{message_id}"
-
-            items_list += f"• <a href='{link}'>{item.id}. {name}</a> ({anime})\n"
-
-        total_pages = (total_items + items_per_page - 1) // items_per_page
-        buttons = []
-        nav_buttons = []
-        if page > 1:
-            nav_buttons.append(InlineKeyboardButton("⏮️ Prev", callback_data=f"select_rarity_{category}_{emoji}_{page-1}"))
-        if end < total_items:
-            nav_buttons.append(InlineKeyboardButton("Next ⏭️", callback_data=f"select_rarity_{category}_{emoji}_{page+1}"))
-        if nav_buttons:
-            buttons.append(nav_buttons)
-
-        buttons.append([
-            InlineKeyboardButton("⬅️ Back", callback_data=f"filter_rarity_{category}"),
-            InlineKeyboardButton("🗑️ Delete", callback_data="delete")
-        ])
-
-        if query.message:
-            await query.edit_message_text(
-                text=f"{emoji} <b>{rarity_name}</b> {category.capitalize()}s\nPage {page}/{total_pages}\n\n{items_list}",
-                parse_mode="HTML",
-                disable_web_page_preview=True,
-                reply_markup=InlineKeyboardMarkup(buttons)
-            )
-    finally:
-        session.close()
+    text, reply_markup = page_cache.get_or_render(
+        ("myitems", category, emoji, user.id, page, cursor), catalog.version(category, rarity_name, seller=user.id),
+        _render_rarity, category, emoji, page, cursor, user.id,
+    )
+    if query.message:
+        await query.edit_message_text(
+            text=text,
+            parse_mode="HTML",
+            disable_web_page_preview=True,
+            reply_markup=reply_markup
+        )
 
 
 # ================= BACK HANDLER =================
@@ -418,36 +324,21 @@ async def back_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     user = update.effective_user
 
-    if await is_globally_banned(user.id):
+    if await context.eligibility.first_failure(NOT_BANNED):
         if query.message:
             await query.edit_message_text("🚫 You are globally banned from using this bot.")
         return
 
-    session = SessionLocal()
-    try:
-        now = datetime.utcnow()
-        keyboard = []
-        if session.query(Submission).filter(
-            Submission.type == "waifu",
-            Submission.user_id == str(user.id),
-            Submission.status == "approved",
-            Submission.expires_at > now
-        ).count() > 0:
-            keyboard.append([InlineKeyboardButton("💖 Waifu", callback_data="select_type_waifu")])
-
-        if session.query(Submission).filter(
-            Submission.type == "husbando",
-            Submission.user_id == str(user.id),
-            Submission.status == "approved",
-            Submission.expires_at > now
-        ).count() > 0:
-            keyboard.append([InlineKeyboardButton("💪 Husbando", callback_data="select_type_husbando")])
-
-        if not keyboard and query.message:
-            await query.edit_message_text("<b>No ongoing auctions available.</b>", parse_mode="HTML")
-            return
-    finally:
-        session.close()
+    keyboard = []
+    if catalog.count("waifu", seller=user.id) > 0:
+        keyboard.append([InlineKeyboardButton("💖 Waifu", callback_data=_data("ty", "w"))])
+
+    if catalog.count("husbando", seller=user.id) > 0:
+        keyboard.append([InlineKeyboardButton("💪 Husbando", callback_data=_data("ty", "h"))])
+
+    if not keyboard and query.message:
+        await query.edit_message_text("<b>No ongoing auctions available.</b>", parse_mode="HTML")
+        return
 
     if query.message:
         await query.edit_message_text("Choose a category:", reply_markup=InlineKeyboardMarkup(keyboard))
@@ -459,9 +350,8 @@ async def delete_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     if query is None:
         return
     await query.answer()
-    user = update.effective_user
 
-    if await is_globally_banned(user.id):
+    if await context.eligibility.first_failure(NOT_BANNED):
         if query.message:
             await query.edit_message_text("🚫 You are globally banned from using this bot.")
         return
@@ -473,11 +363,14 @@ async def delete_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 # ================= HANDLER LIST =================
 myitems_handlers = [
     CommandHandler("myitems", items_command),
-    CallbackQueryHandler(recheck_items, pattern="^recheck_items$"),
-    CallbackQueryHandler(type_selection_handler, pattern="^select_type_"),
-    CallbackQueryHandler(view_all_handler, pattern="^view_all_"),
-    CallbackQueryHandler(filter_rarity_handler, pattern="^filter_rarity_"),
-    CallbackQueryHandler(rarity_selection_handler, pattern="^select_rarity_"),
-    CallbackQueryHandler(back_handler, pattern="^back$"),
-    CallbackQueryHandler(delete_menu_handler, pattern="^delete$"),
-]
\ No newline at end of file
+]
+
+callback_router.add_routes(NS, {
+    "rc": recheck_items,
+    "ty": type_selection_handler,
+    "va": view_all_handler,
+    "fr": filter_rarity_handler,
+    "sr": rarity_selection_handler,
+    "bk": back_handler,
+    "del": delete_menu_handler,
+})
@@ -9,12 +9,15 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-from .add_command import is_private_chat, is_member, RARITY_MAP, GROUP_URL, CHANNEL_URL, safe_split 
+from .add_command import RARITY_MAP, GROUP_URL, CHANNEL_URL
+from utils.eligibility import MEMBER
+from utils.callback_router import callback_data
+from utils import add_flow as flow
+from utils.add_flow import add_flow
 
 # ====== PHOTO HANDLER ======
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_private_chat(update):
-        return
+    """Only reached by users at the photo step of /add in private chat (see utils/add_flow.py)."""
     if not update.message or not update.message.photo:
         return
     user = update.message.from_user
@@ -22,13 +25,13 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # membership check
-    if not await is_member(user.id, context):
+    if await context.eligibility.first_failure(MEMBER):
         keyboard = [
             [
                 InlineKeyboardButton("📣 Join Group", url=GROUP_URL),
                 InlineKeyboardButton("📢 Join Channel", url=CHANNEL_URL),
             ],
-            [InlineKeyboardButton("🔁 Try Again", callback_data="recheck_add")],
+            [InlineKeyboardButton("🔁 Try Again", callback_data=callback_data("add", "rc"))],
         ]
         await update.message.reply_text(
             "<b>⚠️ You need to join our main group and channel to use this feature.</b>\n\n"
@@ -40,13 +43,14 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     caption = update.message.caption or ""
  
-    # Ensure previous steps completed
-    if not context.user_data.get("type") or not context.user_data.get("rarity"):
+    # The filter matched, but the draft may have timed out or been evicted since
+    draft = await add_flow.draft(user.id, flow.PHOTO)
+    if draft is None:
         await update.message.reply_text("⚠️ Please start again using /add.")
         return
  
-    selected_type = context.user_data["type"]
-    selected_rarity = context.user_data["rarity"]
+    selected_type = draft.type
+    selected_rarity = draft.rarity
  
     # --- Validation ---
     if "waifu" in caption.lower() and selected_type != "waifu":
@@ -90,11 +94,11 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     file_id = update.message.photo[-1].file_id
 
     # Save temporary data before asking for base bid
-    context.user_data["caption"] = caption
-    context.user_data["anime_name"] = anime_name
-    context.user_data["waifu_name"] = waifu_name
-    context.user_data["optional_tag"] = optional_tag
-    context.user_data["file_id"] = file_id
+    draft.caption = caption
+    draft.anime_name = anime_name
+    draft.waifu_name = waifu_name
+    draft.optional_tag = optional_tag
+    draft.file_id = file_id
 
     # Ask user for base bid
     await update.message.reply_text(
@@ -102,10 +106,10 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     "Or type /cancel to stop this submission.",
     parse_mode="HTML",
     )
-    context.user_data["awaiting_bid"] = True  # Mark that we’re waiting for bid next
+    add_flow.enter(context, user.id, flow.BASE_BID)  # next text message is the base bid
 
 
 # ====== HANDLERS LIST FOR photo_handler.py ======
 photo_handlers = [
-    MessageHandler(filters.PHOTO & ~filters.COMMAND, handle_photo),
+    MessageHandler(add_flow.awaiting(flow.PHOTO) & filters.PHOTO, handle_photo),
 ]
\ No newline at end of file
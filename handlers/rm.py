@@ -1,8 +1,26 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
-from utils.database import SessionLocal
+from utils.database import run_db
 from models.tables import Submission
+from utils import lifecycle
+from utils.caption_coalescer import caption_coalescer
 from config import OWNER_ID, ADMINS, CHANNEL_ID, GROUP_ID
+from tasks.expiry_scheduler import expiry_scheduler
+from utils.catalog import catalog
+
+
+# ========== DB HELPERS ==========
+def _get_items(session, item_ids):
+    return session.query(Submission).filter(Submission.id.in_(item_ids)).all()
+
+
+def _cancel_items(session, item_ids):
+    """Cancel the items that are still pending or running; returns the ones cancelled."""
+    cancelled = lifecycle.claim(
+        session, item_ids, (lifecycle.PENDING, lifecycle.APPROVED), lifecycle.CANCELLED,
+        is_expired=True,
+    )
+    return [item for item in _get_items(session, item_ids) if item.id in cancelled]
 
 
 # ========== REMOVE ITEMS COMMAND ==========
@@ -27,33 +45,28 @@ async def rm_items(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text(f"⚠️ Invalid item ID: {arg}")
             return
 
-    db = SessionLocal()
-    deleted_count = 0
-
-    for item_id in item_ids:
-        item = db.query(Submission).filter_by(id=item_id).first()
-        if item:
-            # Try deleting messages from channel and group
-            try:
-                if getattr(item, "channel_message_id", None):
-                    await context.bot.delete_message(chat_id=CHANNEL_ID, message_id=item.channel_message_id)
-                if getattr(item, "group_message_id", None):
-                    await context.bot.delete_message(chat_id=GROUP_ID, message_id=item.group_message_id)
-            except Exception as e:
-                # Ignore Telegram errors (message may already be deleted)
-                pass
-
-            # Remove from DB
-            db.delete(item)
-            deleted_count += 1
-
-    db.commit()
-    db.close()
-
-    if deleted_count > 0:
-        await update.message.reply_text(f"✅ Successfully deleted {deleted_count} item(s).")
+    # Cancel first: an auction that is ending or already over keeps its posts
+    items = await run_db(_cancel_items, item_ids)
+
+    for item in items:
+        caption_coalescer.discard(item.id)
+        expiry_scheduler.cancel(item.id)
+        catalog.remove(item.id)
+
+        # Try deleting messages from channel and group
+        try:
+            if getattr(item, "channel_message_id", None):
+                await context.bot.delete_message(chat_id=CHANNEL_ID, message_id=item.channel_message_id)
+            if getattr(item, "group_message_id", None):
+                await context.bot.delete_message(chat_id=GROUP_ID, message_id=item.group_message_id)
+        except Exception as e:
+            # Ignore Telegram errors (message may already be deleted)
+            pass
+
+    if items:
+        await update.message.reply_text(f"✅ Successfully removed {len(items)} item(s).")
     else:
-        await update.message.reply_text("⚠️ No matching items found.")
+        await update.message.reply_text("⚠️ No matching pending or active items found.")
 
 
 # ========== REGISTER HANDLER ==========
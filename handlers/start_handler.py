@@ -2,8 +2,9 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from datetime import datetime
-from utils.database import SessionLocal
-from models.global_ban import GlobalBan
+from utils.database import run_db
+from utils.eligibility import NOT_BANNED, mark_started
+from utils.outbound import outbound, Priority
 from models.tables import User
 from config import (
     WELCOME_MESSAGE,
@@ -16,6 +17,25 @@ from utils.logger import log_user_start, escape_markdown
 from datetime import datetime
 
 
+# ====== DB HELPERS ======
+def _register_user(session, user):
+    """Upsert the user. Returns True if this is a new user."""
+    # ====== Upsert user in DB ======
+    db_user = session.query(User).filter_by(id=user.id).first()
+    is_new_user = False
+
+    if not db_user:
+        db_user = User(
+            id=user.id,
+            full_name=user.full_name or "Unknown",
+            username=user.username,
+        )
+        session.add(db_user)
+        is_new_user = True  # Mark as new user
+    db_user.last_seen = datetime.utcnow() # type: ignore
+    return is_new_user
+
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     chat = update.effective_chat
@@ -23,59 +43,42 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not user or not chat:
         return
 
-    session = SessionLocal()
-    try:
-        # ====== Global Ban Check ======
-        banned = session.query(GlobalBan).filter_by(user_id=str(user.id)).first()
-        if banned:
-            if update.message:
-              await update.message.reply_text("🚫 You are globally banned from using this bot.")
-            return
-
-        # ====== Upsert user in DB ======
-        db_user = session.query(User).filter_by(id=user.id).first()
-        is_new_user = False
+    # ====== Global Ban Check ======
+    if await context.eligibility.first_failure(NOT_BANNED):
+        if update.message:
+            outbound.send_message_nowait(chat.id, "🚫 You are globally banned from using this bot.", Priority.BID_ACK)
+        return
 
-        if not db_user:
-            db_user = User(
-                id=user.id,
-                full_name=user.full_name or "Unknown",
-                username=user.username,
-            )
-            session.add(db_user)
-            is_new_user = True  # Mark as new user
-        db_user.last_seen = datetime.utcnow() # type: ignore
-        session.commit()
+    is_new_user = await run_db(_register_user, user)
+    mark_started(user.id)
 
-        # ====== Inline Buttons ======
-        keyboard = [
-            [
-                InlineKeyboardButton("📢 Group", url=GROUP_URL),
-                InlineKeyboardButton("🧿 Channel", url=CHANNEL_URL),
-            ]
+    # ====== Inline Buttons ======
+    keyboard = [
+        [
+            InlineKeyboardButton("📢 Group", url=GROUP_URL),
+            InlineKeyboardButton("🧿 Channel", url=CHANNEL_URL),
         ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await context.bot.send_video(
-            chat_id=chat.id,
-            video=WELCOME_VIDEO_ID,
-            caption=WELCOME_MESSAGE,
-            parse_mode="MarkdownV2",
-            reply_markup=reply_markup,
-        )
+    outbound.call_nowait(
+        "send_video",
+        chat.id,
+        Priority.BID_ACK,
+        video=WELCOME_VIDEO_ID,
+        caption=WELCOME_MESSAGE,
+        parse_mode="MarkdownV2",
+        reply_markup=reply_markup,
+    )
 
-        # ====== Logging (only for new users) ======
-        if is_new_user:
-            
-            log_text = (
-                 f"📥 **New User Started Bot**\n"
-                 f"👤 Name: {escape_markdown(user.full_name or 'Unknown')}\n"
-                 f"🆔 ID: `{user.id}`\n"
-                 f"💬 Username: @{escape_markdown(user.username) if user.username else 'N/A'}\n"
-                 f"🕒 Time: {escape_markdown(datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC'))}\n"
-                 f"📍 Chat Type: {escape_markdown(chat.type)}"
-            )
+    # ====== Logging (only for new users) ======
+    if is_new_user:
+        log_text = (
+             f"📥 **New User Started Bot**\n"
+             f"👤 Name: {escape_markdown(user.full_name or 'Unknown')}\n"
+             f"🆔 ID: `{user.id}`\n"
+             f"💬 Username: @{escape_markdown(user.username) if user.username else 'N/A'}\n"
+             f"🕒 Time: {escape_markdown(datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC'))}\n"
+             f"📍 Chat Type: {escape_markdown(chat.type)}"
+        )
         await log_user_start(context, log_text)
-
-    finally:
-        session.close()
\ No newline at end of file
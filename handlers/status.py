@@ -1,12 +1,37 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 from sqlalchemy import text
-from utils.database import SessionLocal, engine
+from utils.database import run_db
 from models.tables import Submission, User
+from utils import lifecycle
 from config import OWNER_ID, ADMINS
+from utils.eligibility import format_check_stats
+from utils.add_flow import format_flow_stats
 from datetime import datetime
 
 
+# ================= DB HELPERS =================
+def _ping(session):
+    session.execute(text("SELECT 1"))
+
+
+def _collect_stats(session) -> dict:
+    stats = {}
+
+    # ================= USER STATS =================
+    stats["active_users"] = session.query(User).filter(User.is_banned == False).count()
+    stats["inactive_users"] = session.query(User).filter(User.is_banned == True).count()
+
+    # ================= AUCTION STATS =================
+    stats["active_auctions"] = session.query(Submission).filter(Submission.status == lifecycle.APPROVED).count()
+    stats["inactive_auctions"] = session.query(Submission).filter(Submission.status.in_(lifecycle.FINAL_STATES)).count()
+
+    # ================= ITEM STATS =================
+    stats["active_items"] = session.query(Submission).filter(Submission.status == lifecycle.APPROVED).count()
+    stats["pending_items"] = session.query(Submission).filter(Submission.status == lifecycle.PENDING).count()
+    return stats
+
+
 # ================= /STATUS COMMAND =================
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
@@ -17,43 +42,28 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ You are not authorized to use this command.")
         return
 
-    session = SessionLocal()
     text_msg = "📊 <b>System Status Overview</b>\n\n"
 
     # ================= MYSQL CONNECTION =================
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-            mysql_status = "✅ Connected"
+        await run_db(_ping)
+        mysql_status = "✅ Connected"
     except Exception:
         mysql_status = "❌ Disconnected"
 
     # ================= BOT STATUS =================
     bot_status = "✅ Running"
 
-    # ================= USER STATS =================
-    try:
-        active_users = session.query(User).filter(User.is_banned == False).count()
-        inactive_users = session.query(User).filter(User.is_banned == True).count()
-    except Exception:
-        active_users = "⚠️ Error"
-        inactive_users = "⚠️ Error"
-
-    # ================= AUCTION STATS =================
-    try:
-        active_auctions = session.query(Submission).filter(Submission.status == "active").count()
-        inactive_auctions = session.query(Submission).filter(Submission.status == "ended").count()
-    except Exception:
-        active_auctions = "⚠️ Error"
-        inactive_auctions = "⚠️ Error"
-
-    # ================= ITEM STATS =================
     try:
-        active_items = session.query(Submission).filter(Submission.status == "active").count()
-        pending_items = session.query(Submission).filter(Submission.status == "pending").count()
+        stats = await run_db(_collect_stats)
     except Exception:
-        active_items = "⚠️ Error"
-        pending_items = "⚠️ Error"
+        stats = {}
+    active_users = stats.get("active_users", "⚠️ Error")
+    inactive_users = stats.get("inactive_users", "⚠️ Error")
+    active_auctions = stats.get("active_auctions", "⚠️ Error")
+    inactive_auctions = stats.get("inactive_auctions", "⚠️ Error")
+    active_items = stats.get("active_items", "⚠️ Error")
+    pending_items = stats.get("pending_items", "⚠️ Error")
 
     # ================= TIMESTAMP =================
     last_update = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -68,11 +78,14 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"⏳ <b>Pending Items:</b> {pending_items}\n\n"
         f"🧩 <b>MySQL Status:</b> {mysql_status}\n"
         f"🤖 <b>Bot Status:</b> {bot_status}\n"
-        f"🕒 <b>Last Update:</b> {last_update}\n"
+        f"🕒 <b>Last Update:</b> {last_update}\n\n"
+        f"🛂 <b>Eligibility Checks</b> (in run order)\n"
+        f"{format_check_stats()}\n\n"
+        f"📝 <b>Submissions (/add)</b>\n"
+        f"{format_flow_stats()}\n"
     )
 
     await update.message.reply_text(text_msg, parse_mode="HTML")
-    session.close()
 
 
 # ================= HANDLER REGISTRATION =================
@@ -1,17 +1,26 @@
 import asyncio
 import nest_asyncio
+from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler
 
 # Configuration and Utilities
-from config import BOT_TOKEN
+from config import BOT_TOKEN, CONCURRENT_UPDATES, EXPIRY_SWEEP_INTERVAL, BAN_CACHE_REFRESH_INTERVAL, CATALOG_REFRESH_INTERVAL, ADD_FLOW_FLUSH_INTERVAL
 from utils.database import init_db
+from utils.ban_cache import ban_cache
+from utils.catalog import catalog
+from utils.membership import chat_member_handler
+from utils.eligibility import eligibility_middleware
+from utils.unit_of_work import UnitOfWorkApplication, UnitOfWorkRequest
+from utils.outbound import outbound
+from utils.callback_router import callback_router
+from utils.add_flow import add_flow
 
 # Handlers from separate files
 from handlers.start_handler import start_command
 from handlers.add_command import add_handlers
 from handlers.photo_handler import photo_handlers
 from handlers.bid_handler import bid_handlers
-from handlers.approval_handler import approval_handlers
+from handlers.approval_handler import register_approval_routes
 from handlers.auction_bid import auction_bid_handlers
 from handlers.item_command import items_handlers
 from handlers.my_items import myitems_handlers
@@ -22,17 +31,37 @@ from handlers.status import status_handler
 from handlers.help import help_handler
 
 # Background Tasks
-from tasks.cleanup import remove_expired_bids
 from tasks.auction_expiry import start_expiry_task
+from tasks.expiry_scheduler import expiry_scheduler
+from tasks.scheduled_jobs import scheduled_jobs
+
+
+async def on_shutdown(app):
+    scheduled_jobs.shutdown()
+    await add_flow.flush()  # drafts changed since the last interval flush
 
 
 async def main():
     print("🔄 Initializing database...")
     init_db()
-    print("✅ Database ready.")
+    await ban_cache.load()
+    await catalog.load()
+    print(f"✅ Database ready. ({len(ban_cache)} global ban(s), {len(catalog)} running auction(s) cached)")
 
     # Create bot application
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .application_class(UnitOfWorkApplication)  # one DB transaction per update
+        .request(UnitOfWorkRequest(connection_pool_size=256))  # ...released before each API call
+        .post_shutdown(on_shutdown)
+        .build()
+    )
+    await add_flow.load(app.job_queue)  # unfinished /add submissions from before the restart
+
+    # =============== 0️⃣ MIDDLEWARE (runs before every handler) ===============
+    app.add_handler(eligibility_middleware, group=-1)
 
     # =============== 1️⃣ BASIC COMMANDS ===============
     app.add_handler(CommandHandler("start", start_command))
@@ -41,12 +70,12 @@ async def main():
     app.add_handler(CommandHandler("unaban", unaban))
     app.add_handler(status_handler)  # ✅ Add /status handler here
     app.add_handler(forceend_handler())  # ✅ Ensure /forceend registered once
+    app.add_handler(chat_member_handler)  # keeps the membership cache in sync with joins/leaves
         # =============== 2️⃣ COMBINED HANDLERS ===============
     all_specialized_handlers = (
         add_handlers +
         photo_handlers +
         bid_handlers +
-        approval_handlers +
         auction_bid_handlers +
         items_handlers +
         myitems_handlers
@@ -55,16 +84,23 @@ async def main():
     # =============== 3️⃣ REGISTER SPECIALIZED HANDLERS ===============
     for handler in all_specialized_handlers:
         app.add_handler(handler)
+    register_approval_routes()
+    app.add_handler(callback_router.handler())  # every inline button, routed by its callback data namespace
 
     # =============== 4️⃣ REGISTER REMOVE HANDLERS ===============
     register_remove_handlers(app)
 
     # =============== 5️⃣ BACKGROUND TASKS ===============
-    asyncio.create_task(remove_expired_bids(app.bot))
-    asyncio.create_task(start_expiry_task(app.bot, 1))
+    outbound.start(app.bot)  # rate-limited send queue used by handlers and tasks
+    asyncio.create_task(ban_cache.reconcile_forever(BAN_CACHE_REFRESH_INTERVAL))
+    asyncio.create_task(catalog.reconcile_forever(CATALOG_REFRESH_INTERVAL))
+    asyncio.create_task(add_flow.flush_forever(ADD_FLOW_FLUSH_INTERVAL))
+    await expiry_scheduler.start(app.bot)  # ends each auction at its exact time
+    await scheduled_jobs.start()  # durable unpins; overdue ones are caught up in the background
+    asyncio.create_task(start_expiry_task(app.bot, EXPIRY_SWEEP_INTERVAL))  # safety-net sweep
 
     print("🤖 Bot is running...")
-    await app.run_polling()
+    await app.run_polling(allowed_updates=Update.ALL_TYPES)  # chat_member updates are opt-in
 
 
 # =============== ENTRY POINT ===============
@@ -0,0 +1,42 @@
+# migrations/env.py
+# Tables are first created by utils.database.init_db(); these migrations evolve them.
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from config import DATABASE_URL
+from utils.database import Base
+
+# Import all models so their tables are on Base.metadata
+import models.tables  # noqa: F401
+import models.global_ban  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
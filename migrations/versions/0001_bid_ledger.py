@@ -0,0 +1,92 @@
+"""Add the append-only bids ledger and backfill it from Submission.previous_bidders
+
+Revision ID: 0001_bid_ledger
+Revises:
+Create Date: 2026-10-18
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_bid_ledger"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+submission = sa.table(
+    "Submission",
+    sa.column("id", sa.Integer),
+    sa.column("previous_bidders", sa.JSON),
+)
+bids = sa.table(
+    "bids",
+    sa.column("item_id", sa.Integer),
+    sa.column("bidder_id", sa.BigInteger),
+    sa.column("bidder_username", sa.String),
+    sa.column("amount", sa.Integer),
+    sa.column("time", sa.DateTime),
+)
+
+
+def _parse_time(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # init_db() may already have created the table via create_all
+    if "bids" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "bids",
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("item_id", sa.Integer, nullable=False),
+            sa.Column("bidder_id", sa.BigInteger, nullable=False),
+            sa.Column("bidder_username", sa.String(255), nullable=True),
+            sa.Column("amount", sa.Integer, nullable=False),
+            sa.Column("time", sa.DateTime, nullable=False),
+        )
+        op.create_index("ix_bids_item_amount", "bids", ["item_id", "amount"])
+        op.create_index("ix_bids_bidder_time", "bids", ["bidder_id", "time"])
+
+    # Backfill the (at most two) bids kept in the old JSON column, skipping any already in the ledger
+    existing = {
+        (row.item_id, row.bidder_id, row.amount)
+        for row in bind.execute(sa.select(bids.c.item_id, bids.c.bidder_id, bids.c.amount))
+    }
+    rows = []
+    for item_id, previous_bidders in bind.execute(sa.select(submission.c.id, submission.c.previous_bidders)):
+        for entry in previous_bidders or []:
+            try:
+                key = (item_id, int(entry["id"]), int(entry["bid"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if key in existing:
+                continue
+            existing.add(key)
+            rows.append({
+                "item_id": item_id,
+                "bidder_id": key[1],
+                "bidder_username": entry.get("username"),
+                "amount": key[2],
+                "time": _parse_time(entry.get("time")),
+            })
+    if rows:
+        op.bulk_insert(bids, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_bids_bidder_time", table_name="bids")
+    op.drop_index("ix_bids_item_amount", table_name="bids")
+    op.drop_table("bids")
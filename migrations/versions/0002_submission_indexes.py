@@ -0,0 +1,41 @@
+"""Add composite indexes on Submission for the listing and expiry queries
+
+Revision ID: 0002_submission_indexes
+Revises: 0001_bid_ledger
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_submission_indexes"
+down_revision: Union[str, Sequence[str], None] = "0001_bid_ledger"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = {
+    "ix_submission_status_type_id": ["status", "type", "id"],
+    "ix_submission_status_type_rarity_id": ["status", "type", "rarity_name", "id"],
+    "ix_submission_user_status_type_id": ["user_id", "status", "type", "id"],
+    "ix_submission_status_expired_expires": ["status", "is_expired", "expires_at"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A fresh database already got these from init_db()'s create_all
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("Submission")}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "Submission", columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in INDEXES:
+        op.drop_index(name, table_name="Submission")
@@ -0,0 +1,54 @@
+"""Store Telegram IDs on Submission as BIGINT and index the last bidder
+
+Revision ID: 0003_telegram_id_bigint
+Revises: 0002_submission_indexes
+Create Date: 2026-10-18
+
+user_id and channel_id were strings, while every lookup passes a Python int. On
+MySQL that comparison casts each row, so ix_submission_user_status_type_id could
+not be used. last_bidder_id was a 32-bit INT, too small for newer Telegram IDs.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_telegram_id_bigint"
+down_revision: Union[str, Sequence[str], None] = "0002_submission_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# column -> (old type, new type)
+COLUMNS = {
+    "user_id": (sa.String(50), sa.BigInteger()),
+    "channel_id": (sa.String(), sa.BigInteger()),
+    "last_bidder_id": (sa.Integer(), sa.BigInteger()),
+}
+LAST_BIDDER_INDEX = "ix_submission_last_bidder_id"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Empty strings would not convert; they mean "unknown" anyway
+    for column in ("user_id", "channel_id"):
+        op.execute(sa.text(f"UPDATE Submission SET {column} = NULL WHERE {column} = ''"))
+
+    with op.batch_alter_table("Submission") as batch:
+        for column, (old_type, new_type) in COLUMNS.items():
+            batch.alter_column(column, existing_type=old_type, type_=new_type, existing_nullable=True)
+
+    # A fresh database already got it from init_db()'s create_all
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("Submission")}
+    if LAST_BIDDER_INDEX not in existing:
+        op.create_index(LAST_BIDDER_INDEX, "Submission", ["last_bidder_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(LAST_BIDDER_INDEX, table_name="Submission")
+    with op.batch_alter_table("Submission") as batch:
+        for column, (old_type, new_type) in COLUMNS.items():
+            batch.alter_column(column, existing_type=new_type, type_=old_type, existing_nullable=True)
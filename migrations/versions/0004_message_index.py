@@ -0,0 +1,54 @@
+"""Add message_index (chat, message) -> item and backfill it from existing posts
+
+Revision ID: 0004_message_index
+Revises: 0003_telegram_id_bigint
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from config import GROUP_ID, CHANNEL_ID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_message_index"
+down_revision: Union[str, Sequence[str], None] = "0003_telegram_id_bigint"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Rows already present (a post indexed since create_all made the table) are skipped
+BACKFILL = """
+    INSERT INTO message_index (chat_id, message_id, item_id)
+    SELECT {chat_id}, s.{column}, s.id FROM Submission s
+    WHERE s.{column} IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM message_index m WHERE m.chat_id = {chat_id} AND m.message_id = s.{column}
+    )
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # init_db() may already have created the table via create_all
+    if "message_index" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "message_index",
+            sa.Column("chat_id", sa.BigInteger, primary_key=True),
+            sa.Column("message_id", sa.BigInteger, primary_key=True),
+            sa.Column("item_id", sa.Integer, nullable=False),
+        )
+        op.create_index("ix_message_index_item_id", "message_index", ["item_id"])
+
+    op.execute(sa.text(BACKFILL.format(chat_id="COALESCE(s.channel_id, :channel_id)", column="channel_message_id"))
+               .bindparams(channel_id=int(CHANNEL_ID)))
+    op.execute(sa.text(BACKFILL.format(chat_id=":group_id", column="group_message_id"))
+               .bindparams(group_id=int(GROUP_ID)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_message_index_item_id", table_name="message_index")
+    op.drop_table("message_index")
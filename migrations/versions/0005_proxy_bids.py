@@ -0,0 +1,37 @@
+"""Add proxy_bids for private maximum bids
+
+Revision ID: 0005_proxy_bids
+Revises: 0004_message_index
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_proxy_bids"
+down_revision: Union[str, Sequence[str], None] = "0004_message_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # init_db() may already have created the table via create_all
+    if "proxy_bids" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "proxy_bids",
+            sa.Column("item_id", sa.Integer, primary_key=True),
+            sa.Column("bidder_id", sa.BigInteger, primary_key=True),
+            sa.Column("bidder_username", sa.String(255), nullable=True),
+            sa.Column("max_amount", sa.Integer, nullable=False),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("proxy_bids")
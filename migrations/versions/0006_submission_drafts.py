@@ -0,0 +1,42 @@
+"""Add submission_drafts so unfinished /add submissions survive restarts
+
+Revision ID: 0006_submission_drafts
+Revises: 0005_proxy_bids
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_submission_drafts"
+down_revision: Union[str, Sequence[str], None] = "0005_proxy_bids"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # init_db() may already have created the table via create_all
+    if "submission_drafts" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "submission_drafts",
+            sa.Column("user_id", sa.BigInteger, primary_key=True),
+            sa.Column("step", sa.String(16), nullable=False),
+            sa.Column("deadline", sa.DateTime, nullable=False),
+            sa.Column("type", sa.String(50)),
+            sa.Column("rarity", sa.String(10)),
+            sa.Column("caption", sa.String(1000)),
+            sa.Column("anime_name", sa.String(200)),
+            sa.Column("waifu_name", sa.String(200)),
+            sa.Column("optional_tag", sa.String(200)),
+            sa.Column("file_id", sa.String(200)),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("submission_drafts")
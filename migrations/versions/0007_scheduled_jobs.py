@@ -0,0 +1,39 @@
+"""Add scheduled_jobs, the APScheduler job store for unpins
+
+Revision ID: 0007_scheduled_jobs
+Revises: 0006_submission_drafts
+Create Date: 2026-10-18
+
+Same layout as APScheduler's SQLAlchemyJobStore creates on its own, so either
+may come first.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_scheduled_jobs"
+down_revision: Union[str, Sequence[str], None] = "0006_submission_drafts"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The job store creates the table itself when the bot starts
+    if "scheduled_jobs" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "scheduled_jobs",
+            sa.Column("id", sa.Unicode(191), primary_key=True),
+            sa.Column("next_run_time", sa.Float(25)),
+            sa.Column("job_state", sa.LargeBinary, nullable=False),
+        )
+        op.create_index("ix_scheduled_jobs_next_run_time", "scheduled_jobs", ["next_run_time"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_scheduled_jobs_next_run_time", table_name="scheduled_jobs")
+    op.drop_table("scheduled_jobs")
@@ -0,0 +1,54 @@
+"""Drop indexes no query reads any more
+
+Revision ID: 0008_drop_unread_indexes
+Revises: 0007_scheduled_jobs
+Create Date: 2026-10-18
+
+/items and /myitems are served from the in-memory catalog, reply-bids resolve
+through message_index's primary key, and nothing reads the bids ledger back, so
+these indexes were only maintained on every bid and lifecycle update.
+ix_submission_status_expired_expires stays: the catalog load, the expiry sweep
+and the expiry scheduler all use it (see scripts/explain_queries.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_drop_unread_indexes"
+down_revision: Union[str, Sequence[str], None] = "0007_scheduled_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# name -> (table, columns)
+INDEXES = {
+    "ix_submission_status_type_id": ("Submission", ["status", "type", "id"]),
+    "ix_submission_status_type_rarity_id": ("Submission", ["status", "type", "rarity_name", "id"]),
+    "ix_submission_user_status_type_id": ("Submission", ["user_id", "status", "type", "id"]),
+    "ix_submission_last_bidder_id": ("Submission", ["last_bidder_id"]),
+    "ix_bids_item_amount": ("bids", ["item_id", "amount"]),
+    "ix_bids_bidder_time": ("bids", ["bidder_id", "time"]),
+    "ix_message_index_item_id": ("message_index", ["item_id"]),
+}
+
+
+def _existing(table: str) -> set[str]:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A database created by a newer init_db() never had them
+    for name, (table, _) in INDEXES.items():
+        if name in _existing(table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, (table, columns) in INDEXES.items():
+        if name not in _existing(table):
+            op.create_index(name, table, columns)
@@ -1,5 +1,5 @@
 # models/submission.py
-from sqlalchemy import Column, Integer, String, DateTime, Boolean , BigInteger , JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean , BigInteger , JSON, Index
 from utils.database import Base
 from datetime import datetime, timedelta
 
@@ -7,7 +7,7 @@ class Submission(Base):
     __tablename__ = "Submission"
 
     id = Column(Integer, primary_key=True, index=True , autoincrement=True)
-    user_id = Column(String(50))
+    user_id = Column(BigInteger)  # Telegram user ID of the seller
     user_name = Column(String(100))
     username = Column(String(100))
     type = Column(String(50))
@@ -21,8 +21,8 @@ class Submission(Base):
     submitted_time = Column(DateTime, default=datetime.utcnow)
     status = Column(String(20), default="pending")
     base_bid = Column(Integer, nullable=True)
-    channel_id = Column(String, nullable=True)
-    previous_bidders = Column(JSON, default=[])
+    channel_id = Column(BigInteger, nullable=True)
+    previous_bidders = Column(JSON, default=[])  # legacy, no longer written — see Bid
     # === NEW FIELDS ===
     # Channel message ID where the post was sent (used to edit later)
     channel_message_id = Column(Integer, nullable=True)
@@ -33,10 +33,63 @@ class Submission(Base):
     # Whether the bid has already expired (so we don't process twice)
     is_expired = Column(Boolean, default=False) 
     current_bid = Column(Integer, default=0)
-    last_bidder_id = Column(Integer, nullable=True)
+    last_bidder_id = Column(BigInteger, nullable=True)
     last_bidder_username = Column(String(255), nullable=True)
     last_bid_time = Column(DateTime, nullable=True, default=None)
 
+    # Only indexes a query reads; each is covered by scripts/explain_queries.py
+    __table_args__ = (
+        # catalog load, expiry sweep / scheduler: open auctions by end time
+        Index("ix_submission_status_expired_expires", "status", "is_expired", "expires_at"),
+    )
+
+class Bid(Base):
+    """Append-only bid ledger: one row per accepted bid, never updated."""
+    __tablename__ = "bids"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # No FK on purpose: the ledger is kept even if the item row is removed
+    item_id = Column(Integer, nullable=False)
+    bidder_id = Column(BigInteger, nullable=False)
+    bidder_username = Column(String(255), nullable=True)
+    amount = Column(Integer, nullable=False)
+    time = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # No secondary indexes: nothing reads the ledger back yet; add them with the first reader
+
+class ProxyBid(Base):
+    """A bidder's private maximum for one item; the bid engine outbids others for them up to it."""
+    __tablename__ = "proxy_bids"
+
+    item_id = Column(Integer, primary_key=True)
+    bidder_id = Column(BigInteger, primary_key=True)
+    bidder_username = Column(String(255), nullable=True)
+    max_amount = Column(Integer, nullable=False)
+    # When this maximum was set: the earlier of two equal maximums wins
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class MessageIndex(Base):
+    """Which auction a posted message belongs to: (chat, message) -> item, for reply-bids."""
+    __tablename__ = "message_index"
+
+    chat_id = Column(BigInteger, primary_key=True)
+    message_id = Column(BigInteger, primary_key=True)
+    item_id = Column(Integer, nullable=False)
+
+class SubmissionDraft(Base):
+    """An unfinished /add, flushed from utils/add_flow.py so it survives restarts."""
+    __tablename__ = "submission_drafts"
+
+    user_id = Column(BigInteger, primary_key=True)
+    step = Column(String(16), nullable=False)
+    deadline = Column(DateTime, nullable=False)  # when the current step times out (UTC)
+    type = Column(String(50))
+    rarity = Column(String(10))
+    caption = Column(String(1000))
+    anime_name = Column(String(200))
+    waifu_name = Column(String(200))
+    optional_tag = Column(String(200))
+    file_id = Column(String(200))
+
 class User(Base):
     __tablename__ = "user"
 
@@ -1,170 +1,326 @@
 import asyncio
+import time
 from datetime import datetime
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from utils.database import SessionLocal
+from utils.database import run_db
 from models.tables import Submission
-from config import LOG_GROUP_ID, GROUP_ID
+from utils import lifecycle
+from config import LOG_GROUP_ID, GROUP_ID, CHANNEL_ID, EXPIRY_WORKERS
 from utils.tg_links import build_user_link
+from utils.caption_coalescer import caption_coalescer
+from utils.outbound import outbound, Priority
+from utils.catalog import catalog
 
 
-async def check_expired_auctions(bot):
-    session = SessionLocal()
-    now = datetime.utcnow()
-
-    expired_items = (
-        session.query(Submission)
-        .filter(
-            Submission.status == "approved",
-            Submission.is_expired == False,
-            Submission.expires_at <= now
-        )
-        .all()
+def _due_query(session):
+    """IDs of open auctions past their end time (served by ix_submission_status_expired_expires)."""
+    return session.query(Submission.id).filter(
+        Submission.status == lifecycle.APPROVED,
+        Submission.is_expired == False,
+        Submission.expires_at <= datetime.utcnow()
     )
 
-    if not expired_items:
+
+def _ending_query(session):
+    return session.query(Submission.id).filter(Submission.status == lifecycle.ENDING)
+
+
+def _load_expired(session):
+    """IDs of open auctions past their end time, plus any left mid-announcement by a restart."""
+    # Two index range scans rather than one OR that the planner may turn into a full scan
+    return [row.id for row in _due_query(session)] + [row.id for row in _ending_query(session)]
+
+
+def _claim_due(session, item_ids):
+    """
+    Move the given auctions that are due to `ending` and return them.
+
+    Auctions already in `ending` are taken over as well: callers skip the IDs this
+    process is still announcing, so those are leftovers from an interrupted run.
+    """
+    due = [row.id for row in _due_query(session).filter(Submission.id.in_(item_ids))]
+    claimed = lifecycle.claim(session, due, lifecycle.APPROVED, lifecycle.ENDING)
+    claimed += [
+        row.id for row in _ending_query(session).filter(
+            Submission.id.in_(item_ids),
+            Submission.id.notin_(claimed)
+        )
+    ]
+    if not claimed:
+        return []
+    return session.query(Submission).filter(Submission.id.in_(claimed)).all()
+
+
+def _mark_ended(session, item_ids):
+    """Flip all announced auctions to ended in one statement."""
+    return lifecycle.transition_many(session, item_ids, lifecycle.ENDING, lifecycle.ENDED, is_expired=True)
+
+
+# Auctions currently being finalised (guards the scheduler and the sweep against each other)
+_finalizing: set[int] = set()
+# item_id -> side effects of its end already delivered (group, channel, winner, ...),
+# kept until it is marked ended so a retried announcement only sends what is missing
+_delivered: dict[int, set[str]] = {}
+
+
+async def check_expired_auctions(bot):
+    """Safety-net sweep: end every auction that is past its end time."""
+    expired_ids = await run_db(_load_expired)
+
+    if not expired_ids:
         print("✅ No expired auctions found.")
-        session.close()
         return
 
-    for submission in expired_items:
-        try:
-            item_id = submission.id
-            print(f"🔍 Processing expired auction ID: {item_id}")
-
-            type_name = getattr(submission, "type", "Waifu").capitalize()
-            rarity_text = f"💎 Rarity: {getattr(submission, 'rarity_name', '')} ({getattr(submission, 'rarity', '')})"
-
-            # --- Build clickable user links ---
-            owner_link = (
-                build_user_link(submission.user_id, submission.username)
-                if submission.user_id else "Unknown Seller"
-            )
-            winner_link = (
-                build_user_link(submission.last_bidder_id, submission.last_bidder_username)
-                if submission.last_bidder_id else "No Winner"
-            )
-
-            # --- Build announcement caption ---
-            announcement = (
-                f"🎉 <b>Auction Ended!</b>\n\n"
-                f"💞 <b>{type_name}</b>: <code>{getattr(submission, 'waifu_name', '')}</code>\n"
-                f"🎬 <b>Anime:</b> <code>{getattr(submission, 'anime_name', '')}</code>\n"
-                f"{rarity_text}\n\n"
-                f"💰 <b>Winning Bid:</b> <code>{submission.current_bid or 'N/A'}</code>\n"
-                f"👤 <b>Seller:</b> {owner_link}\n"
-                f"🏆 <b>Winner:</b> {winner_link}\n\n"
-                f"🆔 <b>Item ID:</b> <code>{item_id}</code>"
-            )
-
-            if getattr(submission, "optional_tag", None) and getattr(submission, "optional_tag") != "—":
-                announcement += f"\n{getattr(submission, 'optional_tag')}"
-
-            # --- Inline buttons (Contact Seller/Winner) ---
-            buttons = []
-            if submission.user_id:
-                buttons.append(InlineKeyboardButton("👤 Contact Seller", url=f"tg://user?id={submission.user_id}"))
-            if submission.last_bidder_id:
-                buttons.append(InlineKeyboardButton("🏆 Contact Winner", url=f"tg://user?id={submission.last_bidder_id}"))
-            reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
-
-            # === 1️⃣ Send announcement in main group ===
-            try:
-                await bot.send_photo(
-                    chat_id=GROUP_ID,
-                    photo=submission.file_id,
-                    caption=announcement,
-                    parse_mode="HTML",
-                    reply_markup=reply_markup
-                )
-            except Exception as e:
-                print(f"⚠️ Failed to send group announcement for item {item_id}: {e}")
-
-            # === 2️⃣ Edit channel post (mark ended) ===
-            if getattr(submission, "channel_message_id", None):
-                try:
-                    await bot.edit_message_caption(
-                        chat_id=submission.channel_id,
-                        message_id=submission.channel_message_id,
-                        caption=f"{announcement}\n\n⏰ <b>Auction Ended</b>",
-                        parse_mode="HTML",
-                        reply_markup=None
-                    )
-                except Exception as e:
-                    print(f"⚠️ Failed to edit channel caption for item {item_id}: {e}")
+    await finalize_auctions(bot, expired_ids)
 
-            # === 3️⃣ Notify winner (if any) ===
-            if submission.last_bidder_id:
-                try:
-                    winner_msg = (
-                        f"🎉 Congratulations {winner_link}!\n\n"
-                        f"You’ve <b>won</b> the auction for:\n"
-                        f"💞 <b>{type_name}</b>: {getattr(submission, 'waifu_name', '')}\n"
-                        f"🎬 <b>Anime:</b> {getattr(submission, 'anime_name', '')}\n\n"
-                        f"💰 <b>Final Bid:</b> <code>{submission.current_bid}</code>\n"
-                        f"🆔 <b>Item ID:</b> <code>{item_id}</code>\n\n"
-                        f"Please contact the seller for delivery 💎"
-                    )
-                    await bot.send_message(
-                        chat_id=submission.last_bidder_id,
-                        text=winner_msg,
-                        parse_mode="HTML"
-                    )
-                except Exception as e:
-                    print(f"⚠️ Failed to notify winner {submission.last_bidder_id}: {e}")
 
-            # === 4️⃣ Notify seller ===
-            if submission.user_id:
-                try:
-                    owner_msg = (
-                        f"🕊️ Hello {owner_link},\n\n"
-                        f"Your auction for <b>{getattr(submission, 'waifu_name', '')}</b> has ended!\n"
-                        f"🏆 <b>Winner:</b> {winner_link}\n"
-                        f"💰 <b>Final Bid:</b> <code>{submission.current_bid}</code>\n\n"
-                        f"🆔 <b>Item ID:</b> <code>{item_id}</code>\n"
-                        f"You can contact the winner directly."
-                    )
-                    await bot.send_message(
-                        chat_id=submission.user_id,
-                        text=owner_msg,
-                        parse_mode="HTML"
-                    )
-                except Exception as e:
-                    print(f"⚠️ Failed to notify seller {submission.user_id}: {e}")
+async def _deliver(item_id: int, step: str, coro):
+    """Await `coro` unless `step` already went out for this item, and record it once it has."""
+    done = _delivered.setdefault(item_id, set())
+    if step in done:
+        coro.close()
+        return
+    await coro
+    done.add(step)
 
-            # === 5️⃣ Log to admin/log group ===
-            if LOG_GROUP_ID:
-                try:
-                    await bot.send_photo(
-                        chat_id=LOG_GROUP_ID,
-                        photo=submission.file_id,
-                        caption=f"✅ <b>Auction Ended Log</b>\n\n{announcement}",
-                        parse_mode="HTML"
-                    )
-                except Exception as e:
-                    print(f"⚠️ Failed to send log for item {item_id}: {e}")
 
-            # === 6️⃣ Update database ===
-            submission.is_expired = True
-            submission.status = "ended"
-            session.commit()
+async def _attempt(coro, failure: str):
+    try:
+        await coro
+    except Exception as e:
+        print(f"⚠️ {failure}: {e}")
 
-            print(f"🕒 Auction ended: {submission.waifu_name or submission.anime_name} (ID: {item_id})")
 
-            await asyncio.sleep(1)  # Avoid Telegram rate limits
+def _nothing_to_edit(e: Exception) -> bool:
+    """The edit was already applied (a retried announcement) or the post is gone."""
+    err = str(e).lower()
+    return "message is not modified" in err or "message to edit not found" in err
 
-        except Exception as e:
-            print(f"⚠️ Error while processing expired auction ID {getattr(submission, 'id', 'unknown')}: {e}")
-            session.rollback()
 
-    session.close()
+async def _close_channel_post(submission, caption: str):
+    """Mark the channel post ended; raises if even its Bid Now button could not be removed."""
+    chat_id = submission.channel_id or CHANNEL_ID
+    try:
+        await outbound.edit_message_caption(
+            chat_id,
+            submission.channel_message_id,
+            Priority.ANNOUNCE,
+            caption=caption,
+            parse_mode="HTML",
+            reply_markup=InlineKeyboardMarkup([]),
+        )
+        return
+    except Exception as e:
+        if _nothing_to_edit(e):
+            return
+        print(f"⚠️ Failed to edit channel caption for item {submission.id}: {e}")
+
+    # At least make sure nobody can follow the Bid Now button any more
+    try:
+        await outbound.call(
+            "edit_message_reply_markup",
+            chat_id,
+            Priority.ANNOUNCE,
+            message_id=submission.channel_message_id,
+            reply_markup=InlineKeyboardMarkup([]),
+        )
+    except Exception as e:
+        if not _nothing_to_edit(e):
+            raise
+
+
+async def announce_auction_end(submission):
+    """
+    Send the end-of-auction notifications and post edits for one item.
+
+    The group announcement and closing the channel post go first and must both
+    succeed, otherwise this raises and the auction stays in `ending` for the next
+    sweep. The quick-bid cleanup, DMs and log post are best effort and sent
+    concurrently. Every send is recorded in `_delivered`, so a retry (or a pass
+    whose final UPDATE failed) skips whatever already went out.
+    """
+    item_id = submission.id
+    caption_coalescer.discard(item_id)  # no bid edit may land after the final caption
+
+    type_name = getattr(submission, "type", "Waifu").capitalize()
+    rarity_text = f"💎 Rarity: {getattr(submission, 'rarity_name', '')} ({getattr(submission, 'rarity', '')})"
+
+    # --- Build clickable user links ---
+    owner_link = (
+        build_user_link(submission.user_id, submission.username)
+        if submission.user_id else "Unknown Seller"
+    )
+    winner_link = (
+        build_user_link(submission.last_bidder_id, submission.last_bidder_username)
+        if submission.last_bidder_id else "No Winner"
+    )
+
+    # --- Build announcement caption ---
+    announcement = (
+        f"🎉 <b>Auction Ended!</b>\n\n"
+        f"💞 <b>{type_name}</b>: <code>{getattr(submission, 'waifu_name', '')}</code>\n"
+        f"🎬 <b>Anime:</b> <code>{getattr(submission, 'anime_name', '')}</code>\n"
+        f"{rarity_text}\n\n"
+        f"💰 <b>Winning Bid:</b> <code>{submission.current_bid or 'N/A'}</code>\n"
+        f"👤 <b>Seller:</b> {owner_link}\n"
+        f"🏆 <b>Winner:</b> {winner_link}\n\n"
+        f"🆔 <b>Item ID:</b> <code>{item_id}</code>"
+    )
+
+    if getattr(submission, "optional_tag", None) and getattr(submission, "optional_tag") != "—":
+        announcement += f"\n{getattr(submission, 'optional_tag')}"
+
+    # --- Inline buttons (Contact Seller/Winner) ---
+    buttons = []
+    if submission.user_id:
+        buttons.append(InlineKeyboardButton("👤 Contact Seller", url=f"tg://user?id={submission.user_id}"))
+    if submission.last_bidder_id:
+        buttons.append(InlineKeyboardButton("🏆 Contact Winner", url=f"tg://user?id={submission.last_bidder_id}"))
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+
+    required = []
+
+    # === 1️⃣ Send announcement in main group ===
+    required.append(_deliver(item_id, "group", outbound.send_photo(
+        chat_id=GROUP_ID,
+        photo=submission.file_id,
+        caption=announcement,
+        parse_mode="HTML",
+        reply_markup=reply_markup
+    )))
+
+    # === 2️⃣ Edit channel post (mark ended, drop the Bid Now button) ===
+    if getattr(submission, "channel_message_id", None):
+        required.append(_deliver(item_id, "channel", _close_channel_post(
+            submission,
+            f"{announcement}\n\n⏰ <b>Auction Ended</b>",
+        )))
+
+    failures = [r for r in await asyncio.gather(*required, return_exceptions=True) if isinstance(r, Exception)]
+    if failures:
+        raise RuntimeError(f"announcement for item {item_id} incomplete: {failures[0]}")
+
+    sends = []
+
+    # === 2️⃣b Drop the quick-bid buttons from the pinned group post ===
+    if getattr(submission, "group_message_id", None):
+        sends.append(_attempt(
+            _deliver(item_id, "quick_bid", outbound.call(
+                "edit_message_reply_markup",
+                GROUP_ID,
+                Priority.ANNOUNCE,
+                message_id=submission.group_message_id,
+                reply_markup=InlineKeyboardMarkup([]),
+            )),
+            f"Failed to remove quick-bid buttons for item {item_id}",
+        ))
+
+    # === 3️⃣ Notify winner (if any) ===
+    if submission.last_bidder_id:
+        winner_msg = (
+            f"🎉 Congratulations {winner_link}!\n\n"
+            f"You’ve <b>won</b> the auction for:\n"
+            f"💞 <b>{type_name}</b>: {getattr(submission, 'waifu_name', '')}\n"
+            f"🎬 <b>Anime:</b> {getattr(submission, 'anime_name', '')}\n\n"
+            f"💰 <b>Final Bid:</b> <code>{submission.current_bid}</code>\n"
+            f"🆔 <b>Item ID:</b> <code>{item_id}</code>\n\n"
+            f"Please contact the seller for delivery 💎"
+        )
+        sends.append(_attempt(
+            _deliver(item_id, "winner", outbound.send_message(
+                chat_id=submission.last_bidder_id,
+                text=winner_msg,
+                parse_mode="HTML"
+            )),
+            f"Failed to notify winner {submission.last_bidder_id}",
+        ))
+
+    # === 4️⃣ Notify seller ===
+    if submission.user_id:
+        owner_msg = (
+            f"🕊️ Hello {owner_link},\n\n"
+            f"Your auction for <b>{getattr(submission, 'waifu_name', '')}</b> has ended!\n"
+            f"🏆 <b>Winner:</b> {winner_link}\n"
+            f"💰 <b>Final Bid:</b> <code>{submission.current_bid}</code>\n\n"
+            f"🆔 <b>Item ID:</b> <code>{item_id}</code>\n"
+            f"You can contact the winner directly."
+        )
+        sends.append(_attempt(
+            _deliver(item_id, "seller", outbound.send_message(
+                chat_id=submission.user_id,
+                text=owner_msg,
+                parse_mode="HTML"
+            )),
+            f"Failed to notify seller {submission.user_id}",
+        ))
+
+    # === 5️⃣ Log to admin/log group ===
+    if LOG_GROUP_ID:
+        sends.append(_attempt(
+            _deliver(item_id, "log", outbound.send_photo(
+                chat_id=LOG_GROUP_ID,
+                priority=Priority.LOG,
+                photo=submission.file_id,
+                caption=f"✅ <b>Auction Ended Log</b>\n\n{announcement}",
+                parse_mode="HTML"
+            )),
+            f"Failed to send log for item {item_id}",
+        ))
+
+    await asyncio.gather(*sends)
+
+
+async def finalize_auctions(bot, item_ids):
+    """
+    End a batch of auctions.
+
+    Due auctions are claimed (approved -> ending), up to EXPIRY_WORKERS of them
+    are announced at once (each one's notifications also go out concurrently,
+    paced by the outbound queue), then every announced auction is moved to ended
+    with a single UPDATE. An auction whose group announcement or channel close
+    failed (announce_auction_end raises) stays in `ending` and is retried by the
+    next sweep.
+    """
+    item_ids = [item_id for item_id in item_ids if item_id not in _finalizing]
+    if not item_ids:
+        return
+    _finalizing.update(item_ids)
+    started = time.perf_counter()
+    ended = []
+    try:
+        # Only auctions this pass moves to `ending` are announced (no double announcements)
+        due = await run_db(_claim_due, item_ids)
+        catalog.remove(*(submission.id for submission in due))
+        workers = asyncio.Semaphore(EXPIRY_WORKERS)
+
+        async def finalize(submission):
+            async with workers:
+                try:
+                    await announce_auction_end(submission)
+                    ended.append(submission.id)
+                    print(f"🕒 Auction ended: {submission.waifu_name or submission.anime_name} (ID: {submission.id})")
+                except Exception as e:
+                    print(f"⚠️ Error while processing expired auction ID {submission.id}: {e}")
+
+        await asyncio.gather(*(finalize(submission) for submission in due))
+
+        # === 6️⃣ Update database (one statement for the whole batch) ===
+        if ended:
+            await run_db(_mark_ended, ended)
+            for item_id in ended:
+                _delivered.pop(item_id, None)
+    finally:
+        _finalizing.difference_update(item_ids)
+        if ended:
+            print(f"🏁 Ended {len(ended)} auction(s) in {time.perf_counter() - started:.2f}s")
 
 
 async def start_expiry_task(bot, interval: int = 5):
-    """Runs expiry checker every `interval` hours."""
+    """Runs the safety-net expiry sweep every `interval` minutes."""
     while True:
         try:
             print(f"⏱️ Checking expired auctions... ({datetime.utcnow().strftime('%H:%M:%S')})")
             await check_expired_auctions(bot)
         except Exception as e:
             print(f"⚠️ Expiry task crashed: {e}")
-        await asyncio.sleep(interval * 60)  # Wait given hours before next check
+        await asyncio.sleep(interval * 60)  # Wait given minutes before next check
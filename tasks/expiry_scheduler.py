@@ -0,0 +1,80 @@
+import asyncio
+import heapq
+from datetime import datetime
+from utils.database import run_db
+from models.tables import Submission
+from utils import lifecycle
+from tasks.auction_expiry import finalize_auctions
+
+
+def _query_upcoming(session):
+    return session.query(Submission.id, Submission.expires_at).filter(
+        Submission.status == lifecycle.APPROVED,
+        Submission.is_expired == False,
+        Submission.expires_at.isnot(None)
+    )
+
+
+def _load_upcoming(session):
+    return _query_upcoming(session).all()
+
+
+class ExpiryScheduler:
+    """
+    Ends each auction at its exact `expires_at`.
+
+    Upcoming end times live in a min-heap, loaded once at startup and extended on
+    approval; one task sleeps until the earliest one is due. Cancelled or moved
+    deadlines are dropped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        self._deadlines: dict[int, datetime] = {}  # item_id -> current end time
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self, bot):
+        for item_id, expires_at in await run_db(_load_upcoming):
+            self.schedule(item_id, expires_at)
+        print(f"⏱️ Expiry scheduler loaded {len(self._deadlines)} auction(s).")
+        self._task = asyncio.create_task(self._run(bot))
+
+    def schedule(self, item_id: int, expires_at: datetime):
+        """Add or move an auction's end time."""
+        self._deadlines[item_id] = expires_at
+        heapq.heappush(self._heap, (expires_at, item_id))
+        self._wakeup.set()
+
+    def cancel(self, item_id: int):
+        """Forget an auction that was ended or removed by other means."""
+        self._deadlines.pop(item_id, None)
+
+    def _pop_due(self, now: datetime) -> list[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, item_id = heapq.heappop(self._heap)
+            if self._deadlines.get(item_id) == expires_at:
+                del self._deadlines[item_id]
+                due.append(item_id)
+        return due
+
+    async def _run(self, bot):
+        while True:
+            due = self._pop_due(datetime.utcnow())
+            if due:
+                try:
+                    await finalize_auctions(bot, due)
+                except Exception as e:
+                    print(f"⚠️ Expiry scheduler failed for {due}: {e}")
+                continue
+
+            self._wakeup.clear()
+            timeout = (self._heap[0][0] - datetime.utcnow()).total_seconds() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+expiry_scheduler = ExpiryScheduler()
@@ -0,0 +1,127 @@
+import asyncio
+import sys
+from datetime import datetime, timezone
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_STOPPED
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.executors.base import BaseExecutor, run_coroutine_job
+from apscheduler.events import EVENT_JOB_ERROR
+from config import SCHEDULED_JOB_CATCHUP_WORKERS
+from utils.database import engine
+
+TABLE = "scheduled_jobs"
+
+
+class _LoopExecutor(BaseExecutor):
+    """Runs the scheduler thread's due jobs (coroutine functions) on the bot's event loop."""
+
+    def __init__(self):
+        super().__init__()
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    def _do_submit_job(self, job, run_times):
+        def callback(f):
+            try:
+                events = f.result()
+            except BaseException:
+                self._run_job_error(job.id, *sys.exc_info()[1:])
+            else:
+                self._run_job_success(job.id, events)
+
+        coro = run_coroutine_job(job, job._jobstore_alias, run_times, self._logger.name)
+        asyncio.run_coroutine_threadsafe(coro, self.loop).add_done_callback(callback)
+
+
+class _Scheduler(BackgroundScheduler):
+    def _process_jobs(self):
+        # The thread wakes once more on shutdown; processing then would drop due date jobs unrun
+        if self.state == STATE_STOPPED:
+            return None
+        return super()._process_jobs()
+
+
+class ScheduledJobs:
+    """
+    One-off jobs that must survive restarts, e.g. unpinning an auction post after
+    three days.
+
+    Jobs live in the `scheduled_jobs` table through APScheduler's
+    SQLAlchemyJobStore, so only module-level functions with plain arguments can be
+    scheduled. Late jobs are never dropped (no misfire grace limit) and repeated
+    misses coalesce into one run.
+
+    At startup the scheduler comes up paused while jobs that fell due during the
+    downtime are worked off by SCHEDULED_JOB_CATCHUP_WORKERS workers, oldest first.
+    Their API calls go through the outbound queue at its lowest priority, so a
+    backlog drains at the rate limits without delaying live traffic. Each job is
+    removed once done, so a restart halfway through only repeats what was in flight.
+
+    The job store uses the sync engine, so it is never touched from the event
+    loop: the scheduler polls it from its own thread and hands due jobs back to
+    the loop, and `schedule`, `cancel` and the catch-up query run in a worker
+    thread.
+
+    Auction expiry does not need this: end times are stored on Submission and
+    reloaded by tasks/expiry_scheduler.py.
+    """
+
+    def __init__(self):
+        self._store = SQLAlchemyJobStore(engine=engine, tablename=TABLE)
+        self._executor = _LoopExecutor()
+        self._scheduler = _Scheduler(
+            jobstores={"default": self._store},
+            executors={"default": self._executor},
+            job_defaults={"coalesce": True, "misfire_grace_time": None, "max_instances": 1},
+            timezone=timezone.utc,
+        )
+        self._scheduler.add_listener(self._on_error, EVENT_JOB_ERROR)
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._executor.loop = asyncio.get_running_loop()
+        await asyncio.to_thread(self._scheduler.start, paused=True)
+        self._task = asyncio.create_task(self._catch_up())
+
+    def shutdown(self):
+        if self._task:
+            self._task.cancel()
+        if self._scheduler.running:
+            self._scheduler.shutdown(wait=False)
+
+    async def schedule(self, func, run_at: datetime, *args, job_id: str):
+        """Run `func(*args)` at `run_at`; scheduling the same `job_id` again replaces it."""
+        await asyncio.to_thread(
+            self._scheduler.add_job,
+            func, "date", run_date=run_at, args=args, id=job_id, replace_existing=True,
+        )
+
+    async def cancel(self, job_id: str):
+        try:
+            await asyncio.to_thread(self._scheduler.remove_job, job_id)
+        except Exception:
+            pass  # already ran or never scheduled
+
+    async def _catch_up(self):
+        due = await asyncio.to_thread(self._store.get_due_jobs, datetime.now(timezone.utc))
+        if due:
+            print(f"⏱️ Catching up on {len(due)} overdue scheduled job(s)...")
+            pending = iter(due)
+
+            async def worker():
+                for job in pending:
+                    try:
+                        await job.func(*job.args, **job.kwargs)
+                    except Exception as e:
+                        print(f"[Scheduled job {job.id}] {e}")
+                    await self.cancel(job.id)
+
+            await asyncio.gather(*(worker() for _ in range(SCHEDULED_JOB_CATCHUP_WORKERS)))
+            print("✅ Scheduled job catch-up done.")
+        self._scheduler.resume()
+
+    @staticmethod
+    def _on_error(event):
+        print(f"[Scheduled job {event.job_id}] {event.exception}")
+
+
+scheduled_jobs = ScheduledJobs()
@@ -0,0 +1,76 @@
+# tests/conftest.py
+"""
+The bid engine against a throwaway SQLite database (aiosqlite through the async
+engine). DATABASE_URL is swapped out before utils.database is first imported,
+since that module builds its engines at import time.
+"""
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="auction_bot_tests_"), "test.db")
+config.DATABASE_URL = f"sqlite:///{DB_PATH}"
+
+from utils import database  # noqa: E402
+from utils.database import Base, engine, run_db  # noqa: E402
+from models.tables import Submission  # noqa: E402
+
+SELLER_ID = 1
+
+
+def run(coro):
+    """Run `coro` on a fresh event loop; pooled aiosqlite connections are closed with it."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            if database.async_engine is not None:
+                await database.async_engine.dispose()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(name="run")
+def run_fixture():
+    return run
+
+
+@pytest.fixture
+def seller_id() -> int:
+    return SELLER_ID
+
+
+@pytest.fixture(autouse=True)
+def fresh_db():
+    Base.metadata.drop_all(bind=engine)
+    database.init_db()
+    yield
+
+
+def _add_auction(session, base_bid: int, expires_at: datetime) -> int:
+    submission = Submission(
+        user_id=SELLER_ID,
+        type="waifu",
+        status="approved",
+        is_expired=False,
+        base_bid=base_bid,
+        expires_at=expires_at,
+    )
+    session.add(submission)
+    session.flush()
+    return submission.id
+
+
+@pytest.fixture
+def auction():
+    """Factory for a live (or, with `ended=True`, already expired) auction; returns its ID."""
+    def make(base_bid: int = 100, ended: bool = False) -> int:
+        expires_at = datetime.utcnow() + (timedelta(minutes=-1) if ended else timedelta(days=1))
+        return run(run_db(_add_auction, base_bid, expires_at))
+
+    return make
@@ -0,0 +1,133 @@
+# tests/test_add_flow.py
+import asyncio
+import time
+from types import SimpleNamespace
+
+from utils import add_flow as flow
+from utils.add_flow import AddFlow
+
+# No JobQueue: timeouts are not scheduled, and _expire is called by hand below
+CONTEXT = SimpleNamespace(job_queue=None)
+
+
+def _expire_now(add_flow: AddFlow, user_id: int):
+    add_flow._drafts[user_id].deadline = time.time() - 1
+
+
+# ====== BOUNDED STORE ======
+def test_least_recently_used_draft_is_evicted_past_the_cap(run):
+    add_flow = AddFlow(max_drafts=2)
+    add_flow.start(CONTEXT, 1)
+    add_flow.start(CONTEXT, 2)
+    assert run(add_flow.draft(1)) is not None  # 1 is now more recent than 2
+    add_flow.start(CONTEXT, 3)
+
+    assert add_flow.step(2) is None
+    assert add_flow.step(1) == flow.TYPE and add_flow.step(3) == flow.TYPE
+    assert len(add_flow) == 2 and add_flow.stats.evicted == 1
+
+
+def test_moving_to_a_step_counts_as_use():
+    add_flow = AddFlow(max_drafts=2)
+    add_flow.start(CONTEXT, 1)
+    add_flow.start(CONTEXT, 2)
+    add_flow.enter(CONTEXT, 1, flow.RARITY)
+    add_flow.start(CONTEXT, 3)
+    assert add_flow.step(1) == flow.RARITY and add_flow.step(2) is None
+
+
+def test_expired_drafts_are_dropped_before_the_cap_is_reached():
+    add_flow = AddFlow(max_drafts=10)
+    add_flow.start(CONTEXT, 1)
+    _expire_now(add_flow, 1)
+    add_flow.start(CONTEXT, 2)
+    assert 1 not in add_flow._drafts
+    assert add_flow.stats.expired == 1 and add_flow.stats.evicted == 0
+
+
+# ====== EXPIRY ======
+def test_expired_draft_matches_no_step_and_cannot_be_finished(run):
+    add_flow = AddFlow()
+    add_flow.start(CONTEXT, 1)
+    add_flow.enter(CONTEXT, 1, flow.BASE_BID)
+    _expire_now(add_flow, 1)
+    assert add_flow.step(1) is None
+    assert add_flow.counts()[flow.BASE_BID] == 0
+    assert run(add_flow.finish(CONTEXT, 1)) is None
+
+
+def test_timeout_drops_the_draft_and_tells_the_user(run, monkeypatch):
+    sent = []
+
+    async def send_message(chat_id, text, priority):
+        sent.append((chat_id, text))
+
+    monkeypatch.setattr(flow.outbound, "send_message", send_message)
+    add_flow = AddFlow()
+    add_flow.start(CONTEXT, 1)
+    add_flow.enter(CONTEXT, 1, flow.PHOTO)
+
+    stale = SimpleNamespace(job=SimpleNamespace(user_id=1, chat_id=1, data=flow.TYPE))
+    run(add_flow._expire(stale))  # fired for a step the user already left
+    assert add_flow.step(1) == flow.PHOTO and sent == []
+
+    current = SimpleNamespace(job=SimpleNamespace(user_id=1, chat_id=1, data=flow.PHOTO))
+    run(add_flow._expire(current))
+    assert add_flow.step(1) is None
+    assert sent == [(1, flow.EXPIRED_TEXT)]
+    assert add_flow.stats.expired == 1
+
+
+# ====== FINISHING ======
+def test_concurrent_finishes_submit_once(run):
+    add_flow = AddFlow()
+    add_flow.start(CONTEXT, 1)
+    add_flow.enter(CONTEXT, 1, flow.BASE_BID)
+
+    async def finish_twice():
+        return await asyncio.gather(add_flow.finish(CONTEXT, 1), add_flow.finish(CONTEXT, 1))
+
+    drafts = run(finish_twice())
+    assert sum(draft is not None for draft in drafts) == 1
+    assert add_flow.stats.submitted == 1
+
+
+def test_concurrent_finishes_of_a_restored_draft_submit_once(run):
+    saved = AddFlow()
+    draft = saved.start(CONTEXT, 1)
+    draft.waifu_name = "Rem"
+    saved.enter(CONTEXT, 1, flow.BASE_BID)
+    run(saved.flush())
+
+    # After a restart only the step is loaded; finish() reads the fields from the DB
+    add_flow = AddFlow()
+    run(add_flow.load(None))
+    assert add_flow.step(1) == flow.BASE_BID
+
+    async def finish_twice():
+        return await asyncio.gather(add_flow.finish(CONTEXT, 1), add_flow.finish(CONTEXT, 1))
+
+    drafts = [draft for draft in run(finish_twice()) if draft is not None]
+    assert len(drafts) == 1 and drafts[0].waifu_name == "Rem"
+
+
+def test_restore_puts_a_finished_draft_back_at_its_step(run):
+    add_flow = AddFlow()
+    add_flow.start(CONTEXT, 1)
+    add_flow.enter(CONTEXT, 1, flow.BASE_BID)
+    draft = run(add_flow.finish(CONTEXT, 1))
+
+    add_flow.restore(CONTEXT, 1, draft)
+    assert add_flow.step(1) == flow.BASE_BID
+    assert add_flow.stats.submitted == 0
+
+
+def test_restore_keeps_a_draft_started_meanwhile(run):
+    add_flow = AddFlow()
+    add_flow.start(CONTEXT, 1)
+    add_flow.enter(CONTEXT, 1, flow.BASE_BID)
+    draft = run(add_flow.finish(CONTEXT, 1))
+
+    add_flow.start(CONTEXT, 1)
+    add_flow.restore(CONTEXT, 1, draft)
+    assert add_flow.step(1) == flow.TYPE
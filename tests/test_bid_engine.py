@@ -0,0 +1,47 @@
+# tests/test_bid_engine.py
+import asyncio
+
+from config import MIN_BID_INCREMENT
+from utils.bid_engine import place_bid, BidStatus
+from utils.database import run_db
+from models.tables import Bid
+
+
+def _ledger(session, item_id: int) -> list[tuple[int, int]]:
+    return [(bid.bidder_id, bid.amount) for bid in session.query(Bid).filter_by(item_id=item_id).order_by(Bid.id)]
+
+
+# ====== DIRECT BIDS ======
+def test_concurrent_equal_bids_accept_exactly_one(auction, run):
+    item_id = auction(base_bid=100)
+
+    async def bid_all():
+        return await asyncio.gather(*(place_bid(item_id, 100 + i, f"@u{i}", 150) for i in range(20)))
+
+    results = run(bid_all())
+    accepted = [result for result in results if result.accepted]
+    assert len(accepted) == 1
+    assert all(result.status is BidStatus.TOO_LOW for result in results if not result.accepted)
+    assert run(run_db(_ledger, item_id)) == [(accepted[0].bidder_id, 150)]
+
+
+def test_seller_cannot_bid_on_own_item(auction, run, seller_id):
+    item_id = auction()
+    result = run(place_bid(item_id, seller_id, "@seller", 500))
+    assert result.status is BidStatus.SELF_BID
+    assert run(run_db(_ledger, item_id)) == []
+
+
+def test_bid_on_ended_auction_is_rejected(auction, run):
+    item_id = auction(ended=True)
+    result = run(place_bid(item_id, 2, "@a", 500))
+    assert result.status is BidStatus.ENDED
+
+
+def test_bid_below_min_increment_is_rejected(auction, run):
+    item_id = auction(base_bid=100)
+    run(place_bid(item_id, 2, "@a", 150))
+    result = run(place_bid(item_id, 3, "@b", 150 + MIN_BID_INCREMENT - 1))
+    assert result.status is BidStatus.TOO_LOW
+    assert result.min_next == 150 + MIN_BID_INCREMENT
+    assert result.submission.current_bid == 150
@@ -0,0 +1,129 @@
+# tests/test_catalog.py
+from datetime import datetime, timedelta
+
+from models.tables import Submission
+from utils import catalog as catalog_module
+from utils.catalog import Catalog
+from utils.pagination import Cursor
+
+
+def _submission(item_id: int, rarity_name: str = "Rare", user_id: int = 1, expires_in: int = 3600) -> Submission:
+    return Submission(
+        id=item_id,
+        user_id=user_id,
+        type="waifu",
+        rarity_name=rarity_name,
+        base_bid=100,
+        expires_at=datetime.utcnow() + timedelta(seconds=expires_in),
+    )
+
+
+def _ids(page) -> list[int]:
+    return [listing.id for listing in page.items]
+
+
+# ====== KEYSET PAGING ======
+def test_pages_walk_forward_and_back_in_id_order():
+    catalog = Catalog()
+    for item_id in (5, 1, 4, 2, 3):
+        catalog.add(_submission(item_id))
+
+    first = catalog.page("waifu", size=2)
+    assert _ids(first) == [1, 2] and first.prev is None
+    second = catalog.page("waifu", first.next, size=2)
+    assert _ids(second) == [3, 4]
+    last = catalog.page("waifu", second.next, size=2)
+    assert _ids(last) == [5] and last.next is None
+    assert _ids(catalog.page("waifu", last.prev, size=2)) == [3, 4]
+    assert _ids(catalog.page("waifu", second.prev, size=2)) == [1, 2]
+
+
+def test_paging_is_stable_when_auctions_end_in_between():
+    catalog = Catalog()
+    for item_id in range(1, 7):
+        catalog.add(_submission(item_id))
+    first = catalog.page("waifu", size=2)
+
+    catalog.remove(1, 3)
+    # The next page still starts after the last item shown, not at an offset
+    assert _ids(catalog.page("waifu", first.next, size=2)) == [4, 5]
+
+
+def test_cursor_past_the_end_falls_back_to_the_first_page():
+    catalog = Catalog()
+    for item_id in (1, 2, 3):
+        catalog.add(_submission(item_id))
+    assert _ids(catalog.page("waifu", Cursor("a", 3), size=2)) == [1, 2]
+
+
+def test_rarity_and_seller_filters_and_expired_listings():
+    catalog = Catalog()
+    catalog.add(_submission(1, rarity_name="Rare", user_id=7))
+    catalog.add(_submission(2, rarity_name="Epic", user_id=8))
+    catalog.add(_submission(3, rarity_name="Rare", user_id=8))
+    catalog.add(_submission(4, rarity_name="Rare", user_id=8, expires_in=-60))
+
+    assert _ids(catalog.page("waifu", rarity_name="Rare")) == [1, 3]
+    assert _ids(catalog.page("waifu", seller=8)) == [2, 3]
+    assert _ids(catalog.page("waifu", rarity_name="Rare", seller="8")) == [3]
+    assert catalog.rarities("waifu") == {"Rare", "Epic"}
+
+
+def test_listing_without_a_rarity_is_listed_once():
+    catalog = Catalog()
+    catalog.add(_submission(1, rarity_name=None))
+    assert catalog.count("waifu") == 1
+    assert _ids(catalog.page("waifu")) == [1]
+    catalog.remove(1)
+    assert catalog.count("waifu") == 0
+
+
+def test_bids_do_not_move_the_listing_version():
+    catalog = Catalog()
+    catalog.add(_submission(1))
+    version = catalog.version("waifu")
+    catalog.record_bid(1, 250)
+    assert catalog.get(1).current_bid == 250
+    assert catalog.version("waifu") == version
+    catalog.remove(1)
+    assert catalog.version("waifu") != version
+
+
+# ====== RELOADING ======
+def test_load_reads_only_live_approved_auctions(auction, run):
+    live = auction()
+    auction(ended=True)
+    catalog = Catalog()
+    run(catalog.load())
+    assert len(catalog) == 1 and catalog.get(live) is not None
+
+
+def test_changes_during_a_reload_survive_it(auction, run, monkeypatch):
+    stays, ends = auction(), auction()
+    catalog = Catalog()
+    run(catalog.load())
+    real_run_db = catalog_module.run_db
+
+    async def run_db_racing_events(fn, *args):
+        # The query has read the old state; these land before the swap
+        submissions = await real_run_db(fn, *args)
+        catalog.remove(ends)
+        catalog.add(_submission(99, rarity_name=None))
+        catalog.record_bid(stays, 300)
+        return submissions
+
+    monkeypatch.setattr(catalog_module, "run_db", run_db_racing_events)
+    run(catalog.load())
+
+    assert catalog.get(ends) is None
+    assert catalog.get(99) is not None
+    assert catalog.get(stays).current_bid == 300
+    assert _ids(catalog.page("waifu")) == [stays, 99]
+
+
+def test_changes_after_a_reload_are_not_replayed(run):
+    catalog = Catalog()
+    run(catalog.load())
+    catalog.add(_submission(1))
+    assert catalog._replay is None
+    assert _ids(catalog.page("waifu")) == [1]
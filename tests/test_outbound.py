@@ -0,0 +1,139 @@
+# tests/test_outbound.py
+"""
+The outbound queue against a fake bot. Each test builds its own OutboundQueue,
+since the queue and its semaphore belong to the event loop they were first used on.
+"""
+import asyncio
+
+import pytest
+from telegram.error import RetryAfter
+
+from utils.outbound import OutboundQueue, Priority, TokenBucket
+
+
+class FakeBot:
+    """Records (method, kwargs, loop time) per call; `fail` maps a method to errors to raise first."""
+
+    def __init__(self, fail: dict | None = None):
+        self.calls = []
+        self.fail = {method: list(errors) for method, errors in (fail or {}).items()}
+
+    def __getattr__(self, method):
+        async def call(**kwargs):
+            self.calls.append((method, kwargs, asyncio.get_running_loop().time()))
+            errors = self.fail.get(method)
+            if errors:
+                raise errors.pop(0)
+            return f"{method} ok"
+        return call
+
+
+async def _started(bot, buckets: dict | None = None) -> OutboundQueue:
+    queue = OutboundQueue()
+    if buckets:
+        queue._chats.update(buckets)
+        queue._last_prune = float("inf")  # fresh buckets look idle; keep them
+    queue.start(bot)
+    return queue
+
+
+# ====== ORDERING ======
+def test_higher_priority_goes_first_and_ties_keep_their_order(run):
+    bot = FakeBot()
+
+    async def main():
+        queue = await _started(bot)
+        futures = [
+            queue.send_message_nowait(1, "log", Priority.LOG),
+            queue.send_message_nowait(2, "notify 1", Priority.NOTIFY),
+            queue.send_message_nowait(3, "ack", Priority.BID_ACK),
+            queue.send_message_nowait(4, "notify 2", Priority.NOTIFY),
+            queue.send_message_nowait(5, "edit", Priority.EDIT),
+        ]
+        await asyncio.gather(*futures)
+        await queue.stop()
+
+    run(main())
+    assert [kwargs["text"] for _, kwargs, _ in bot.calls] == ["ack", "edit", "notify 1", "notify 2", "log"]
+
+
+# ====== RATE LIMITS ======
+def test_sends_to_one_chat_are_spaced_by_its_bucket(run):
+    bot = FakeBot()
+
+    async def main():
+        queue = await _started(bot, {-100: TokenBucket(rate=20, capacity=1)})  # one message every 50 ms
+        await asyncio.gather(*(queue.send_message(-100, str(i), Priority.ANNOUNCE) for i in range(4)))
+        await queue.stop()
+
+    run(main())
+    times = [at for _, _, at in bot.calls]
+    assert [kwargs["text"] for _, kwargs, _ in bot.calls] == ["0", "1", "2", "3"]
+    assert all(later - earlier >= 0.045 for earlier, later in zip(times, times[1:]))
+
+
+def test_a_busy_chat_does_not_hold_up_other_chats(run):
+    bot = FakeBot()
+
+    async def main():
+        queue = await _started(bot, {-100: TokenBucket(rate=5, capacity=1)})  # one message every 200 ms
+        busy = [queue.send_message_nowait(-100, f"group {i}", Priority.EDIT) for i in range(3)]
+        other = queue.send_message_nowait(7, "dm", Priority.LOG)
+        await asyncio.gather(other, *busy)
+        await queue.stop()
+
+    run(main())
+    assert [kwargs["text"] for _, kwargs, _ in bot.calls] == ["group 0", "dm", "group 1", "group 2"]
+
+
+def test_retry_after_is_retried_with_the_chat_rate_halved(run):
+    bot = FakeBot(fail={"send_message": [RetryAfter(0)]})
+
+    async def main():
+        queue = await _started(bot, {-100: TokenBucket(rate=20, capacity=1)})  # refills in 100 ms at half rate
+        result = await queue.send_message(-100, "hi", Priority.ANNOUNCE)
+        factor = queue._chats[-100].factor
+        await queue.stop()
+        return result, factor
+
+    result, factor = run(main())
+    assert result == "send_message ok"
+    assert len(bot.calls) == 2
+    assert factor == pytest.approx(0.5 * 1.05)  # halved, then one success
+
+
+# ====== NOWAIT CALLS ======
+def test_nowait_failures_are_logged(run, capsys):
+    bot = FakeBot(fail={"send_message": [ValueError("chat not found")]})
+
+    async def main():
+        queue = await _started(bot)
+        future = queue.send_message_nowait(42, "hi", Priority.BID_ACK)
+        await asyncio.gather(future, return_exceptions=True)
+        await asyncio.sleep(0)  # done-callbacks run on the next loop iteration
+        await queue.stop()
+
+    run(main())
+    assert "[OUTBOUND] send_message to 42 failed: chat not found" in capsys.readouterr().out
+
+
+def test_callback_answers_skip_the_per_chat_buckets(run):
+    bot = FakeBot()
+
+    async def main():
+        queue = await _started(bot)
+        await queue.answer_callback_nowait("cb1", text="Bid placed")
+        chats = dict(queue._chats)
+        await queue.stop()
+        return chats
+
+    assert run(main()) == {}
+    assert bot.calls[0][:2] == ("answer_callback_query", {"callback_query_id": "cb1", "text": "Bid placed"})
+
+
+def test_queueing_before_start_is_an_error(run):
+    async def main():
+        OutboundQueue().send_message_nowait(1, "hi")
+
+    with pytest.raises(RuntimeError):
+        run(main())
@@ -0,0 +1,52 @@
+# tests/test_proxy_bids.py
+from config import MIN_BID_INCREMENT
+from utils.bid_engine import place_bid, set_max_bid
+from utils.database import run_db
+from models.tables import Bid
+
+
+def _ledger(session, item_id: int) -> list[tuple[int, int]]:
+    return [(bid.bidder_id, bid.amount) for bid in session.query(Bid).filter_by(item_id=item_id).order_by(Bid.id)]
+
+
+# ====== MAXIMUM (PROXY) BIDS ======
+def test_highest_maximum_wins_at_runner_up_plus_increment(auction, run):
+    item_id = auction(base_bid=100)
+    run(set_max_bid(item_id, 2, "@a", 300))
+    result = run(set_max_bid(item_id, 3, "@b", 200))
+    assert result.accepted
+    assert result.submission.last_bidder_id == 2
+    assert result.submission.current_bid == 200 + MIN_BID_INCREMENT
+    # Only the outcome of the exchange is written, one ledger row per call
+    assert run(run_db(_ledger, item_id)) == [(2, 100 + MIN_BID_INCREMENT), (2, 200 + MIN_BID_INCREMENT)]
+
+
+def test_equal_maximums_go_to_the_earlier_one(auction, run):
+    item_id = auction(base_bid=100)
+    run(set_max_bid(item_id, 2, "@a", 250))
+    result = run(set_max_bid(item_id, 3, "@b", 250))
+    assert result.submission.last_bidder_id == 2
+    assert result.submission.current_bid == 250
+
+
+def test_maximum_outbids_a_direct_bid(auction, run):
+    item_id = auction(base_bid=100)
+    run(set_max_bid(item_id, 2, "@a", 300))
+    result = run(place_bid(item_id, 3, "@b", 200))
+    assert result.accepted
+    assert result.outbid_by_proxy
+    assert result.submission.last_bidder_id == 2
+    assert result.submission.current_bid == 200 + MIN_BID_INCREMENT
+
+
+def test_direct_bid_matching_an_earlier_maximum_does_not_take_the_lead(auction, run):
+    item_id = auction(base_bid=100)
+    run(set_max_bid(item_id, 70, "@p70", 400))
+    result = run(place_bid(item_id, 60, "@u60", 400))
+    assert result.outbid_by_proxy
+    assert result.submission.last_bidder_id == 70
+    assert result.submission.current_bid == 400
+
+    result = run(place_bid(item_id, 60, "@u60", 400 + MIN_BID_INCREMENT))
+    assert not result.outbid_by_proxy
+    assert result.submission.last_bidder_id == 60
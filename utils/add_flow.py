@@ -0,0 +1,335 @@
+# utils/add_flow.py
+"""
+In-flight /add submissions.
+
+    /add ──► type ──► rarity ──► photo ──► base_bid ──► (sent for approval)
+
+Each user with an unfinished /add has one Draft holding the step they are at and
+what they have entered so far. Every step has its own timeout
+(ADD_FLOW_TIMEOUTS); when it runs out the draft is dropped and the user gets a
+DM saying so. The store is also capped at ADD_FLOW_MAX_DRAFTS: past that, the
+least recently used draft is evicted, so memory stays bounded however many users
+start /add and walk away.
+
+The photo and base-bid handlers are registered with `add_flow.awaiting(step)` as
+their filter: a dict lookup that only matches a private message from a user
+currently at that step. Group chatter and everyone else's photos are turned away
+by the filter, before any handler code or membership check runs.
+
+Drafts survive restarts through the submission_drafts table. Changes only mark a
+draft dirty; `flush_forever` writes the dirty ones in one transaction every
+ADD_FLOW_FLUSH_INTERVAL seconds, and main.py flushes once more at shutdown.
+On startup `load` reads just each draft's step and deadline (enough for the
+filters and timeouts); the rest of a draft is read on its first `draft()`.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from telegram.constants import ChatType
+from telegram.ext import ContextTypes, JobQueue, filters
+from config import ADD_FLOW_TIMEOUTS, ADD_FLOW_MAX_DRAFTS
+from models.tables import SubmissionDraft
+from utils.database import run_db
+from utils.outbound import outbound, Priority
+
+TYPE = "type"
+RARITY = "rarity"
+PHOTO = "photo"
+BASE_BID = "base_bid"
+
+STEPS = (TYPE, RARITY, PHOTO, BASE_BID)
+
+EXPIRED_TEXT = "⌛ Your submission timed out. Use /add to start again."
+
+# Draft fields entered by the user, as stored in submission_drafts
+FIELDS = ("type", "rarity", "caption", "anime_name", "waifu_name", "optional_tag", "file_id")
+
+
+@dataclass(slots=True)
+class Draft:
+    step: str
+    deadline: float  # time.time() at which the current step times out
+    type: str | None = None
+    rarity: str | None = None
+    caption: str | None = None
+    anime_name: str | None = None
+    waifu_name: str | None = None
+    optional_tag: str | None = None
+    file_id: str | None = None
+    loaded: bool = True  # False until the fields of a draft restored at startup are read
+
+    def expired(self, now: float) -> bool:
+        return now >= self.deadline
+
+
+class FlowStats:
+    __slots__ = ("started", "submitted", "cancelled", "expired", "evicted")
+
+    def __init__(self):
+        self.started = 0
+        self.submitted = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.evicted = 0
+
+
+# ---------- DB helpers ----------
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _to_timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _load_steps(session) -> list[tuple[int, str, datetime]]:
+    return session.query(SubmissionDraft.user_id, SubmissionDraft.step, SubmissionDraft.deadline).all()
+
+
+def _load_fields(session, user_id: int) -> dict | None:
+    row = session.get(SubmissionDraft, user_id)
+    return {field: getattr(row, field) for field in FIELDS} if row else None
+
+
+def _write_drafts(session, rows: list[dict], deleted: list[int]):
+    for row in rows:
+        session.merge(SubmissionDraft(**row))
+    if deleted:
+        session.query(SubmissionDraft).filter(SubmissionDraft.user_id.in_(deleted)).delete(synchronize_session=False)
+
+
+class _Awaiting(filters.MessageFilter):
+    def __init__(self, flow: "AddFlow", step: str):
+        super().__init__(name=f"add_flow.awaiting({step!r})")
+        self.flow = flow
+        self.step = step
+
+    def filter(self, message) -> bool:
+        user = message.from_user
+        return (
+            message.chat.type == ChatType.PRIVATE
+            and user is not None
+            and self.flow.step(user.id) == self.step
+        )
+
+
+class AddFlow:
+    def __init__(self, max_drafts: int = ADD_FLOW_MAX_DRAFTS):
+        self.max_drafts = max_drafts
+        self._drafts: OrderedDict[int, Draft] = OrderedDict()  # least recently used first
+        self._dirty: set[int] = set()  # changed or dropped since the last flush
+        self.stats = FlowStats()
+
+    def __len__(self) -> int:
+        return len(self._drafts)
+
+    # ---------- lookups ----------
+
+    def step(self, user_id: int) -> str | None:
+        """The user's current step, or None if they have no live draft."""
+        draft = self._drafts.get(user_id)
+        if draft is None or draft.expired(time.time()):
+            return None
+        return draft.step
+
+    async def draft(self, user_id: int, step: str | None = None) -> Draft | None:
+        """The user's live draft (at `step`, if given), marking it recently used."""
+        draft = self._drafts.get(user_id)
+        if draft is None or draft.expired(time.time()) or (step and draft.step != step):
+            return None
+        self._drafts.move_to_end(user_id)
+        if not draft.loaded and not await self._load_fields(user_id, draft):
+            return None
+        return draft
+
+    def counts(self) -> dict[str, int]:
+        """Live drafts per step."""
+        now = time.time()
+        counts = dict.fromkeys(STEPS, 0)
+        for draft in self._drafts.values():
+            if not draft.expired(now):
+                counts[draft.step] += 1
+        return counts
+
+    # ---------- transitions ----------
+
+    def start(self, context: ContextTypes.DEFAULT_TYPE, user_id: int) -> Draft:
+        """Begin a new draft at the type step, replacing any unfinished one."""
+        self._drafts.pop(user_id, None)
+        draft = Draft(step=TYPE, deadline=0.0)
+        self._drafts[user_id] = draft
+        self.stats.started += 1
+        self.enter(context, user_id, TYPE)
+        self._evict(context.job_queue)
+        return draft
+
+    def enter(self, context: ContextTypes.DEFAULT_TYPE, user_id: int, step: str):
+        """Move the user's draft to `step` and restart the timer with that step's timeout."""
+        draft = self._drafts[user_id]
+        timeout = ADD_FLOW_TIMEOUTS[step]
+        draft.step = step
+        draft.deadline = time.time() + timeout
+        self._drafts.move_to_end(user_id)
+        self._dirty.add(user_id)
+        self._cancel_timeout(context.job_queue, user_id)
+        self._schedule_timeout(context.job_queue, user_id, step, timeout)
+
+    async def finish(self, context: ContextTypes.DEFAULT_TYPE, user_id: int) -> Draft | None:
+        """The draft was submitted: drop it and return it."""
+        draft = self._drop(context.job_queue, user_id)  # before any await, so it is only finished once
+        if draft is None or draft.expired(time.time()):
+            return None
+        if not draft.loaded and not await self._load_fields(user_id, draft):
+            return None
+        self.stats.submitted += 1
+        return draft
+
+    def restore(self, context: ContextTypes.DEFAULT_TYPE, user_id: int, draft: Draft):
+        """Put back a finished draft whose submission could not be saved, at its step with a fresh timeout."""
+        if user_id in self._drafts:
+            return  # they already started over
+        self._drafts[user_id] = draft
+        self.stats.submitted -= 1
+        self.enter(context, user_id, draft.step)
+        self._evict(context.job_queue)
+
+    def cancel(self, context: ContextTypes.DEFAULT_TYPE, user_id: int) -> bool:
+        """/cancel: drop the draft. False if there was nothing to cancel."""
+        draft = self._drop(context.job_queue, user_id)
+        if draft is None:
+            return False
+        self.stats.cancelled += 1
+        return True
+
+    def awaiting(self, step: str) -> filters.MessageFilter:
+        """Message filter matching private messages from users at `step`."""
+        return _Awaiting(self, step)
+
+    # ---------- persistence ----------
+
+    async def load(self, job_queue: JobQueue | None):
+        """Restore drafts saved before the last shutdown and re-arm their timeouts."""
+        now = time.time()
+        for user_id, step, deadline in await run_db(_load_steps):
+            if user_id in self._drafts:
+                continue
+            deadline = _to_timestamp(deadline)
+            self._drafts[user_id] = Draft(step=step, deadline=deadline, loaded=False)
+            # Overdue ones time out right away, so their owners still hear about it
+            self._schedule_timeout(job_queue, user_id, step, max(deadline - now, 0))
+
+    async def flush(self):
+        """Write every draft changed since the last flush, and delete dropped ones, in one transaction."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        rows, deleted = [], []
+        for user_id in dirty:
+            draft = self._drafts.get(user_id)
+            if draft is None:
+                deleted.append(user_id)
+            elif draft.loaded:
+                rows.append({
+                    "user_id": user_id,
+                    "step": draft.step,
+                    "deadline": _to_datetime(draft.deadline),
+                    **{field: getattr(draft, field) for field in FIELDS},
+                })
+        try:
+            await run_db(_write_drafts, rows, deleted)
+        except Exception:
+            self._dirty |= dirty  # retried on the next flush
+            raise
+
+    async def flush_forever(self, interval: float):
+        """Flush every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Saving /add drafts failed, will retry: {e}")
+
+    async def _load_fields(self, user_id: int, draft: Draft) -> bool:
+        fields = await run_db(_load_fields, user_id)
+        if fields is None:
+            # The row is gone (e.g. cleaned up by hand); treat the draft as lost
+            if self._drafts.get(user_id) is draft:
+                del self._drafts[user_id]
+            return False
+        for field, value in fields.items():
+            setattr(draft, field, value)
+        draft.loaded = True
+        return True
+
+    # ---------- housekeeping ----------
+
+    def _drop(self, job_queue: JobQueue | None, user_id: int) -> Draft | None:
+        self._cancel_timeout(job_queue, user_id)
+        draft = self._drafts.pop(user_id, None)
+        if draft is not None:
+            self._dirty.add(user_id)
+        return draft
+
+    def _evict(self, job_queue: JobQueue | None):
+        """Drop expired drafts from the cold end, then the least recently used past the cap."""
+        now = time.time()
+        while self._drafts:
+            user_id, draft = next(iter(self._drafts.items()))
+            if draft.expired(now):
+                self.stats.expired += 1
+            elif len(self._drafts) > self.max_drafts:
+                self.stats.evicted += 1
+            else:
+                break
+            self._drop(job_queue, user_id)
+
+    @staticmethod
+    def _job_name(user_id: int) -> str:
+        return f"add_flow_{user_id}"
+
+    def _schedule_timeout(self, job_queue: JobQueue | None, user_id: int, step: str, when: float):
+        if isinstance(job_queue, JobQueue):
+            job_queue.run_once(
+                self._expire,
+                when=when,
+                data=step,
+                user_id=user_id,
+                chat_id=user_id,
+                name=self._job_name(user_id),
+            )
+
+    def _cancel_timeout(self, job_queue: JobQueue | None, user_id: int):
+        if isinstance(job_queue, JobQueue):
+            for job in job_queue.get_jobs_by_name(self._job_name(user_id)):
+                job.schedule_removal()
+
+    async def _expire(self, context: ContextTypes.DEFAULT_TYPE):
+        job = context.job
+        draft = self._drafts.get(job.user_id)
+        if draft is None or draft.step != job.data:
+            return  # finished, restarted or evicted in the meantime
+        self._drop(None, job.user_id)  # this job is the timer; nothing left to cancel
+        self.stats.expired += 1
+        try:
+            await outbound.send_message(job.chat_id, EXPIRED_TEXT, Priority.NOTIFY)
+        except Exception as e:
+            print(f"[add_flow] Could not notify {job.user_id} of timeout: {e}")
+
+
+def format_flow_stats() -> str:
+    """One block for /status: drafts in flight per step and how past ones ended."""
+    counts = add_flow.counts()
+    stats = add_flow.stats
+    steps = ", ".join(f"<code>{step}</code>: {count}" for step, count in counts.items())
+    return (
+        f"In flight: {sum(counts.values())} ({steps})\n"
+        f"{stats.started} started, {stats.submitted} submitted, {stats.cancelled} cancelled, "
+        f"{stats.expired} timed out, {stats.evicted} evicted"
+    )
+
+
+add_flow = AddFlow()
@@ -0,0 +1,66 @@
+# utils/ban_cache.py
+import asyncio
+from utils.database import run_db
+from models.global_ban import GlobalBan
+
+
+def _load_ban_ids(session) -> list[int]:
+    return [int(user_id) for (user_id,) in session.query(GlobalBan.user_id)]
+
+
+class BanCache:
+    """
+    Process-wide set of globally banned user IDs.
+
+    Loaded at startup, updated in place by /aban and /unaban right after their DB
+    write, and reloaded from `global_bans` every few minutes to pick up rows
+    changed outside the bot. Ban checks are a set lookup with no DB round-trip.
+    """
+
+    def __init__(self):
+        self._banned: set[int] = set()
+        self._changes: dict[int, bool] | None = None  # local writes made while a reload is running
+
+    def is_banned(self, user_id: int) -> bool:
+        return int(user_id) in self._banned
+
+    def add(self, user_id: int):
+        self._record(int(user_id), True)
+        self._banned.add(int(user_id))
+
+    def discard(self, user_id: int):
+        self._record(int(user_id), False)
+        self._banned.discard(int(user_id))
+
+    def __len__(self) -> int:
+        return len(self._banned)
+
+    def _record(self, user_id: int, banned: bool):
+        if self._changes is not None:
+            self._changes[user_id] = banned
+
+    async def load(self):
+        """Replace the set with the table's contents, keeping bans/unbans made meanwhile."""
+        self._changes = {}
+        try:
+            banned = set(await run_db(_load_ban_ids))
+            for user_id, is_banned in self._changes.items():
+                if is_banned:
+                    banned.add(user_id)
+                else:
+                    banned.discard(user_id)
+            self._banned = banned
+        finally:
+            self._changes = None
+
+    async def reconcile_forever(self, interval: int):
+        """Reload every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"⚠️ Ban cache refresh failed, keeping the last known bans: {e}")
+
+
+ban_cache = BanCache()
@@ -0,0 +1,262 @@
+# utils/bid_engine.py
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import func, update, exists
+from sqlalchemy.exc import OperationalError
+from utils.database import run_db, release_session
+from models.tables import Submission, Bid, ProxyBid
+from models.global_ban import GlobalBan
+from utils import lifecycle
+from utils.catalog import catalog
+from config import MIN_BID_INCREMENT
+
+# MySQL: 1213 = deadlock, 1205 = lock wait timeout. SQLite reports "database is locked".
+RETRYABLE_MYSQL_ERRORS = {1205, 1213}
+MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.05  # seconds, doubled on every retry
+
+
+class BidStatus(str, Enum):
+    ACCEPTED = "accepted"
+    NOT_FOUND = "not_found"
+    ENDED = "ended"
+    SELF_BID = "self_bid"
+    TOO_LOW = "too_low"
+
+
+@dataclass(frozen=True)
+class BidResult:
+    status: BidStatus
+    item_id: int
+    amount: int
+    min_next: int = 0
+    submission: Submission | None = None
+    bidder_id: int | None = None
+
+    @property
+    def accepted(self) -> bool:
+        return self.status is BidStatus.ACCEPTED
+
+    @property
+    def outbid_by_proxy(self) -> bool:
+        """Accepted, but someone's maximum bid took the lead straight back."""
+        return self.accepted and self.submission is not None and self.submission.last_bidder_id != self.bidder_id
+
+
+def current_price(submission) -> int:
+    """Price the next bid has to beat (current bid, else base bid)."""
+    return submission.current_bid or submission.base_bid or 0
+
+
+def _is_retryable(exc: OperationalError) -> bool:
+    orig = getattr(exc, "orig", None)
+    code = getattr(orig, "errno", None)
+    if code is None and orig is not None and orig.args:
+        code = orig.args[0]
+    return code in RETRYABLE_MYSQL_ERRORS or "database is locked" in str(orig).lower()
+
+
+def _is_open(submission, now: datetime) -> bool:
+    return (
+        submission.status == lifecycle.APPROVED
+        and not submission.is_expired
+        and submission.expires_at is not None
+        and submission.expires_at > now
+    )
+
+
+def _rejection(submission, item_id: int, bidder_id: int, amount: int, now: datetime) -> BidResult:
+    """Why a bid (or maximum) on `submission` can't be taken."""
+    if not submission:
+        return BidResult(BidStatus.NOT_FOUND, item_id, amount, bidder_id=bidder_id)
+    if not _is_open(submission, now):
+        return BidResult(BidStatus.ENDED, item_id, amount, submission=submission, bidder_id=bidder_id)
+    if submission.user_id == bidder_id:
+        return BidResult(BidStatus.SELF_BID, item_id, amount, submission=submission, bidder_id=bidder_id)
+    return BidResult(
+        BidStatus.TOO_LOW, item_id, amount,
+        min_next=current_price(submission) + MIN_BID_INCREMENT,
+        submission=submission,
+        bidder_id=bidder_id,
+    )
+
+
+def _resolve_proxies(session, submission, now: datetime) -> bool:
+    """
+    Let registered maximum bids compete with the leader and with each other.
+
+    Runs in the caller's transaction with the Submission row already locked. The
+    outcome of the whole exchange is worked out up front (the highest maximum
+    wins at one increment over the runner-up, the earlier of two equal maximums
+    wins), so only the final price and leader are written, with one ledger row.
+    The leader's bid counts as a maximum placed at its bid time, so a direct bid
+    that only matches an earlier maximum loses to it. True if the price or leader
+    changed.
+    """
+    price = current_price(submission)
+    floor = price + MIN_BID_INCREMENT
+    leader = submission.last_bidder_id if submission.current_bid else None
+
+    # bidder_id -> (amount they stand behind, since when, username)
+    entries = {}
+    if leader is not None:
+        entries[leader] = (submission.current_bid, submission.last_bid_time or now, submission.last_bidder_username)
+
+    proxies = session.query(ProxyBid).filter(
+        ProxyBid.item_id == submission.id,
+        ProxyBid.max_amount >= price,
+        ~exists().where(GlobalBan.user_id == ProxyBid.bidder_id),
+    )
+    if submission.user_id is not None:
+        proxies = proxies.filter(ProxyBid.bidder_id != submission.user_id)
+    # Locking read: sees maximums committed after our snapshot was taken
+    proxies = proxies.with_for_update()
+    for proxy in proxies:
+        if proxy.bidder_id not in entries or proxy.max_amount > entries[proxy.bidder_id][0]:
+            entries[proxy.bidder_id] = (proxy.max_amount, proxy.created_at, proxy.bidder_username)
+
+    ranked = sorted(entries.items(), key=lambda entry: (-entry[1][0], entry[1][1]))
+    if not ranked:
+        return False
+    winner, (winner_max, _, winner_username) = ranked[0]
+    runner_up = ranked[1][1][0] if len(ranked) > 1 else None
+
+    if winner == leader:
+        # The leader's maximum only moves the price if someone else could outbid them
+        if runner_up is None or runner_up < floor:
+            return False
+        new_price = min(winner_max, runner_up + MIN_BID_INCREMENT)
+    elif winner_max < floor:
+        # Matched the leader's bid (or came within an increment of it) earlier: leads at its maximum
+        new_price = winner_max
+    else:
+        new_price = floor if runner_up is None else max(floor, min(winner_max, runner_up + MIN_BID_INCREMENT))
+
+    submission.current_bid = new_price
+    submission.last_bidder_id = winner
+    submission.last_bidder_username = winner_username
+    submission.last_bid_time = now
+    session.add(Bid(item_id=submission.id, bidder_id=winner, bidder_username=winner_username, amount=new_price, time=now))
+    return True
+
+
+def _apply_bid(session, item_id: int, bidder_id: int, bidder_username: str, amount: int) -> BidResult:
+    """
+    Validate and apply a bid with one conditional UPDATE.
+
+    The WHERE clause carries every rule (auction open, not the seller, amount high
+    enough), so two concurrent bids can't both win: MySQL serialises them on the
+    row lock and SQLite on its write lock. An accepted bid is also appended to
+    the `bids` ledger and answered by any higher maximum bids in the same
+    transaction; a rejected one re-reads the row to tell the bidder why.
+    """
+    now = datetime.utcnow()
+    price = func.coalesce(func.nullif(Submission.current_bid, 0), Submission.base_bid, 0)
+
+    result = session.execute(
+        update(Submission)
+        .where(
+            Submission.id == item_id,
+            Submission.status == lifecycle.APPROVED,
+            Submission.is_expired == False,
+            Submission.expires_at > now,
+            func.coalesce(Submission.user_id, 0) != bidder_id,
+            price + MIN_BID_INCREMENT <= amount,
+        )
+        .values(
+            current_bid=amount,
+            last_bidder_id=bidder_id,
+            last_bidder_username=bidder_username,
+            last_bid_time=now,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    # The UPDATE bypassed the identity map; make sure we see what it wrote
+    submission = session.get(Submission, item_id, populate_existing=True)
+    if result.rowcount == 1:
+        # History goes to the insert-only ledger instead of rewriting a JSON column
+        session.add(Bid(
+            item_id=item_id,
+            bidder_id=bidder_id,
+            bidder_username=bidder_username,
+            amount=amount,
+            time=now,
+        ))
+        _resolve_proxies(session, submission, now)
+        return BidResult(BidStatus.ACCEPTED, item_id, amount, submission=submission, bidder_id=bidder_id)
+
+    return _rejection(submission, item_id, bidder_id, amount, now)
+
+
+def _set_max_bid(session, item_id: int, bidder_id: int, bidder_username: str, max_amount: int) -> BidResult:
+    """
+    Register (or change) a bidder's maximum and let it compete right away.
+
+    The Submission row is locked first (SELECT ... FOR UPDATE; SQLite serialises
+    on its write lock), the same order _apply_bid takes, so the two can't deadlock.
+    """
+    now = datetime.utcnow()
+    submission = (
+        session.query(Submission)
+        .filter(Submission.id == item_id)
+        .with_for_update()
+        .populate_existing()
+        .one_or_none()
+    )
+    if (not submission or not _is_open(submission, now) or submission.user_id == bidder_id
+            or max_amount < current_price(submission) + MIN_BID_INCREMENT):
+        return _rejection(submission, item_id, bidder_id, max_amount, now)
+
+    session.merge(ProxyBid(
+        item_id=item_id,
+        bidder_id=bidder_id,
+        bidder_username=bidder_username,
+        max_amount=max_amount,
+        created_at=now,
+    ))
+    session.flush()
+    _resolve_proxies(session, submission, now)
+    return BidResult(BidStatus.ACCEPTED, item_id, max_amount, submission=submission, bidder_id=bidder_id)
+
+
+def _clear_max_bid(session, item_id: int, bidder_id: int) -> bool:
+    return session.query(ProxyBid).filter_by(item_id=item_id, bidder_id=bidder_id).delete() > 0
+
+
+async def _run_bid(fn, item_id: int, *args) -> BidResult:
+    """Run a bid transaction, retrying on deadlocks / lock timeouts."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            # Start from a fresh transaction: one the update opened earlier (message
+            # index, eligibility) would pin an old REPEATABLE READ snapshot
+            await release_session()
+            result = await run_db(fn, item_id, *args)
+            # Inside an update's unit of work: commit now, so the row lock is freed and a
+            # failed commit is retried here rather than after the bid was acknowledged
+            await release_session()
+            if result.accepted:
+                catalog.record_bid(item_id, result.submission.current_bid)
+            return result
+        except OperationalError as e:
+            if attempt == MAX_ATTEMPTS or not _is_retryable(e):
+                raise
+            print(f"[BID ENGINE] Lock conflict on item {item_id}, retry {attempt}: {e.orig}")
+            await asyncio.sleep(RETRY_BASE_DELAY * 2 ** attempt)
+
+
+async def place_bid(item_id: int, bidder_id: int, bidder_username: str, amount: int) -> BidResult:
+    """Atomically validate and apply a bid (and any maximum bids it triggers)."""
+    return await _run_bid(_apply_bid, item_id, bidder_id, bidder_username, amount)
+
+
+async def set_max_bid(item_id: int, bidder_id: int, bidder_username: str, max_amount: int) -> BidResult:
+    """Register a maximum bid; the returned submission shows who leads at what price afterwards."""
+    return await _run_bid(_set_max_bid, item_id, bidder_id, bidder_username, max_amount)
+
+
+async def clear_max_bid(item_id: int, bidder_id: int) -> bool:
+    """Withdraw a maximum bid. Bids it already placed stand."""
+    return await run_db(_clear_max_bid, item_id, bidder_id)
@@ -0,0 +1,74 @@
+# utils/callback_router.py
+"""
+One CallbackQueryHandler for every inline button.
+
+Callback data is `<namespace>:<action>[:<arg>...]`, e.g. `it:va:w:2:a40` for page 2
+of /items → Waifu. Handlers are found with a single dict lookup on (namespace,
+action) and get the remaining parts as `context.args`, like a CommandHandler's
+arguments:
+
+    callback_router.add_routes("it", {"va": view_all_handler, ...})
+    InlineKeyboardButton("Next ⏭️", callback_data=callback_data("it", "va", "w", 2, "a40"))
+
+Buttons sent before this scheme still work through `alias`, which translates
+their old data once on the way in.
+"""
+import re
+from telegram import Update
+from telegram.ext import ContextTypes, CallbackQueryHandler
+
+SEPARATOR = ":"
+
+# Listing categories as they appear in callback data
+CATEGORY_CODES = {"waifu": "w", "husbando": "h"}
+CATEGORIES = {code: category for category, code in CATEGORY_CODES.items()}
+
+
+def callback_data(namespace: str, action: str, *args) -> str:
+    return SEPARATOR.join((namespace, action, *map(str, args)))
+
+
+class CallbackRouter:
+    def __init__(self):
+        self._routes: dict[tuple[str, str], object] = {}
+        self._aliases: list[tuple[re.Pattern, str]] = []
+
+    def add_routes(self, namespace: str, routes: dict):
+        """Register `{action: callback}` under `namespace`."""
+        for action, callback in routes.items():
+            if (namespace, action) in self._routes:
+                raise ValueError(f"Callback route {namespace}{SEPARATOR}{action} registered twice")
+            self._routes[(namespace, action)] = callback
+
+    def alias(self, pattern: str, template: str):
+        """Translate old callback data matching `pattern` into `template` (filled with its groups)."""
+        self._aliases.append((re.compile(pattern), template))
+
+    def resolve(self, data: str):
+        """(callback, args) for a button's data, or None if nothing handles it."""
+        namespace, _, rest = data.partition(SEPARATOR)
+        action, *args = rest.split(SEPARATOR)
+        callback = self._routes.get((namespace, action))
+        if callback is not None:
+            return callback, args
+        for pattern, template in self._aliases:
+            match = pattern.match(data)
+            if match:
+                return self.resolve(template.format(*match.groups()))
+        return None
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        route = self.resolve(query.data or "")
+        if route is None:
+            print(f"⚠️ No handler for callback data {query.data!r}")
+            await query.answer()
+            return
+        callback, context.args = route
+        await callback(update, context)
+
+    def handler(self) -> CallbackQueryHandler:
+        return CallbackQueryHandler(self.dispatch)
+
+
+callback_router = CallbackRouter()
@@ -0,0 +1,123 @@
+# utils/caption_coalescer.py
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from telegram import InlineKeyboardMarkup
+from telegram.error import BadRequest
+from config import CAPTION_EDIT_WINDOW
+from utils.outbound import outbound, Priority
+
+
+@dataclass(frozen=True)
+class CaptionEdit:
+    chat_id: int
+    message_id: int
+    caption: str
+    reply_markup: InlineKeyboardMarkup | None = None
+
+    def rendered(self) -> tuple:
+        """What Telegram would actually show — used to skip no-op edits."""
+        return self.caption, self.reply_markup.to_json() if self.reply_markup else None
+
+
+class CaptionCoalescer:
+    """
+    Coalesces caption edits per auction item.
+
+    The first edit for an item goes out right away; edits arriving within the
+    next `window` seconds only replace the pending state, and the latest one is
+    flushed when the window closes. Edits whose rendered caption matches what was
+    last sent to that message are dropped.
+
+    Once an item is closed (ended or removed) its later submissions are refused,
+    so a bid that committed just before the close can't put the bid caption and
+    buttons back over the final one.
+    """
+
+    MAX_CLOSED = 10_000  # tombstones kept; a late submit only trails its close by moments
+
+    def __init__(self, window: float):
+        self.window = window
+        self._pending: dict[int, list] = {}         # item_id -> latest edits
+        self._versions: dict[int, int] = {}         # item_id -> highest version submitted
+        self._last_flush: dict[int, float] = {}     # item_id -> loop time of last flush
+        self._timers: dict[int, asyncio.Task] = {}
+        self._sent: dict[tuple, tuple] = {}         # (chat_id, message_id) -> last rendered caption
+        self._messages: dict[int, set] = {}         # item_id -> (chat_id, message_id) keys in _sent
+        self._closed: OrderedDict[int, None] = OrderedDict()  # closed item_ids, oldest first
+
+    def submit(self, item_id: int, edits: list[CaptionEdit], version: int = 0):
+        """
+        Queue the latest caption state for an item.
+
+        `version` must grow with the item's state (the bid amount works); an older
+        state submitted late by a slower handler is ignored.
+        """
+        if item_id in self._closed or version < self._versions.get(item_id, version):
+            return
+        self._versions[item_id] = version
+        self._pending[item_id] = edits
+        self._messages.setdefault(item_id, set()).update((e.chat_id, e.message_id) for e in edits)
+        if item_id not in self._timers:
+            self._schedule(item_id)
+
+    def discard(self, item_id: int):
+        """The item's auction is over: drop its pending edits and refuse any submitted later."""
+        self._closed[item_id] = None
+        if len(self._closed) > self.MAX_CLOSED:
+            self._closed.popitem(last=False)
+        timer = self._timers.pop(item_id, None)
+        if timer:
+            timer.cancel()
+        self._pending.pop(item_id, None)
+        self._versions.pop(item_id, None)
+        self._last_flush.pop(item_id, None)
+        for key in self._messages.pop(item_id, ()):
+            self._sent.pop(key, None)
+
+    def _schedule(self, item_id: int):
+        loop = asyncio.get_running_loop()
+        delay = max(0.0, self._last_flush.get(item_id, float("-inf")) + self.window - loop.time())
+        self._timers[item_id] = asyncio.create_task(self._flush_later(item_id, delay))
+
+    async def _flush_later(self, item_id: int, delay: float):
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            edits = self._pending.pop(item_id)
+            self._last_flush[item_id] = asyncio.get_running_loop().time()
+            await asyncio.gather(*(self._send(edit) for edit in edits))
+        except asyncio.CancelledError:
+            return
+        finally:
+            if self._timers.get(item_id) is asyncio.current_task():
+                del self._timers[item_id]
+        # A newer state arrived while we were sending
+        if item_id in self._pending:
+            self._schedule(item_id)
+
+    async def _send(self, edit: CaptionEdit):
+        key = (edit.chat_id, edit.message_id)
+        rendered = edit.rendered()
+        if self._sent.get(key) == rendered:
+            return
+        try:
+            await outbound.edit_message_caption(
+                edit.chat_id,
+                edit.message_id,
+                Priority.EDIT,
+                caption=edit.caption,
+                parse_mode="HTML",
+                reply_markup=edit.reply_markup,
+            )
+            self._sent[key] = rendered
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                self._sent[key] = rendered
+            else:
+                print(f"[Error updating caption {key}] {e}")
+        except Exception as e:
+            print(f"[Error updating caption {key}] {e}")
+
+
+caption_coalescer = CaptionCoalescer(CAPTION_EDIT_WINDOW)
@@ -0,0 +1,221 @@
+# utils/catalog.py
+import asyncio
+import itertools
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from models.tables import Submission
+from utils.database import run_db
+from utils import lifecycle
+from utils.pagination import Cursor, Page, FIRST_PAGE
+from config import LISTING_PAGE_SIZE
+
+
+@dataclass(frozen=True)
+class Listing:
+    """What browsing and quick bids need to know about one active auction."""
+    id: int
+    user_id: int | None
+    type: str
+    rarity_name: str | None
+    waifu_name: str | None
+    anime_name: str | None
+    channel_id: int | None
+    channel_message_id: int | None
+    expires_at: datetime | None
+    base_bid: int | None = None
+    current_bid: int = 0
+    version: int = 0  # bumped on every change, so caches can tell a stale render
+
+    @classmethod
+    def from_submission(cls, submission) -> "Listing":
+        return cls(
+            id=submission.id,
+            user_id=submission.user_id,
+            type=submission.type,
+            rarity_name=submission.rarity_name,
+            waifu_name=submission.waifu_name,
+            anime_name=submission.anime_name,
+            channel_id=submission.channel_id,
+            channel_message_id=submission.channel_message_id,
+            expires_at=submission.expires_at,
+            base_bid=submission.base_bid,
+            current_bid=submission.current_bid or 0,
+        )
+
+    def is_live(self, now: datetime) -> bool:
+        return self.expires_at is not None and self.expires_at > now
+
+
+# Shared by every Catalog instance so versions stay unique across reloads
+_version_clock = itertools.count(1)
+
+
+def _active_query(session):
+    return session.query(Submission).filter(
+        Submission.status == lifecycle.APPROVED,
+        Submission.is_expired == False,
+        Submission.expires_at > datetime.utcnow()
+    )
+
+
+def _load_active(session):
+    return _active_query(session).all()
+
+
+class Catalog:
+    """
+    In-process catalog of running auctions for /items and /myitems.
+
+    Built from the DB at startup and kept current by the code paths that change an
+    auction (approval, bids, expiry, /forceend, /rm), so browsing never queries the
+    DB. Listings are indexed by (type, rarity, seller) — either of the last two may
+    be None for "any" — with each index kept as a sorted list of IDs for keyset
+    paging. A periodic reload picks up anything changed outside the bot.
+    """
+
+    def __init__(self):
+        self._listings: dict[int, Listing] = {}
+        self._index: dict[tuple, list[int]] = defaultdict(list)
+        self._versions: dict[tuple, int] = {}  # index key -> version, moved on every insert/delete
+        self._replay: list | None = None  # changes made while a reload is running
+
+    # ====== LOADING ======
+    async def load(self):
+        """Rebuild from the DB, keeping changes that happen while the query runs."""
+        self._replay = []
+        try:
+            submissions = await run_db(_load_active)
+            fresh = Catalog()
+            for submission in submissions:
+                fresh._insert(Listing.from_submission(submission))
+            for change in self._replay:
+                change(fresh)
+            self._listings, self._index, self._versions = fresh._listings, fresh._index, fresh._versions
+        finally:
+            self._replay = None
+
+    async def reconcile_forever(self, interval: int):
+        """Reload every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"⚠️ Catalog refresh failed, keeping the current listings: {e}")
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    # ====== EVENTS ======
+    def _apply(self, change):
+        change(self)
+        if self._replay is not None:
+            self._replay.append(change)
+
+    def add(self, submission):
+        """An auction went live (approval)."""
+        listing = Listing.from_submission(submission)
+        self._apply(lambda catalog: catalog._insert(listing))
+
+    def record_bid(self, item_id: int, amount: int):
+        """An accepted bid changed the price."""
+        self._apply(lambda catalog: catalog._bump(item_id, current_bid=amount))
+
+    def remove(self, *item_ids: int):
+        """Auctions that ended or were cancelled."""
+        self._apply(lambda catalog: [catalog._delete(item_id) for item_id in item_ids])
+
+    # ====== QUERIES ======
+    def get(self, item_id: int) -> Listing | None:
+        return self._listings.get(item_id)
+
+    def count(self, category: str, rarity_name: str | None = None, seller=None) -> int:
+        return len(self._index.get((category, rarity_name, self._seller(seller)), ()))
+
+    def version(self, category: str, rarity_name: str | None = None, seller=None) -> int:
+        """Changes whenever an auction joins or leaves this listing (for PageCache)."""
+        return self._versions.get((category, rarity_name, self._seller(seller)), 0)
+
+    def rarities(self, category: str, seller=None) -> set:
+        seller = self._seller(seller)
+        return {
+            rarity for (type_, rarity, owner), ids in self._index.items()
+            if type_ == category and owner == seller and rarity is not None and ids
+        }
+
+    def page(self, category: str, cursor: Cursor = FIRST_PAGE, rarity_name: str | None = None,
+             seller=None, size: int = LISTING_PAGE_SIZE) -> Page:
+        """One page of live listings in id order, seeking from `cursor` like utils.pagination."""
+        ids = self._index.get((category, rarity_name, self._seller(seller)), [])
+        now = datetime.utcnow()
+
+        if cursor.direction == "b":
+            picked = self._collect(ids, reversed(range(bisect_left(ids, cursor.item_id))), now, size + 1)
+            items = list(reversed(picked[:size]))
+            if not items:
+                return self.page(category, FIRST_PAGE, rarity_name, seller, size)
+            return Page(items, Cursor("b", items[0].id) if len(picked) > size else None, Cursor("a", items[-1].id))
+
+        picked = self._collect(ids, range(bisect_right(ids, cursor.item_id), len(ids)), now, size + 1)
+        items = picked[:size]
+        if not items and cursor.item_id:
+            # Everything after the cursor ended meanwhile
+            return self.page(category, FIRST_PAGE, rarity_name, seller, size)
+        prev = Cursor("b", items[0].id) if items and cursor.item_id else None
+        return Page(items, prev, Cursor("a", items[-1].id) if len(picked) > size else None)
+
+    # ====== INTERNALS ======
+    @staticmethod
+    def _seller(seller):
+        return None if seller is None else int(seller)
+
+    @staticmethod
+    def _keys(listing: Listing) -> list[tuple]:
+        # Deduplicated: without a rarity, (type, None, ...) would otherwise be indexed twice
+        return list(dict.fromkeys(
+            (listing.type, rarity, seller)
+            for rarity in (None, listing.rarity_name)
+            for seller in (None, listing.user_id)
+        ))
+
+    def _collect(self, ids: list[int], positions, now: datetime, limit: int) -> list[Listing]:
+        # Skip auctions past their end time that the expiry scheduler hasn't removed yet
+        picked = []
+        for position in positions:
+            listing = self._listings[ids[position]]
+            if listing.is_live(now):
+                picked.append(listing)
+                if len(picked) == limit:
+                    break
+        return picked
+
+    def _insert(self, listing: Listing):
+        self._delete(listing.id)
+        self._listings[listing.id] = listing
+        for key in self._keys(listing):
+            insort(self._index[key], listing.id)
+            self._versions[key] = next(_version_clock)
+
+    def _delete(self, item_id: int):
+        listing = self._listings.pop(item_id, None)
+        if listing is None:
+            return
+        for key in self._keys(listing):
+            ids = self._index[key]
+            position = bisect_left(ids, item_id)
+            if position < len(ids) and ids[position] == item_id:
+                del ids[position]
+            self._versions[key] = next(_version_clock)
+            if not ids:
+                del self._index[key]
+
+    def _bump(self, item_id: int, **changes):
+        # Only non-rendered fields (the price) change this way, so listing versions stay put
+        listing = self._listings.get(item_id)
+        if listing is not None:
+            self._listings[item_id] = replace(listing, version=listing.version + 1, **changes)
+
+
+catalog = Catalog()
@@ -1,7 +1,9 @@
-import os
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
-from config import DATABASE_URL
+from config import DATABASE_URL, USE_ASYNC_DB
 
 # Detect if using SQLite
 is_sqlite = DATABASE_URL.startswith("sqlite")
@@ -23,11 +25,161 @@ else:
 
 # Define Base and session
 Base = declarative_base()
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+
+# ====== ASYNC ENGINE ======
+# Async drivers used for each backend (the sync URL's driver is swapped out)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Turn a sync DATABASE_URL into the matching async-driver URL."""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS[backend]}://{rest}"
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if USE_ASYNC_DB:
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        async_engine = create_async_engine(
+            to_async_url(DATABASE_URL),
+            pool_pre_ping=not is_sqlite,
+            echo=False,
+        )
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    except Exception as e:
+        # Missing aiomysql/aiosqlite -> keep running on the sync engine
+        print(f"⚠️ Async database driver unavailable, using sync engine: {e}")
+        async_engine = None
+        AsyncSessionLocal = None
+
+
+def _run_in_sync_session(fn, *args, **kwargs):
+    with SessionLocal.begin() as session:
+        return fn(session, *args, **kwargs)
+
+
+# ====== PER-UPDATE UNIT OF WORK ======
+class UnitOfWork:
+    """
+    One lazily opened session shared by every `run_db` call of a single task
+    (one Telegram update). Committed by `release()` — at the end of the update, or
+    earlier by `release_session()` before a slow network call — and rolled back
+    entirely if any statement in it fails.
+    """
+
+    def __init__(self):
+        self.task = asyncio.current_task()
+        self._session = None
+
+    async def run(self, fn, *args, **kwargs):
+        try:
+            if AsyncSessionLocal is not None:
+                if self._session is None:
+                    self._session = AsyncSessionLocal()
+                return await self._session.run_sync(fn, *args, **kwargs)
+            if self._session is None:
+                self._session = SessionLocal()
+            return await asyncio.to_thread(fn, self._session, *args, **kwargs)
+        except BaseException:
+            await self.discard()
+            raise
+
+    async def release(self):
+        """Commit and hand the connection back to the pool; the next `run` opens a new session."""
+        session, self._session = self._session, None
+        if session is None:
+            return
+        try:
+            if AsyncSessionLocal is not None:
+                await session.commit()
+            else:
+                await asyncio.to_thread(session.commit)
+        except BaseException:
+            await self._close(session, rollback=True)
+            raise
+        await self._close(session)
+
+    async def discard(self):
+        session, self._session = self._session, None
+        if session is not None:
+            await self._close(session, rollback=True)
+
+    @staticmethod
+    async def _close(session, rollback: bool = False):
+        if AsyncSessionLocal is not None:
+            if rollback:
+                await session.rollback()
+            await session.close()
+        else:
+            if rollback:
+                await asyncio.to_thread(session.rollback)
+            await asyncio.to_thread(session.close)
+
+
+_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar("unit_of_work", default=None)
+
+
+def _active_unit_of_work() -> UnitOfWork | None:
+    # Tasks spawned from a handler inherit the contextvar but must not share its session
+    uow = _unit_of_work.get()
+    return uow if uow is not None and uow.task is asyncio.current_task() else None
+
+
+@asynccontextmanager
+async def unit_of_work():
+    """Scope in which all `run_db` calls of the current task share one transaction."""
+    uow = UnitOfWork()
+    token = _unit_of_work.set(uow)
+    try:
+        yield uow
+        await uow.release()
+    except BaseException:
+        await uow.discard()
+        raise
+    finally:
+        _unit_of_work.reset(token)
+
+
+async def release_session():
+    """Commit the current unit of work (if any) and free its connection before slow I/O."""
+    uow = _active_unit_of_work()
+    if uow is not None:
+        await uow.release()
+
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Run `fn(session, *args, **kwargs)` without blocking the event loop.
+
+    `fn` is plain sync ORM code. Inside a unit of work (every Telegram update, see
+    utils/unit_of_work.py) it joins that update's shared transaction; otherwise it
+    gets a transaction of its own, committed when `fn` returns and rolled back if
+    it raises. With the async engine it runs through `AsyncSession.run_sync`;
+    otherwise it runs on the sync engine in a worker thread.
+    """
+    uow = _active_unit_of_work()
+    if uow is not None:
+        return await uow.run(fn, *args, **kwargs)
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal.begin() as session:
+            return await session.run_sync(fn, *args, **kwargs)
+    return await asyncio.to_thread(_run_in_sync_session, fn, *args, **kwargs)
+
 
 # Auto-create all tables
 def init_db():
-    # Import all models that define tables
-    from models.tables import Submission
+    # Importing the model modules registers their tables on Base.metadata
+    import models.tables  # noqa: F401
+    import models.global_ban  # noqa: F401
     Base.metadata.create_all(bind=engine)
-    print("✅ Database initialized successfully!")
\ No newline at end of file
+    print("✅ Database initialized successfully!")
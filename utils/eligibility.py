@@ -0,0 +1,128 @@
+# utils/eligibility.py
+"""
+Per-update user eligibility.
+
+A TypeHandler in group -1 attaches `context.eligibility` to every update before
+any other handler runs. Handlers then ask only for the checks they need:
+
+    failed = await context.eligibility.first_failure(NOT_BANNED, STARTED, MEMBER)
+
+Checks always run cheapest first (in-memory set, then DB, then Telegram API),
+stop at the first failure and are memoized for the rest of the update.
+"""
+import time
+from telegram import Update
+from telegram.ext import ContextTypes, TypeHandler
+from utils.database import run_db
+from utils.ban_cache import ban_cache
+from utils.membership import membership
+from models.tables import User
+
+NOT_BANNED = "not_banned"
+STARTED = "started"
+MEMBER = "member"
+
+# Evaluation order, cheapest first
+CHECK_ORDER = (NOT_BANNED, STARTED, MEMBER)
+
+
+def _has_user(session, user_id: int) -> bool:
+    return session.query(User.id).filter_by(id=user_id).first() is not None
+
+
+# Users only ever get added, so a positive answer never has to be re-read
+_started_users: set[int] = set()
+
+
+async def _check_not_banned(bot, user_id: int) -> bool:
+    return not ban_cache.is_banned(user_id)
+
+
+async def _check_started(bot, user_id: int) -> bool:
+    if user_id in _started_users:
+        return True
+    if await run_db(_has_user, user_id):
+        _started_users.add(user_id)
+        return True
+    return False
+
+
+async def _check_member(bot, user_id: int) -> bool:
+    return await membership.is_member(bot, user_id)
+
+
+CHECKS = {
+    NOT_BANNED: _check_not_banned,
+    STARTED: _check_started,
+    MEMBER: _check_member,
+}
+
+
+class CheckStats:
+    __slots__ = ("runs", "failures", "seconds")
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.seconds = 0.0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.seconds / self.runs * 1000 if self.runs else 0.0
+
+
+# Process-wide counters, shown by /status
+check_stats = {name: CheckStats() for name in CHECK_ORDER}
+
+
+def mark_started(user_id: int):
+    """Called by /start so the user's next command skips the DB lookup."""
+    _started_users.add(int(user_id))
+
+
+class Eligibility:
+    def __init__(self, bot, user_id: int | None):
+        self.bot = bot
+        self.user_id = user_id
+        self._results: dict[str, bool] = {}
+
+    async def check(self, name: str) -> bool:
+        if name not in self._results:
+            stats = check_stats[name]
+            started = time.perf_counter()
+            passed = self.user_id is not None and await CHECKS[name](self.bot, self.user_id)
+            stats.runs += 1
+            stats.seconds += time.perf_counter() - started
+            stats.failures += not passed
+            self._results[name] = passed
+        return self._results[name]
+
+    async def first_failure(self, *names: str) -> str | None:
+        """Run the requested checks cheapest first; the first one that fails, or None."""
+        for name in sorted(names, key=CHECK_ORDER.index):
+            if not await self.check(name):
+                return name
+        return None
+
+    def forget(self, name: str):
+        """Re-run a check on next use (e.g. membership after a 'Try Again')."""
+        self._results.pop(name, None)
+        if name == MEMBER and self.user_id is not None:
+            membership.forget(self.user_id)
+
+
+async def attach_eligibility(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    context.eligibility = Eligibility(context.bot, user.id if user else None)
+
+
+# Register in group -1 so it runs before every other handler
+eligibility_middleware = TypeHandler(Update, attach_eligibility)
+
+
+def format_check_stats() -> str:
+    """One line per check, in evaluation order, for /status."""
+    return "\n".join(
+        f"{i}. <code>{name}</code>: {stats.runs} run(s), {stats.failures} failed, {stats.avg_ms:.1f} ms avg"
+        for i, (name, stats) in enumerate(((n, check_stats[n]) for n in CHECK_ORDER), 1)
+    )
@@ -0,0 +1,75 @@
+# utils/lifecycle.py
+"""
+Auction lifecycle.
+
+    pending ──► approved ──► ending ──► ended
+       │            │                     ▲
+       │            ├─────────────────────┘  (/forceend)
+       │            └──► cancelled           (/rm)
+       ├──► rejected
+       └──► cancelled
+
+`ending` is held by the expiry pass while it announces the result, so no other
+path can end, cancel or bid on the auction in the meantime. Every move is a
+conditional UPDATE on the current status: whoever loses a race simply gets
+nothing back instead of acting on an auction twice.
+"""
+from models.tables import Submission
+
+PENDING = "pending"
+APPROVED = "approved"
+REJECTED = "rejected"
+ENDING = "ending"
+ENDED = "ended"
+CANCELLED = "cancelled"
+
+TRANSITIONS = {
+    PENDING: {APPROVED, REJECTED, CANCELLED},
+    APPROVED: {ENDING, ENDED, CANCELLED},
+    ENDING: {ENDED},
+}
+
+# States in which an auction is over; listings and bids treat these as closed
+FINAL_STATES = (REJECTED, ENDED, CANCELLED)
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def _sources(source) -> tuple:
+    return (source,) if isinstance(source, str) else tuple(source)
+
+
+def check_transition(source, target: str):
+    for state in _sources(source):
+        if target not in TRANSITIONS.get(state, ()):
+            raise InvalidTransition(f"{state} -> {target} is not allowed")
+
+
+def transition_many(session, item_ids, source, target: str, **values) -> int:
+    """
+    Move every item in `item_ids` that is still in `source` (a state or tuple of
+    states) to `target` in one statement, setting any extra column `values`.
+    Returns how many rows moved.
+    """
+    check_transition(source, target)
+    if not item_ids:
+        return 0
+    changes = {Submission.status: target}
+    changes.update({getattr(Submission, column): value for column, value in values.items()})
+    return (
+        session.query(Submission)
+        .filter(Submission.id.in_(item_ids), Submission.status.in_(_sources(source)))
+        .update(changes, synchronize_session=False)
+    )
+
+
+def transition(session, item_id: int, source, target: str, **values) -> bool:
+    """Move one item from `source` to `target`. False if it was no longer in `source`."""
+    return transition_many(session, [item_id], source, target, **values) == 1
+
+
+def claim(session, item_ids, source, target: str, **values) -> list[int]:
+    """Move each item separately and return the IDs this caller actually moved."""
+    return [item_id for item_id in item_ids if transition(session, item_id, source, target, **values)]
@@ -1,6 +1,7 @@
 # utils/logger.py
 import re
 from config import LOG_GROUP_ID
+from utils.outbound import outbound, Priority
 
 # MarkdownV2 special characters that need escaping
 MD2_SPECIAL_CHARS = r'_*[]()~`>#+-=|{}.!'
@@ -25,8 +26,9 @@ async def log_user_start(context, log_text: str):
     try:
         # Escape entire log text
         safe_text = escape_markdown(log_text)
-        await context.bot.send_message(
+        await outbound.send_message(
             chat_id=LOG_GROUP_ID,
+            priority=Priority.LOG,
             text=safe_text,
             parse_mode="MarkdownV2"
         )
@@ -34,7 +36,8 @@ async def log_user_start(context, log_text: str):
         # Print raw error for debugging
         print(f"Failed to send log: {e}")
         # Optional: fallback to plain text without MarkdownV2
-        await context.bot.send_message(
+        await outbound.send_message(
             chat_id=LOG_GROUP_ID,
+            priority=Priority.LOG,
             text=log_text
         )
\ No newline at end of file
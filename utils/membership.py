@@ -0,0 +1,93 @@
+# utils/membership.py
+import asyncio
+import time
+from telegram import Update
+from telegram.ext import ContextTypes, ChatMemberHandler
+from config import GROUP_ID, CHANNEL_ID, MEMBERSHIP_CACHE_TTL, MEMBERSHIP_NEGATIVE_TTL
+from utils.database import release_session
+
+NOT_MEMBER_STATUSES = ("left", "kicked")
+
+
+class MembershipCache:
+    """
+    Whether users are in the main group and channel.
+
+    Each (chat, user) answer is cached — members for `ttl`, non-members for the
+    shorter `negative_ttl` so someone who just joined isn't locked out for long.
+    Join/leave updates from ChatMemberHandler overwrite entries as they happen.
+    On a miss the group and channel lookups run concurrently, and concurrent
+    misses for the same user share one lookup.
+    """
+
+    MAX_ENTRIES = 50_000
+
+    def __init__(self, chat_ids: tuple, ttl: float, negative_ttl: float):
+        self.chat_ids = tuple(int(chat_id) for chat_id in chat_ids)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: dict[tuple[int, int], tuple[float, bool]] = {}  # (chat_id, user_id) -> (expires at, member)
+        self._lookups: dict[tuple[int, int], asyncio.Task] = {}
+
+    def _cached(self, chat_id: int, user_id: int) -> bool | None:
+        entry = self._entries.get((chat_id, user_id))
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def set(self, chat_id: int, user_id: int, member: bool):
+        now = time.monotonic()
+        if len(self._entries) >= self.MAX_ENTRIES:
+            self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+        self._entries[(int(chat_id), int(user_id))] = (now + (self.ttl if member else self.negative_ttl), member)
+
+    def forget(self, user_id: int):
+        """Drop a user's entries, e.g. when they press 'Try Again' after joining."""
+        for chat_id in self.chat_ids:
+            self._entries.pop((chat_id, int(user_id)), None)
+
+    async def _lookup(self, bot, chat_id: int, user_id: int) -> bool:
+        try:
+            member = await bot.get_chat_member(chat_id, user_id)
+        except Exception:
+            return False  # not cached: could be a transient API error
+        is_member = member.status not in NOT_MEMBER_STATUSES
+        self.set(chat_id, user_id, is_member)
+        return is_member
+
+    def _lookup_shared(self, bot, chat_id: int, user_id: int) -> asyncio.Task:
+        key = (chat_id, user_id)
+        task = self._lookups.get(key)
+        if task is None:
+            task = self._lookups[key] = asyncio.create_task(self._lookup(bot, chat_id, user_id))
+            task.add_done_callback(lambda _: self._lookups.pop(key, None))
+        return task
+
+    async def is_member(self, bot, user_id: int) -> bool:
+        user_id = int(user_id)
+        cached = [self._cached(chat_id, user_id) for chat_id in self.chat_ids]
+        if False in cached:
+            return False
+        missing = [chat_id for chat_id, answer in zip(self.chat_ids, cached) if answer is None]
+        if not missing:
+            return True
+        # The lookups run in tasks of their own, where the update's unit of work
+        # can't see (and release) its connection, so free it here first
+        await release_session()
+        results = await asyncio.gather(*(self._lookup_shared(bot, chat_id, user_id) for chat_id in missing))
+        return all(results)
+
+    async def on_chat_member(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """ChatMemberHandler callback: record joins/leaves in our group and channel."""
+        change = update.chat_member
+        if change is None or change.chat.id not in self.chat_ids:
+            return
+        member = change.new_chat_member
+        self.set(change.chat.id, member.user.id, member.status not in NOT_MEMBER_STATUSES)
+
+
+membership = MembershipCache((GROUP_ID, CHANNEL_ID), MEMBERSHIP_CACHE_TTL, MEMBERSHIP_NEGATIVE_TTL)
+
+
+# Needs "chat_member" in allowed_updates and the bot to be an admin in both chats
+chat_member_handler = ChatMemberHandler(membership.on_chat_member, ChatMemberHandler.CHAT_MEMBER)
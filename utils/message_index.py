@@ -0,0 +1,60 @@
+# utils/message_index.py
+from collections import OrderedDict
+from models.tables import MessageIndex
+from utils.database import run_db
+
+
+def index_message(session, chat_id: int, message_id: int, item_id: int):
+    """DB helper: record that a posted message belongs to an auction (call with the post's own save)."""
+    session.merge(MessageIndex(chat_id=int(chat_id), message_id=int(message_id), item_id=item_id))
+
+
+def _lookup_item_id(session, chat_id: int, message_id: int) -> int | None:
+    row = session.get(MessageIndex, (chat_id, message_id))
+    return row.item_id if row else None
+
+
+def post_key(message) -> tuple[int, int]:
+    """
+    (chat_id, message_id) of the auction post a message is, following automatic
+    forwards so a reply to a channel post's copy in the linked group resolves too.
+    """
+    origin = getattr(message, "forward_origin", None)
+    if message.is_automatic_forward and getattr(origin, "chat", None) and getattr(origin, "message_id", None):
+        return origin.chat.id, origin.message_id
+    return message.chat_id, message.message_id
+
+
+class MessageIndexCache:
+    """
+    Recently used (chat, message) -> item mappings in front of the message_index
+    table. Approval fills it as it posts, so replies to fresh auctions are a dict
+    hit; older posts cost one primary-key lookup.
+    """
+
+    MAX_ENTRIES = 10_000
+
+    def __init__(self):
+        self._entries: OrderedDict[tuple[int, int], int] = OrderedDict()
+
+    def remember(self, chat_id: int, message_id: int, item_id: int):
+        key = (int(chat_id), int(message_id))
+        self._entries[key] = item_id
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.MAX_ENTRIES:
+            self._entries.popitem(last=False)
+
+    async def resolve(self, chat_id: int, message_id: int) -> int | None:
+        """Item ID of the auction post (chat_id, message_id), or None if it isn't one."""
+        key = (int(chat_id), int(message_id))
+        item_id = self._entries.get(key)
+        if item_id is not None:
+            self._entries.move_to_end(key)
+            return item_id
+        item_id = await run_db(_lookup_item_id, *key)
+        if item_id is not None:
+            self.remember(*key, item_id)
+        return item_id
+
+
+message_index = MessageIndexCache()
@@ -0,0 +1,246 @@
+# utils/outbound.py
+import asyncio
+import functools
+import itertools
+from enum import IntEnum
+from telegram.error import RetryAfter
+from utils.database import release_session
+from config import (
+    GLOBAL_SEND_RATE,
+    PRIVATE_CHAT_SEND_RATE,
+    GROUP_CHAT_SEND_RATE,
+    OUTBOUND_MAX_IN_FLIGHT,
+    OUTBOUND_MAX_RETRIES,
+)
+
+
+class Priority(IntEnum):
+    """Lower value goes first."""
+    BID_ACK = 0    # replies to the user who just bid or ran a command
+    EDIT = 1       # live caption edits
+    ANNOUNCE = 2   # approvals, auction-end announcements, pins
+    NOTIFY = 3     # DMs to sellers / winners
+    LOG = 4        # log group
+    HOUSEKEEPING = 5  # scheduled cleanup such as unpins, incl. catch-up after a restart
+
+
+class TokenBucket:
+    """Token bucket whose rate backs off on 429s and slowly recovers on success."""
+
+    MIN_FACTOR = 0.1
+
+    def __init__(self, rate: float, capacity: float):
+        self.base_rate = rate
+        self.capacity = capacity
+        self.factor = 1.0          # adaptive multiplier on base_rate
+        self.tokens = capacity
+        self.updated = 0.0
+        self.blocked_until = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.base_rate * self.factor
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until one token is available (0 if it is now)."""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def penalize(self, now: float, retry_after: float):
+        """Telegram said slow down: block for `retry_after` and halve the rate."""
+        self.blocked_until = max(self.blocked_until, now + retry_after)
+        self.factor = max(self.MIN_FACTOR, self.factor / 2)
+        self.tokens = 0
+
+    def reward(self):
+        self.factor = min(1.0, self.factor * 1.05)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and self.factor == 1.0 and now >= self.blocked_until
+
+
+class _Job:
+    __slots__ = ("method", "chat_id", "kwargs", "future", "attempts")
+
+    def __init__(self, method: str, chat_id: int | None, kwargs: dict, future: asyncio.Future):
+        self.method = method
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.future = future
+        self.attempts = 0
+
+
+def _log_failure(method: str, chat_id: int | None, future: asyncio.Future):
+    """Done-callback of a call nobody waits for: its error would otherwise go unseen."""
+    if not future.cancelled() and future.exception() is not None:
+        print(f"[OUTBOUND] {method} to {chat_id} failed: {future.exception()}")
+
+
+class OutboundQueue:
+    """
+    Single outbound path for bot API calls that send or edit messages.
+
+    Calls are queued by priority, spaced by a global token bucket and one bucket
+    per chat (groups get Telegram's ~20/min, private chats ~1/s), and retried
+    after `RetryAfter` with that chat's rate halved until it recovers. Awaiting a
+    call returns the Telegram result or raises its error, like calling the bot.
+
+    Handlers replying to a user use the `*_nowait` variants instead: those only
+    queue the call and log a failure when it happens, so a handler never sits on
+    one of the update slots while a busy group's bucket refills.
+    """
+
+    PRUNE_INTERVAL = 300  # seconds between dropping idle per-chat buckets
+
+    def __init__(self):
+        self._bot = None
+        self._queue: asyncio.PriorityQueue | None = None
+        self._seq = itertools.count()
+        self._global = TokenBucket(GLOBAL_SEND_RATE, GLOBAL_SEND_RATE)
+        self._chats: dict[int, TokenBucket] = {}
+        self._slots = asyncio.Semaphore(OUTBOUND_MAX_IN_FLIGHT)
+        self._task: asyncio.Task | None = None
+        self._last_prune = 0.0
+
+    # ====== LIFECYCLE ======
+    def start(self, bot):
+        self._bot = bot
+        self._queue = asyncio.PriorityQueue()
+        self._task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    # ====== PUBLIC API ======
+    async def call(self, method: str, chat_id: int, priority: Priority = Priority.NOTIFY, **kwargs):
+        """Queue `bot.<method>(chat_id=chat_id, **kwargs)` and wait for its result."""
+        await release_session()  # don't hold the update's DB transaction while queued
+        return await self._enqueue(method, chat_id, priority, kwargs)
+
+    def call_nowait(self, method: str, chat_id: int | None, priority: Priority = Priority.NOTIFY, **kwargs) -> asyncio.Future:
+        """
+        Queue `bot.<method>(chat_id=chat_id, **kwargs)` and return its future at once.
+
+        A failure is logged from the future's done-callback. With `chat_id=None`
+        (calls not aimed at a chat) only the global bucket applies.
+        """
+        future = self._enqueue(method, chat_id, priority, kwargs)
+        future.add_done_callback(functools.partial(_log_failure, method, chat_id))
+        return future
+
+    async def send_message(self, chat_id: int, text: str, priority: Priority = Priority.NOTIFY, **kwargs):
+        return await self.call("send_message", chat_id, priority, text=text, **kwargs)
+
+    async def send_photo(self, chat_id: int, photo, priority: Priority = Priority.ANNOUNCE, **kwargs):
+        return await self.call("send_photo", chat_id, priority, photo=photo, **kwargs)
+
+    async def edit_message_caption(self, chat_id: int, message_id: int, priority: Priority = Priority.EDIT, **kwargs):
+        return await self.call("edit_message_caption", chat_id, priority, message_id=message_id, **kwargs)
+
+    def send_message_nowait(self, chat_id: int, text: str, priority: Priority = Priority.NOTIFY, **kwargs) -> asyncio.Future:
+        return self.call_nowait("send_message", chat_id, priority, text=text, **kwargs)
+
+    def answer_callback_nowait(self, callback_query_id: str, priority: Priority = Priority.BID_ACK, **kwargs) -> asyncio.Future:
+        """Answer a button tap (toast or alert)."""
+        return self.call_nowait("answer_callback_query", None, priority, callback_query_id=callback_query_id, **kwargs)
+
+    # ====== INTERNALS ======
+    def _enqueue(self, method: str, chat_id: int | None, priority: Priority, kwargs: dict) -> asyncio.Future:
+        if self._queue is None:
+            raise RuntimeError("Outbound queue not started")
+        future = asyncio.get_running_loop().create_future()
+        if chat_id is not None:
+            kwargs = dict(kwargs, chat_id=chat_id)
+            chat_id = int(chat_id)
+        self._put(priority, _Job(method, chat_id, kwargs, future))
+        return future
+
+    def _put(self, priority: int, job: _Job):
+        self._queue.put_nowait((priority, next(self._seq), job))
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = GROUP_CHAT_SEND_RATE if chat_id < 0 else PRIVATE_CHAT_SEND_RATE
+            bucket = self._chats[chat_id] = TokenBucket(rate, capacity=max(3.0, rate * 3))
+        return bucket
+
+    def _prune(self, now: float):
+        if now - self._last_prune < self.PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        for chat_id in [c for c, b in self._chats.items() if b.idle(now)]:
+            del self._chats[chat_id]
+
+    async def _dispatch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, seq, job = await self._queue.get()
+            if job.future.done():  # caller gave up
+                continue
+            now = loop.time()
+            self._prune(now)
+
+            # A busy chat must not hold up other chats: park the job until its slot
+            chat_wait = self._bucket(job.chat_id).delay(now) if job.chat_id is not None else 0
+            if chat_wait > 0:
+                loop.call_later(chat_wait, self._queue.put_nowait, (priority, seq, job))
+                continue
+
+            global_wait = self._global.delay(now)
+            if global_wait > 0:
+                await asyncio.sleep(global_wait)
+                now = loop.time()
+
+            self._global.take(now)
+            if job.chat_id is not None:
+                self._bucket(job.chat_id).take(now)
+            await self._slots.acquire()
+            asyncio.create_task(self._run(priority, job))
+
+    async def _run(self, priority: int, job: _Job):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await getattr(self._bot, job.method)(**job.kwargs)
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            retry_after = float(getattr(retry_after, "total_seconds", lambda: retry_after)())
+            now = loop.time()
+            if job.chat_id is not None:
+                self._bucket(job.chat_id).penalize(now, retry_after)
+            self._global.factor = max(TokenBucket.MIN_FACTOR, self._global.factor * 0.9)
+            job.attempts += 1
+            if job.attempts > OUTBOUND_MAX_RETRIES:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                print(f"[OUTBOUND] 429 in chat {job.chat_id}, retrying in {retry_after:.0f}s")
+                self._put(priority, job)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if job.chat_id is not None:
+                self._bucket(job.chat_id).reward()
+            self._global.reward()
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._slots.release()
+
+
+outbound = OutboundQueue()
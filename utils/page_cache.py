@@ -0,0 +1,35 @@
+# utils/page_cache.py
+from collections import OrderedDict
+from config import LISTING_PAGE_CACHE_SIZE
+
+
+class PageCache:
+    """
+    Rendered listing pages (text + keyboard), least recently used evicted first.
+
+    Each entry remembers the catalog version of its listing (see Catalog.version);
+    once an auction joins or leaves that listing the version moves on and the entry
+    is rendered again on the next tap.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[int, object]] = OrderedDict()  # key -> (version, rendered)
+
+    def get_or_render(self, key: tuple, version: int, render, *args):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            return entry[1]
+        rendered = render(*args)
+        self._entries[key] = (version, rendered)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return rendered
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+page_cache = PageCache(LISTING_PAGE_CACHE_SIZE)
@@ -0,0 +1,41 @@
+# utils/pagination.py
+from dataclasses import dataclass
+from config import LISTING_PAGE_SIZE
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """
+    Position in an id-ordered listing, carried in callback data as `a<id>` / `b<id>`.
+
+    `a` = the page starting after `item_id` (a0 is the first page),
+    `b` = the page ending just before `item_id` (for ⏮️ Prev).
+    """
+    direction: str = "a"
+    item_id: int = 0
+
+    def token(self) -> str:
+        return f"{self.direction}{self.item_id}"
+
+    @classmethod
+    def parse(cls, token: str | None) -> "Cursor":
+        """Parse a cursor token; anything unreadable (e.g. old buttons) means the first page."""
+        if token and token[0] in "ab" and token[1:].isdigit():
+            return cls(token[0], int(token[1:]))
+        return cls()
+
+
+FIRST_PAGE = Cursor()
+
+
+@dataclass
+class Page:
+    items: list
+    prev: Cursor | None  # cursor of the previous page, None on the first page
+    next: Cursor | None  # cursor of the next page, None on the last page
+
+
+def page_number(page: int, total: int, size: int = LISTING_PAGE_SIZE) -> tuple[int, int]:
+    """(page, total pages) with the page clamped into range, as the count may lag."""
+    total_pages = max(1, (total + size - 1) // size)
+    return min(max(page, 1), total_pages), total_pages
@@ -0,0 +1,26 @@
+# utils/unit_of_work.py
+"""
+Telegram side of the per-update unit of work (see UnitOfWork in utils/database.py).
+
+    ApplicationBuilder().application_class(UnitOfWorkApplication).request(UnitOfWorkRequest(connection_pool_size=256))
+
+Every update is processed inside one shared DB transaction, committed when its
+handlers finish. Any Bot API request made from the update's task commits and
+releases that transaction first, so no connection or row lock is held while
+waiting on Telegram. Sends through utils/outbound.py do the same.
+"""
+from telegram.ext import Application
+from telegram.request import HTTPXRequest
+from utils.database import unit_of_work, release_session
+
+
+class UnitOfWorkApplication(Application):
+    async def process_update(self, update: object) -> None:
+        async with unit_of_work():
+            await super().process_update(update)
+
+
+class UnitOfWorkRequest(HTTPXRequest):
+    async def do_request(self, *args, **kwargs):
+        await release_session()
+        return await super().do_request(*args, **kwargs)